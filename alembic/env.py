@@ -5,7 +5,11 @@ from sqlalchemy import pool
 
 from alembic import context
 
+from config import SHARD_URLS
+from database import parse_shard_urls
+from idempotency import IdempotencyKey  # noqa: F401
 from inventory.models import Base
+from jobs.models import Job  # noqa: F401
 
 
 config = context.config
@@ -16,6 +20,15 @@ if config.config_file_name is not None:
 
 target_metadata = [Base.metadata]
 
+# ``alembic -x world=NAME upgrade head`` migrates a world listed in
+# SHARD_URLS instead of the DATABASE_URL one.
+world = context.get_x_argument(as_dictionary=True).get("world")
+if world:
+    config.set_main_option(
+        "sqlalchemy.url",
+        parse_shard_urls(SHARD_URLS)[world].replace("%", "%%")
+    )
+
 
 def run_migrations_offline() -> None:
     """Run migrations in 'offline' mode.
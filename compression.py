@@ -0,0 +1,259 @@
+import hashlib
+import zlib
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+DEFAULT_CONTENT_TYPES = (
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "text/",
+    "image/svg+xml",
+)
+
+# Event streams must reach the client as each event is sent; a
+# compressor would hold back small events until it has enough input.
+UNCOMPRESSED_CONTENT_TYPES = ("text/event-stream",)
+
+
+class GzipStream:
+    """Incremental gzip compressor."""
+
+    def __init__(self) -> None:
+        self._compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+
+    def write(self, data: bytes) -> bytes:
+        """Compress a chunk and flush it so the client can decode it."""
+        return (
+            self._compressor.compress(data)
+            + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+        )
+
+    def close(self, data: bytes = b"") -> bytes:
+        """Compress the last chunk and end the stream."""
+        return self._compressor.compress(data) + self._compressor.flush()
+
+
+class BrotliStream:
+    """Incremental brotli compressor."""
+
+    def __init__(self) -> None:
+        self._compressor = brotli.Compressor(quality=4)
+
+    def write(self, data: bytes) -> bytes:
+        """Compress a chunk and flush it so the client can decode it."""
+        return self._compressor.process(data) + self._compressor.flush()
+
+    def close(self, data: bytes = b"") -> bytes:
+        """Compress the last chunk and end the stream."""
+        return self._compressor.process(data) + self._compressor.finish()
+
+
+class ZstdStream:
+    """Incremental zstd compressor."""
+
+    def __init__(self) -> None:
+        self._compressor = zstandard.ZstdCompressor(level=3).compressobj()
+
+    def write(self, data: bytes) -> bytes:
+        """Compress a chunk and flush it so the client can decode it."""
+        return self._compressor.compress(data) + self._compressor.flush(
+            zstandard.COMPRESSOBJ_FLUSH_BLOCK
+        )
+
+    def close(self, data: bytes = b"") -> bytes:
+        """Compress the last chunk and end the stream."""
+        return self._compressor.compress(data) + self._compressor.flush()
+
+
+# In order of preference; encodings whose library is missing are skipped.
+ENCODERS: Dict[str, Callable] = {
+    name: stream
+    for name, stream, available in (
+        ("br", BrotliStream, brotli is not None),
+        ("zstd", ZstdStream, zstandard is not None),
+        ("gzip", GzipStream, True),
+    )
+    if available
+}
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """
+    Pick the preferred available encoding the client accepts.
+    """
+    accepted = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+
+    for name in ENCODERS:
+        if accepted.get(name, accepted.get("*", 0.0)) > 0:
+            return name
+    return None
+
+
+class CompressionMiddleware:
+    """
+    Compress responses with brotli, zstd or gzip, whichever the client
+    accepts first in that order (brotli and zstd only when their
+    libraries are installed).
+
+    Only bodies of an allowed content type and at least
+    ``minimum_size`` bytes are compressed. Streaming responses are
+    compressed chunk by chunk. Complete GET bodies are kept compressed
+    in a small LRU cache keyed by their digest, so catalog pages that
+    many clients fetch are compressed once rather than per request.
+    """
+
+    def __init__(
+            self,
+            app: ASGIApp,
+            minimum_size: int = 1024,
+            content_types: Tuple[str, ...] = DEFAULT_CONTENT_TYPES,
+            cache_size: int = 256
+    ) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.content_types = content_types
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+
+    async def __call__(
+            self, scope: Scope, receive: Receive, send: Send
+    ) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = choose_encoding(
+            Headers(scope=scope).get("accept-encoding", "")
+        )
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        responder = _CompressionResponder(
+            middleware=self,
+            encoding=encoding,
+            cacheable=scope["method"] == "GET",
+            send=send
+        )
+        await self.app(scope, receive, responder.send)
+
+    def compressible(self, headers: Headers) -> bool:
+        """Check whether a response may be compressed."""
+        if "content-encoding" in headers:
+            return False
+        content_type = headers.get("content-type", "")
+        return (
+            content_type.startswith(self.content_types)
+            and not content_type.startswith(UNCOMPRESSED_CONTENT_TYPES)
+        )
+
+    def compress(self, encoding: str, body: bytes, cacheable: bool) -> bytes:
+        """Compress a complete body, reusing a cached result if any."""
+        if not cacheable:
+            return ENCODERS[encoding]().close(body)
+
+        key = (encoding, hashlib.sha256(body).digest())
+        compressed = self._cache.get(key)
+        if compressed is None:
+            compressed = ENCODERS[encoding]().close(body)
+            self._cache[key] = compressed
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        else:
+            self._cache.move_to_end(key)
+        return compressed
+
+
+class _CompressionResponder:
+    """Rewrites one response's messages on their way to the client."""
+
+    def __init__(
+            self,
+            middleware: CompressionMiddleware,
+            encoding: str,
+            cacheable: bool,
+            send: Send
+    ) -> None:
+        self.middleware = middleware
+        self.encoding = encoding
+        self.cacheable = cacheable
+        self._send = send
+        self.start_message = None
+        self.stream = None
+        self.passthrough = None
+
+    async def send(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            self.start_message = message
+            return
+
+        if message["type"] != "http.response.body":
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.passthrough is None:
+            headers = MutableHeaders(scope=self.start_message)
+            self.passthrough = (
+                not self.middleware.compressible(headers)
+                or (not more_body and len(body) < self.middleware.minimum_size)
+            )
+            if self.passthrough:
+                await self._send(self.start_message)
+                await self._send(message)
+                return
+
+            headers["Content-Encoding"] = self.encoding
+            headers.add_vary_header("Accept-Encoding")
+
+            if not more_body:
+                body = self.middleware.compress(
+                    self.encoding, body, self.cacheable
+                )
+                headers["Content-Length"] = str(len(body))
+                await self._send(self.start_message)
+                await self._send({"type": "http.response.body", "body": body})
+                return
+
+            del headers["Content-Length"]
+            self.stream = ENCODERS[self.encoding]()
+            await self._send(self.start_message)
+
+        if self.passthrough:
+            await self._send(message)
+            return
+
+        data = (
+            self.stream.write(body) if more_body else self.stream.close(body)
+        )
+        await self._send({
+            "type": "http.response.body",
+            "body": data,
+            "more_body": more_body,
+        })
@@ -0,0 +1,230 @@
+import json
+import re
+import time
+from collections import Counter, deque
+from typing import Callable, Dict, List, Optional, Pattern, Tuple
+
+from fastapi import APIRouter, Depends
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from config import (
+    CONCURRENCY_LATENCY_TOLERANCE, CONCURRENCY_LIMIT, CONCURRENCY_LIMIT_MAX,
+    CONCURRENCY_LIMIT_MIN
+)
+from health import EXEMPT_PATHS
+from users.auth import get_current_superuser
+
+
+# Share of the limit each priority class may fill: when the worker is
+# busy, catalog browsing is turned away first and writes last.
+PRIORITY_SHARES = {"high": 1.0, "normal": 0.9, "low": 0.75}
+
+# (method or "*", path regex, priority); the first match wins, "normal"
+# otherwise.
+DEFAULT_PRIORITIES = [
+    ("*", r"^/(register|token|token/refresh|logout|logout/all)$", "high"),
+    ("POST", r"^/inventory/", "high"),
+    ("DELETE", r"^/inventory/", "high"),
+    ("GET", r"^/(items|categories)/", "low"),
+]
+
+
+class AdaptiveLimiter:
+    """
+    Concurrency limit adjusted to the latency the worker achieves.
+
+    The baseline is a low percentile of the latencies of the last
+    ``window`` successful responses, so it follows a permanently slower
+    database and is not pinned by a single fast outlier. Responses
+    other than 2xx and 5xx (rejected logins, validation errors,
+    replayed idempotent responses) never reach the database's slow path
+    and are left out. A successful response slower than ``tolerance``
+    times the baseline, or a failed request, cuts the limit by
+    ``backoff`` (at most once per baseline latency, so one wave of slow
+    responses counts once); a fast response to a request that found the
+    worker busy raises it by ``1 / limit``. This additive increase,
+    multiplicative decrease keeps just enough requests in flight to use
+    the database without queueing on its pool.
+    """
+
+    def __init__(
+            self,
+            initial_limit: int = 20,
+            min_limit: int = 4,
+            max_limit: int = 200,
+            tolerance: float = 2.0,
+            backoff: float = 0.9,
+            window: int = 200,
+            percentile: float = 0.1,
+            clock: Callable[[], float] = time.monotonic
+    ) -> None:
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.tolerance = tolerance
+        self.backoff = backoff
+        self.percentile = percentile
+        self.clock = clock
+        self.in_flight = 0
+        self.baseline: Optional[float] = None
+        self.admitted = Counter()
+        self.rejected = Counter()
+        self._latencies = deque(maxlen=window)
+        self._last_decrease = float("-inf")
+
+    def acquire(self, priority: str) -> Optional[bool]:
+        """
+        Admit a request of the priority class, or return ``None`` to
+        reject it. The returned flag says whether the worker was busy,
+        which ``release`` needs.
+        """
+        allowed = max(1.0, self.limit * PRIORITY_SHARES[priority])
+        if self.in_flight >= allowed:
+            self.rejected[priority] += 1
+            return None
+
+        busy = self.in_flight >= self.limit / 2
+        self.in_flight += 1
+        self.admitted[priority] += 1
+        return busy
+
+    def release(self, latency: float, busy: bool, status: int) -> None:
+        """Record how an admitted request went and adjust the limit."""
+        self.in_flight -= 1
+
+        failed = status >= 500
+        if not failed:
+            if not 200 <= status < 300:
+                return
+            self._latencies.append(latency)
+            self.baseline = sorted(self._latencies)[
+                int(len(self._latencies) * self.percentile)
+            ]
+
+        now = self.clock()
+        if failed or latency > self.baseline * self.tolerance:
+            if now - self._last_decrease >= (self.baseline or 0):
+                self._last_decrease = now
+                self.limit = max(self.min_limit, self.limit * self.backoff)
+        elif busy:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+    def readiness(self) -> dict:
+        """Readiness check: not ready while every slot is taken."""
+        return {
+            "ok": self.in_flight < self.limit,
+            "in_flight": self.in_flight,
+            "limit": round(self.limit, 2),
+        }
+
+    def stats(self) -> dict:
+        """Return the limiter's current state and counters."""
+        return {
+            "limit": round(self.limit, 2),
+            "in_flight": self.in_flight,
+            "baseline_ms": (
+                None if self.baseline is None
+                else round(self.baseline * 1000, 2)
+            ),
+            "admitted": dict(self.admitted),
+            "rejected": dict(self.rejected),
+        }
+
+
+class ConcurrencyLimitMiddleware:
+    """
+    Turn requests away with ``503 Service Unavailable`` and a
+    ``Retry-After`` header once the limiter's limit for their priority
+    class is reached, instead of letting them queue for a database
+    connection.
+    """
+
+    def __init__(
+            self,
+            app: ASGIApp,
+            limiter: AdaptiveLimiter,
+            priorities: Optional[List[Tuple[str, str, str]]] = None,
+            clock: Callable[[], float] = time.perf_counter
+    ) -> None:
+        self.app = app
+        self.limiter = limiter
+        self.priorities: List[Tuple[str, Pattern, str]] = [
+            (method, re.compile(path), priority)
+            for method, path, priority in (
+                DEFAULT_PRIORITIES if priorities is None else priorities
+            )
+        ]
+        self.clock = clock
+
+    def priority(self, method: str, path: str) -> str:
+        """Return the priority class of a request."""
+        for rule_method, pattern, priority in self.priorities:
+            if rule_method in ("*", method) and pattern.match(path):
+                return priority
+        return "normal"
+
+    async def __call__(
+            self, scope: Scope, receive: Receive, send: Send
+    ) -> None:
+        if scope["type"] != "http" or scope["path"] in EXEMPT_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        busy = self.limiter.acquire(
+            self.priority(scope["method"], scope["path"])
+        )
+        if busy is None:
+            await _reject(send)
+            return
+
+        status = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        started = self.clock()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            self.limiter.release(
+                self.clock() - started, busy=busy, status=status
+            )
+
+
+async def _reject(send: Send) -> None:
+    """Send the response to a request over the limit."""
+    body = json.dumps({"detail": "Server is busy, try again."}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": 503,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", b"1"),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+concurrency_limiter = (
+    AdaptiveLimiter(
+        initial_limit=CONCURRENCY_LIMIT,
+        min_limit=CONCURRENCY_LIMIT_MIN,
+        max_limit=CONCURRENCY_LIMIT_MAX,
+        tolerance=CONCURRENCY_LATENCY_TOLERANCE
+    )
+    if CONCURRENCY_LIMIT > 0 else None
+)
+
+router = APIRouter(dependencies=[Depends(get_current_superuser)])
+
+
+@router.get("/admin/concurrency", tags=["admin"])
+def read_concurrency_stats() -> Dict[str, object]:
+    """Show the concurrency limit, its baseline latency and counters."""
+    if concurrency_limiter is None:
+        return {"enabled": False}
+    return {"enabled": True, **concurrency_limiter.stats()}
@@ -5,6 +5,44 @@ from dotenv import load_dotenv
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
+DB_QUERY_CACHE_SIZE = int(os.getenv("DB_QUERY_CACHE_SIZE", 1200))
+DEFAULT_WORLD = os.getenv("DEFAULT_WORLD", "default")
+SHARD_URLS = os.getenv("SHARD_URLS", "")
 SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = os.getenv("ALGORITHM")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES"))
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", 7))
+JWKS_FILE = os.getenv("JWKS_FILE")
+JWT_SIGNING_KID = os.getenv("JWT_SIGNING_KID")
+INVENTORY_BATCH_WINDOW_MS = int(os.getenv("INVENTORY_BATCH_WINDOW_MS", 0))
+RATE_LIMIT_PER_MINUTE = int(os.getenv("RATE_LIMIT_PER_MINUTE", 0))
+RATE_LIMIT_BURST = int(os.getenv("RATE_LIMIT_BURST", RATE_LIMIT_PER_MINUTE))
+RATE_LIMIT_ALGORITHM = os.getenv("RATE_LIMIT_ALGORITHM", "token_bucket")
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", 1024))
+EVENTS_QUEUE_SIZE = int(os.getenv("EVENTS_QUEUE_SIZE", 64))
+EVENTS_HEARTBEAT_SECONDS = int(os.getenv("EVENTS_HEARTBEAT_SECONDS", 15))
+ITEM_ARCHIVE_AFTER_DAYS = int(os.getenv("ITEM_ARCHIVE_AFTER_DAYS", 30))
+ITEM_ARCHIVE_INTERVAL_MINUTES = int(
+    os.getenv("ITEM_ARCHIVE_INTERVAL_MINUTES", 0)
+)
+ITEM_ARCHIVE_BATCH_SIZE = int(os.getenv("ITEM_ARCHIVE_BATCH_SIZE", 1000))
+IDEMPOTENCY_STORE = os.getenv("IDEMPOTENCY_STORE", "memory")
+IDEMPOTENCY_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", 86400))
+IDEMPOTENCY_MAX_KEYS = int(os.getenv("IDEMPOTENCY_MAX_KEYS", 10000))
+SINGLEFLIGHT_MAX_WAIT_MS = int(os.getenv("SINGLEFLIGHT_MAX_WAIT_MS", 2000))
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", 0))
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", 1))
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", 300))
+PROFILE_SAMPLE_INTERVAL_MS = int(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", 5))
+PROFILE_MAX_PER_MINUTE = int(os.getenv("PROFILE_MAX_PER_MINUTE", 6))
+SLOW_QUERY_MS = int(os.getenv("SLOW_QUERY_MS", 200))
+SLOW_QUERY_EXPLAIN_LIMIT = int(os.getenv("SLOW_QUERY_EXPLAIN_LIMIT", 3))
+READY_DB_BUDGET_MS = int(os.getenv("READY_DB_BUDGET_MS", 1000))
+READY_MAX_POOL_WAIT_MS = int(os.getenv("READY_MAX_POOL_WAIT_MS", 250))
+READY_MAX_IN_FLIGHT = int(os.getenv("READY_MAX_IN_FLIGHT", 100))
+CONCURRENCY_LIMIT = int(os.getenv("CONCURRENCY_LIMIT", 20))
+CONCURRENCY_LIMIT_MIN = int(os.getenv("CONCURRENCY_LIMIT_MIN", 4))
+CONCURRENCY_LIMIT_MAX = int(os.getenv("CONCURRENCY_LIMIT_MAX", 200))
+CONCURRENCY_LATENCY_TOLERANCE = float(
+    os.getenv("CONCURRENCY_LATENCY_TOLERANCE", 2)
+)
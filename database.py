@@ -1,19 +1,134 @@
+from typing import Callable, Dict
+
+from fastapi import Depends, HTTPException
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
+from starlette.requests import HTTPConnection
 
-from config import DATABASE_URL
+from config import (
+    DATABASE_URL, DB_QUERY_CACHE_SIZE, DEFAULT_WORLD, SHARD_URLS
+)
 
 
-engine = create_engine(DATABASE_URL)
+# Compiled SQL is cached per statement shape; sparse fieldsets and
+# filters multiply the shapes, so keep more than the default 500.
+engine = create_engine(DATABASE_URL, query_cache_size=DB_QUERY_CACHE_SIZE)
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Objects returned by INSERT/UPDATE ... RETURNING are already current,
+# so keep them loaded after commit instead of re-SELECTing them.
+SessionLocal = sessionmaker(
+    autocommit=False,
+    autoflush=False,
+    expire_on_commit=False,
+    bind=engine,
+    info={"world": DEFAULT_WORLD}
+)
 
 Base = declarative_base()
 
 
-def get_db():
-    db = SessionLocal()
+def parse_shard_urls(value: str) -> Dict[str, str]:
+    """Parse ``world=url`` pairs separated by commas."""
+    urls = {}
+    for pair in value.split(","):
+        world, _, url = pair.strip().partition("=")
+        if world and url:
+            urls[world.strip()] = url.strip()
+    return urls
+
+
+class ShardSet:
+    """
+    The databases of the game worlds.
+
+    Each world lives in one database holding the whole schema, so no
+    query or foreign key crosses databases. The default world uses
+    ``SessionLocal``; the others get an engine of their own. Sessions
+    record their world in ``Session.info``.
+    """
+
+    def __init__(
+            self,
+            default_world: str,
+            default_session_factory: Callable[[], Session],
+            urls: Dict[str, str],
+            **engine_options
+    ) -> None:
+        self.default_world = default_world
+        self._session_factories = {default_world: default_session_factory}
+        for world, url in urls.items():
+            if world == default_world:
+                continue
+            self._session_factories[world] = sessionmaker(
+                autocommit=False,
+                autoflush=False,
+                expire_on_commit=False,
+                bind=create_engine(url, **engine_options),
+                info={"world": world}
+            )
+
+    @property
+    def worlds(self) -> list:
+        """Return the names of the worlds, the default one first."""
+        return list(self._session_factories)
+
+    def session_factory(self, world: str) -> Callable[[], Session]:
+        """Return the session factory of a world's database."""
+        return self._session_factories[world]
+
+    def engines(self) -> Dict[str, Engine]:
+        """Return each world's engine."""
+        return {
+            world: factory.kw["bind"]
+            for world, factory in self._session_factories.items()
+        }
+
+
+shards = ShardSet(
+    default_world=DEFAULT_WORLD,
+    default_session_factory=SessionLocal,
+    urls=parse_shard_urls(SHARD_URLS),
+    query_cache_size=DB_QUERY_CACHE_SIZE
+)
+
+
+def get_world(connection: HTTPConnection) -> str:
+    """
+    Return the world a request is for: the ``X-World`` header, or the
+    ``world`` query parameter for browser event streams, or the default
+    world.
+    """
+    world = (
+        connection.headers.get("x-world")
+        or connection.query_params.get("world")
+        or shards.default_world
+    )
+    if world not in shards.worlds:
+        raise HTTPException(status_code=404, detail="Unknown world.")
+    return world
+
+
+def session_world(db: Session) -> str:
+    """Return the world of a session's database."""
+    return db.info.get("world", DEFAULT_WORLD)
+
+
+def get_db(world: str = Depends(get_world)):
+    db = shards.session_factory(world)()
     try:
         yield db
     finally:
         db.close()
+
+
+def get_upsert_insert(db: Session) -> Callable:
+    """
+    Return the dialect's insert() construct, which supports
+    ON CONFLICT clauses for the session's database.
+    """
+    if db.get_bind().dialect.name == "sqlite":
+        return sqlite_insert
+    return postgresql_insert
@@ -0,0 +1,221 @@
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Callable, Dict, Tuple
+
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from config import (
+    DEFAULT_WORLD, READY_DB_BUDGET_MS, READY_MAX_IN_FLIGHT,
+    READY_MAX_POOL_WAIT_MS
+)
+from database import shards
+
+
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+PROBE_PATHS = ("/healthz", "/readyz")
+
+# Requests left out of load accounting: probes, and event streams, which
+# stay open and mostly idle for as long as a client is subscribed.
+EXEMPT_PATHS = PROBE_PATHS + ("/inventory/events",)
+
+
+@lru_cache(maxsize=1)
+def migration_heads() -> Tuple[str, ...]:
+    """Return the head revisions of the project's migrations."""
+    config = Config(os.path.join(PROJECT_ROOT, "alembic.ini"))
+    config.set_main_option(
+        "script_location", os.path.join(PROJECT_ROOT, "alembic")
+    )
+    return tuple(sorted(ScriptDirectory.from_config(config).get_heads()))
+
+
+class RequestGauge:
+    """Count the HTTP requests a worker is handling."""
+
+    def __init__(self) -> None:
+        self.in_flight = 0
+
+
+class InFlightMiddleware:
+    """
+    Keep a ``RequestGauge`` up to date, leaving out health probes and
+    event streams.
+    """
+
+    def __init__(self, app: ASGIApp, gauge: "RequestGauge") -> None:
+        self.app = app
+        self.gauge = gauge
+
+    async def __call__(
+            self, scope: Scope, receive: Receive, send: Send
+    ) -> None:
+        if scope["type"] != "http" or scope["path"] in EXEMPT_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        self.gauge.in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.gauge.in_flight -= 1
+
+
+class ReadinessProbe:
+    """
+    Decide whether a worker should receive traffic.
+
+    A worker is ready when every world's database answers within
+    ``db_budget`` seconds in total, getting a pooled connection took at
+    most ``max_pool_wait`` seconds, the pools have a free connection,
+    the schemas are at the migration head (or not managed by Alembic at
+    all) and it handles at most ``max_in_flight`` requests (0 for no
+    limit). The databases are probed on a dedicated thread, so a
+    saturated threadpool cannot hold up the answer. Checks of worlds
+    other than the default one are suffixed with ``:world``.
+
+    Other components add their own checks to ``checks``: callables
+    returning a dict with an ``ok`` flag.
+    """
+
+    def __init__(
+            self,
+            engines: Dict[str, Engine],
+            gauge: RequestGauge,
+            db_budget: float = 1.0,
+            max_pool_wait: float = 0.25,
+            max_in_flight: int = 100
+    ) -> None:
+        self.engines = engines
+        self.gauge = gauge
+        self.db_budget = db_budget
+        self.max_pool_wait = max_pool_wait
+        self.max_in_flight = max_in_flight
+        self.checks: Dict[str, Callable[[], dict]] = {}
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="readiness-probe"
+        )
+
+    def check_database(self) -> Dict[str, dict]:
+        """Probe every world's database; runs on the probe thread."""
+        checks = {}
+        for world, engine in self.engines.items():
+            suffix = "" if world == DEFAULT_WORLD else f":{world}"
+            try:
+                world_checks = self.check_engine(engine)
+            except Exception as exc:
+                world_checks = {"database": {"ok": False, "error": str(exc)}}
+            for name, check in world_checks.items():
+                checks[name + suffix] = check
+        return checks
+
+    def check_engine(self, engine: Engine) -> Dict[str, dict]:
+        """Probe one database, its schema version and its pool."""
+        started = time.perf_counter()
+        with engine.connect() as connection:
+            pool_wait = time.perf_counter() - started
+            connection.execute(text("SELECT 1"))
+            current = tuple(sorted(
+                MigrationContext.configure(connection).get_current_heads()
+            ))
+        elapsed = time.perf_counter() - started
+
+        head = migration_heads()
+        return {
+            "database": {
+                "ok": pool_wait <= self.max_pool_wait,
+                "pool_wait_ms": round(pool_wait * 1000, 2),
+                "elapsed_ms": round(elapsed * 1000, 2),
+            },
+            "migrations": {
+                # Databases created without Alembic have no version.
+                "ok": not current or current == head,
+                "current": list(current),
+                "head": list(head),
+            },
+            "pool": self.check_pool(engine),
+        }
+
+    @staticmethod
+    def check_pool(engine: Engine) -> dict:
+        """Check that an engine's pool has a connection to spare."""
+        pool = engine.pool
+        if not isinstance(pool, QueuePool):
+            return {"ok": True}
+
+        capacity = pool.size() + max(pool._max_overflow, 0)
+        checked_out = pool.checkedout()
+        return {
+            "ok": pool._max_overflow < 0 or checked_out < capacity,
+            "checked_out": checked_out,
+            "capacity": capacity,
+        }
+
+    async def check(self) -> Tuple[bool, Dict[str, dict]]:
+        """Run every check; return whether all passed and their details."""
+        future = asyncio.get_running_loop().run_in_executor(
+            self._executor, self.check_database
+        )
+        try:
+            checks = await asyncio.wait_for(future, self.db_budget)
+        except asyncio.TimeoutError:
+            checks = {"database": {"ok": False, "error": "timeout"}}
+        except Exception as exc:
+            checks = {"database": {"ok": False, "error": str(exc)}}
+
+        checks["load"] = {
+            "ok": (
+                not self.max_in_flight
+                or self.gauge.in_flight <= self.max_in_flight
+            ),
+            "in_flight": self.gauge.in_flight,
+            "limit": self.max_in_flight,
+        }
+        for name, check in self.checks.items():
+            checks[name] = check()
+        return all(check["ok"] for check in checks.values()), checks
+
+
+request_gauge = RequestGauge()
+
+readiness_probe = ReadinessProbe(
+    engines=shards.engines(),
+    gauge=request_gauge,
+    db_budget=READY_DB_BUDGET_MS / 1000,
+    max_pool_wait=READY_MAX_POOL_WAIT_MS / 1000,
+    max_in_flight=READY_MAX_IN_FLIGHT
+)
+
+router = APIRouter(tags=["health"])
+
+
+@router.get("/healthz")
+async def healthz() -> dict:
+    """Report that the process is alive, without touching the database."""
+    return {"status": "ok"}
+
+
+@router.get("/readyz")
+async def readyz() -> JSONResponse:
+    """
+    Report whether this worker can take traffic, with ``503`` when one
+    of the readiness checks fails.
+    """
+    ready, checks = await readiness_probe.check()
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={
+            "status": "ready" if ready else "unavailable",
+            "checks": checks,
+        }
+    )
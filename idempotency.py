@@ -0,0 +1,439 @@
+import hashlib
+import json
+from abc import ABC, abstractmethod
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import (
+    JSON, Column, DateTime, Integer, LargeBinary, String, delete, select,
+    update
+)
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from database import Base, get_upsert_insert
+from ratelimit import token_subject
+
+
+class StoredResponse(NamedTuple):
+    """
+    A request's fingerprint and, once it has finished, its response.
+    ``status`` is ``None`` while the request is still being processed.
+    """
+    fingerprint: str
+    status: Optional[int] = None
+    headers: Tuple[Tuple[str, str], ...] = ()
+    body: bytes = b""
+
+
+class IdempotencyStore(ABC):
+    """
+    Storage for idempotency keys and their responses.
+
+    ``blocking`` stores are called from the threadpool so that they do
+    not stall the event loop.
+    """
+
+    blocking = False
+
+    @abstractmethod
+    def begin(
+            self, key: str, fingerprint: str, lock_timeout: float
+    ) -> Optional[StoredResponse]:
+        """
+        Reserve the key for a new request and return ``None``, or return
+        what is stored for it if it is already taken.
+        """
+
+    @abstractmethod
+    def complete(
+            self, key: str, response: StoredResponse, ttl: float
+    ) -> None:
+        """Store the response of a reserved key for ``ttl`` seconds."""
+
+    @abstractmethod
+    def release(self, key: str) -> None:
+        """Forget a key so that the request can be retried."""
+
+
+class InMemoryIdempotencyStore(IdempotencyStore):
+    """Per-process store with expiry and a bound on the number of keys."""
+
+    def __init__(self, max_keys: int = 10_000) -> None:
+        self.max_keys = max_keys
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def begin(
+            self, key: str, fingerprint: str, lock_timeout: float
+    ) -> Optional[StoredResponse]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > now:
+                self._entries.move_to_end(key)
+                return entry[0]
+
+            self._entries[key] = (
+                StoredResponse(fingerprint=fingerprint), now + lock_timeout
+            )
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_keys:
+                self._entries.popitem(last=False)
+        return None
+
+    def complete(
+            self, key: str, response: StoredResponse, ttl: float
+    ) -> None:
+        with self._lock:
+            self._entries[key] = (response, time.monotonic() + ttl)
+
+    def release(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+class IdempotencyKey(Base):
+    """
+    Represents an idempotency key stored by ``DatabaseIdempotencyStore``,
+    shared by all workers.
+    """
+    __tablename__ = "idempotency_keys"
+    key = Column(String(64), primary_key=True)
+    fingerprint = Column(String(64), nullable=False)
+    status_code = Column(Integer, nullable=True)
+    headers = Column(JSON, nullable=True)
+    body = Column(LargeBinary, nullable=True)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+
+
+class DatabaseIdempotencyStore(IdempotencyStore):
+    """
+    Store keeping idempotency keys in the ``idempotency_keys`` table, so
+    that a retry reaching another worker is still recognised. Expired
+    keys are taken over when reused and purged every ``purge_every``
+    reservations.
+    """
+
+    blocking = True
+
+    def __init__(
+            self,
+            session_factory: Callable[[], Session],
+            purge_every: int = 1000
+    ) -> None:
+        self._session_factory = session_factory
+        self.purge_every = purge_every
+        self._reservations = 0
+
+    def begin(
+            self, key: str, fingerprint: str, lock_timeout: float
+    ) -> Optional[StoredResponse]:
+        now = datetime.now(tz=timezone.utc)
+        db = self._session_factory()
+        try:
+            self._reservations += 1
+            if self._reservations % self.purge_every == 0:
+                db.execute(
+                    delete(IdempotencyKey)
+                    .where(IdempotencyKey.expires_at < now)
+                )
+
+            while True:
+                statement = get_upsert_insert(db)(IdempotencyKey).values(
+                    key=key,
+                    fingerprint=fingerprint,
+                    expires_at=now + timedelta(seconds=lock_timeout)
+                )
+                statement = statement.on_conflict_do_update(
+                    index_elements=[IdempotencyKey.key],
+                    set_={
+                        "fingerprint": statement.excluded.fingerprint,
+                        "status_code": None,
+                        "headers": None,
+                        "body": None,
+                        "expires_at": statement.excluded.expires_at,
+                    },
+                    where=IdempotencyKey.expires_at < now
+                ).returning(IdempotencyKey.key)
+                if db.execute(statement).first() is not None:
+                    db.commit()
+                    return None
+
+                record = db.execute(
+                    select(IdempotencyKey).where(IdempotencyKey.key == key)
+                ).scalar_one_or_none()
+                db.commit()
+                if record is not None:
+                    return StoredResponse(
+                        fingerprint=record.fingerprint,
+                        status=record.status_code,
+                        headers=tuple(
+                            tuple(header) for header in record.headers or []
+                        ),
+                        body=record.body or b""
+                    )
+        finally:
+            db.close()
+
+    def complete(
+            self, key: str, response: StoredResponse, ttl: float
+    ) -> None:
+        db = self._session_factory()
+        try:
+            db.execute(
+                update(IdempotencyKey)
+                .where(IdempotencyKey.key == key)
+                .values(
+                    status_code=response.status,
+                    headers=[list(header) for header in response.headers],
+                    body=response.body,
+                    expires_at=(
+                        datetime.now(tz=timezone.utc)
+                        + timedelta(seconds=ttl)
+                    )
+                )
+            )
+            db.commit()
+        finally:
+            db.close()
+
+    def release(self, key: str) -> None:
+        db = self._session_factory()
+        try:
+            db.execute(delete(IdempotencyKey).where(IdempotencyKey.key == key))
+            db.commit()
+        finally:
+            db.close()
+
+
+# Responses of these routes carry live access and refresh tokens, which
+# must not be kept in the store.
+CREDENTIAL_PATHS = ("/token", "/token/refresh")
+
+
+def idempotency_scope(scope: Scope, body: bytes) -> str:
+    """
+    Identify whose keys a request uses: the user of a valid bearer
+    token. Anonymous clients cannot be told apart that way, so their
+    keys are scoped by client address and request body: two clients
+    picking the same key never get each other's response, and a retry
+    from a new address simply runs again.
+    """
+    subject = token_subject(scope)
+    if subject is not None:
+        return "user:" + subject
+
+    client = scope.get("client")
+    address = client[0] if client else "unknown"
+    return f"anonymous:{address}:{hashlib.sha256(body).hexdigest()}"
+
+
+class IdempotencyMiddleware:
+    """
+    Make retried write requests safe by honouring ``Idempotency-Key``.
+
+    The first request with a key runs normally and its response is
+    stored with a fingerprint of the request. A retry with the same key
+    and request gets the stored response without running the endpoint
+    again; reusing a key for a different request gets ``422``, and a
+    retry arriving while the first request is still running gets
+    ``409``. Server errors are not stored, so such requests can be
+    retried, and requests to ``excluded_paths`` are never stored.
+    """
+
+    def __init__(
+            self,
+            app: ASGIApp,
+            store: Optional[IdempotencyStore] = None,
+            ttl: float = 24 * 60 * 60,
+            lock_timeout: float = 60,
+            max_body_size: int = 1024 * 1024,
+            methods: Tuple[str, ...] = ("POST", "PUT", "PATCH", "DELETE"),
+            excluded_paths: Tuple[str, ...] = CREDENTIAL_PATHS,
+            key_func: Callable[[Scope, bytes], str] = idempotency_scope
+    ) -> None:
+        self.app = app
+        self.store = store or InMemoryIdempotencyStore()
+        self.ttl = ttl
+        self.lock_timeout = lock_timeout
+        self.max_body_size = max_body_size
+        self.methods = methods
+        self.excluded_paths = excluded_paths
+        self.key_func = key_func
+
+    async def __call__(
+            self, scope: Scope, receive: Receive, send: Send
+    ) -> None:
+        if (
+                scope["type"] != "http"
+                or scope["method"] not in self.methods
+                or scope["path"] in self.excluded_paths
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        idempotency_key = Headers(scope=scope).get("idempotency-key")
+        if not idempotency_key:
+            await self.app(scope, receive, send)
+            return
+
+        if len(idempotency_key) > 255:
+            await _send_error(
+                send, 400, "Idempotency-Key must be at most 255 characters."
+            )
+            return
+
+        body = await _read_body(receive)
+        fingerprint = hashlib.sha256(b"\n".join([
+            scope["method"].encode(),
+            scope["path"].encode(),
+            scope.get("query_string", b""),
+            body,
+        ])).hexdigest()
+        key = hashlib.sha256(
+            f"{self.key_func(scope, body)}\n{idempotency_key}".encode()
+        ).hexdigest()
+
+        stored = await self._call(
+            self.store.begin, key, fingerprint, self.lock_timeout
+        )
+        if stored is not None:
+            await self._answer_retry(stored, fingerprint, send)
+            return
+
+        await self._run(scope, receive, send, key, fingerprint, body)
+
+    async def _call(self, method: Callable, *args) -> Any:
+        """Call a store method, off the event loop if it blocks."""
+        if self.store.blocking:
+            return await run_in_threadpool(method, *args)
+        return method(*args)
+
+    async def _answer_retry(
+            self, stored: StoredResponse, fingerprint: str, send: Send
+    ) -> None:
+        """Respond to a request whose key is already taken."""
+        if stored.fingerprint != fingerprint:
+            await _send_error(
+                send,
+                422,
+                "Idempotency-Key was already used for a different request."
+            )
+            return
+
+        if stored.status is None:
+            await _send_error(
+                send,
+                409,
+                "A request with this Idempotency-Key is still in progress.",
+                headers=[(b"retry-after", b"1")]
+            )
+            return
+
+        headers = [
+            (name.encode("latin-1"), value.encode("latin-1"))
+            for name, value in stored.headers
+        ]
+        headers.append((b"idempotent-replayed", b"true"))
+        await send({
+            "type": "http.response.start",
+            "status": stored.status,
+            "headers": headers,
+        })
+        await send({"type": "http.response.body", "body": stored.body})
+
+    async def _run(
+            self,
+            scope: Scope,
+            receive: Receive,
+            send: Send,
+            key: str,
+            fingerprint: str,
+            body: bytes
+    ) -> None:
+        """Run the request and store its response."""
+        body_sent = False
+        status = None
+        headers = ()
+        chunks = []
+        size = 0
+
+        async def replay_receive() -> Message:
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": body}
+            return await receive()
+
+        async def capture_send(message: Message) -> None:
+            nonlocal status, headers, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = tuple(
+                    (name.decode("latin-1"), value.decode("latin-1"))
+                    for name, value in message.get("headers", [])
+                )
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+                if size <= self.max_body_size:
+                    chunks.append(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, replay_receive, capture_send)
+        except BaseException:
+            await self._call(self.store.release, key)
+            raise
+
+        if (
+                status is None or status >= 500 or status == 429
+                or size > self.max_body_size
+        ):
+            await self._call(self.store.release, key)
+            return
+
+        response = StoredResponse(
+            fingerprint=fingerprint,
+            status=status,
+            headers=headers,
+            body=b"".join(chunks)
+        )
+        await self._call(self.store.complete, key, response, self.ttl)
+
+
+async def _read_body(receive: Receive) -> bytes:
+    """Read the whole request body."""
+    chunks = []
+    while True:
+        message = await receive()
+        if message["type"] != "http.request":
+            break
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body", False):
+            break
+    return b"".join(chunks)
+
+
+async def _send_error(
+        send: Send,
+        status: int,
+        detail: str,
+        headers: Optional[List[Tuple[bytes, bytes]]] = None
+) -> None:
+    """Send a JSON error response."""
+    body = json.dumps({"detail": detail}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+        ] + (headers or []),
+    })
+    await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,122 @@
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Callable, List
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from config import (
+    ITEM_ARCHIVE_AFTER_DAYS, ITEM_ARCHIVE_BATCH_SIZE,
+    ITEM_ARCHIVE_INTERVAL_MINUTES
+)
+from database import shards
+from inventory import crud, models
+from jobs.registry import register_job_type
+
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_JOB_TYPE = "archive_deleted_items"
+
+
+class ItemArchiver:
+    """
+    Periodically move items deleted more than ``retention`` ago into
+    the archive table, from a background thread.
+    """
+
+    def __init__(
+            self,
+            session_factory: Callable[[], Session],
+            retention: timedelta,
+            interval_seconds: float,
+            batch_size: int = 1000
+    ) -> None:
+        self._session_factory = session_factory
+        self._retention = retention
+        self._interval = interval_seconds
+        self._batch_size = batch_size
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self) -> None:
+        """Start the archival thread."""
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name="item-archiver", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the archival thread after its current run."""
+        self._stopped.set()
+
+    def run_once(self) -> int:
+        """Archive the items that are due and return how many moved."""
+        deleted_before = datetime.now(tz=timezone.utc) - self._retention
+        db = self._session_factory()
+        try:
+            return crud.archive_deleted_items(
+                db=db,
+                deleted_before=deleted_before,
+                batch_size=self._batch_size
+            )
+        finally:
+            db.close()
+
+    def _run(self) -> None:
+        """Archive items every interval until stopped."""
+        while not self._stopped.wait(self._interval):
+            try:
+                archived = self.run_once()
+            except Exception:
+                logger.exception("Archiving deleted items failed.")
+                continue
+            if archived:
+                logger.info("Archived %d deleted items.", archived)
+
+
+def archive_items_job(
+        db: Session,
+        payload: dict,
+        report_progress: Callable[[float], None]
+) -> dict:
+    """
+    Job archiving the items deleted more than ``after_days`` days ago
+    (``ITEM_ARCHIVE_AFTER_DAYS`` unless given in the payload).
+    """
+    after_days = payload.get("after_days", ITEM_ARCHIVE_AFTER_DAYS)
+    deleted_before = (
+        datetime.now(tz=timezone.utc) - timedelta(days=after_days)
+    )
+    total = db.execute(
+        select(func.count())
+        .select_from(models.Item)
+        .where(models.Item.deleted_at < deleted_before)
+    ).scalar_one()
+    db.commit()
+
+    archived = crud.archive_deleted_items(
+        db=db,
+        deleted_before=deleted_before,
+        batch_size=ITEM_ARCHIVE_BATCH_SIZE,
+        on_batch=lambda done: report_progress(done / max(total, 1))
+    )
+    return {"archived": archived}
+
+
+register_job_type(ARCHIVE_JOB_TYPE, archive_items_job, max_concurrency=1)
+
+# One archiver per world's database.
+item_archivers: List[ItemArchiver] = []
+if ITEM_ARCHIVE_INTERVAL_MINUTES > 0:
+    item_archivers = [
+        ItemArchiver(
+            session_factory=shards.session_factory(world),
+            retention=timedelta(days=ITEM_ARCHIVE_AFTER_DAYS),
+            interval_seconds=ITEM_ARCHIVE_INTERVAL_MINUTES * 60,
+            batch_size=ITEM_ARCHIVE_BATCH_SIZE
+        )
+        for world in shards.worlds
+    ]
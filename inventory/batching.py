@@ -0,0 +1,192 @@
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError
+from typing import Callable, Dict, List, NamedTuple
+
+from fastapi import HTTPException
+from sqlalchemy import case, select, update
+from sqlalchemy.orm import Session
+
+from config import INVENTORY_BATCH_WINDOW_MS
+from database import session_world, shards
+from inventory import crud, models, schemas
+from inventory.events import publish_owner_change
+
+
+logger = logging.getLogger(__name__)
+
+
+class _Claim(NamedTuple):
+    """A pending request to add an item to a user's inventory."""
+    user_id: int
+    item_id: int
+    future: Future
+
+
+class InventoryClaimBatcher:
+    """
+    Coalesce inventory claims from concurrent requests into one
+    transaction and one multi-row UPDATE (group commit).
+
+    Claims are collected for up to ``window_ms`` after the first one
+    arrives, then flushed together by a background thread. Each caller
+    blocks only on its own result, which is the same ``ItemRead`` or
+    ``HTTPException`` that ``crud.add_item_to_inventory`` would give.
+    A caller whose batch has not committed ``timeout_ms`` after the
+    window (by default the pool's 30 second checkout timeout) gets a
+    ``503`` instead.
+    """
+
+    def __init__(
+            self,
+            session_factory: Callable[[], Session],
+            window_ms: int,
+            max_batch_size: int = 500,
+            timeout_ms: int = 30_000
+    ) -> None:
+        self._session_factory = session_factory
+        self._window = window_ms / 1000
+        self._timeout = self._window + timeout_ms / 1000
+        self._max_batch_size = max_batch_size
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def claim(self, user_id: int, item_id: int) -> schemas.ItemRead:
+        """
+        Queue a claim and wait for the batch containing it to commit.
+        """
+        self._ensure_started()
+        future = Future()
+        self._queue.put(
+            _Claim(user_id=user_id, item_id=item_id, future=future)
+        )
+        try:
+            return future.result(timeout=self._timeout)
+        except TimeoutError:
+            raise HTTPException(
+                status_code=503,
+                detail="Inventory is busy, try again.",
+                headers={"Retry-After": "1"}
+            )
+
+    def _ensure_started(self) -> None:
+        """Start the flushing thread on first use."""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="inventory-claims", daemon=True
+                )
+                self._thread.start()
+
+    def _run(self) -> None:
+        """Collect claims into batches and flush them forever."""
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self._window
+            while len(batch) < self._max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            try:
+                self._flush(batch)
+            except Exception as exc:
+                logger.exception(
+                    "Flushing %d inventory claims failed.", len(batch)
+                )
+                for claim in batch:
+                    if not claim.future.done():
+                        claim.future.set_exception(exc)
+
+    def _flush(self, batch: List[_Claim]) -> None:
+        """Apply a batch of claims in one transaction and resolve them."""
+        winners = {}
+        for claim in batch:
+            winners.setdefault(claim.item_id, claim.user_id)
+
+        db = self._session_factory()
+        try:
+            claimed_items = db.execute(
+                update(models.Item)
+                .where(
+                    models.Item.id.in_(winners),
+                    models.Item.owner_id.is_(None),
+                    crud.LIVE_ITEM
+                )
+                .values(owner_id=case(winners, value=models.Item.id))
+                .returning(models.Item)
+            ).scalars().all()
+            claimed = {
+                item.id: schemas.ItemRead.model_validate(item)
+                for item in claimed_items
+            }
+            crud.record_item_changes(db, [
+                {
+                    "item_id": item.id,
+                    "kind": "owner_changed",
+                    "owner_id": item.owner_id
+                }
+                for item in claimed.values()
+            ])
+            db.commit()
+            for item in claimed.values():
+                publish_owner_change(
+                    item_id=item.id,
+                    previous_owner_id=None,
+                    owner_id=item.owner_id,
+                    world=session_world(db)
+                )
+
+            lost = {
+                claim.item_id for claim in batch
+                if claim.item_id not in claimed
+                or claimed[claim.item_id].owner_id != claim.user_id
+            }
+            owners = {}
+            if lost:
+                owners = dict(db.execute(
+                    select(models.Item.id, models.Item.owner_id)
+                    .where(models.Item.id.in_(lost), crud.LIVE_ITEM)
+                ).all())
+        except Exception as exc:
+            for claim in batch:
+                claim.future.set_exception(exc)
+            return
+        finally:
+            db.close()
+
+        for claim in batch:
+            item = claimed.get(claim.item_id)
+            if item is not None and item.owner_id == claim.user_id:
+                claim.future.set_result(item)
+            elif claim.item_id not in owners:
+                claim.future.set_exception(
+                    HTTPException(status_code=404, detail="Item not found.")
+                )
+            elif owners[claim.item_id] == claim.user_id:
+                claim.future.set_exception(HTTPException(
+                    status_code=400, detail="Item already in user's inventory."
+                ))
+            else:
+                claim.future.set_exception(HTTPException(
+                    status_code=409, detail="Item is owned by another user."
+                ))
+
+
+# One batcher per world, since each flush runs in one world's database.
+claim_batchers: Dict[str, InventoryClaimBatcher] = {}
+if INVENTORY_BATCH_WINDOW_MS > 0:
+    claim_batchers = {
+        world: InventoryClaimBatcher(
+            session_factory=shards.session_factory(world),
+            window_ms=INVENTORY_BATCH_WINDOW_MS
+        )
+        for world in shards.worlds
+    }
@@ -1,24 +1,63 @@
+import heapq
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from itertools import islice
+
 from fastapi import HTTPException
+from datetime import datetime, timezone
+
+from sqlalchemy import (
+    Select, bindparam, case, delete, func, insert, or_, select, update
+)
 from sqlalchemy.orm import Session, Query
 
+from database import get_upsert_insert, session_world
 from inventory import models, schemas
-from typing import Optional
+from inventory.events import publish_owner_change
+from typing import Callable, Dict, List, Optional, Tuple
+from users.models import User
+
+
+LIVE_ITEM = models.Item.deleted_at.is_(None)
+
+# Lookups run on most requests are built once, with bound parameters, so
+# each call only executes them: their compiled SQL is found in the
+# engine's query cache without constructing and hashing a new statement.
+CATEGORY_BY_NAME = select(models.Category).where(
+    models.Category.name == bindparam("name")
+).limit(1)
+ITEM_BY_NAME = select(models.Item).where(
+    models.Item.name == bindparam("name"), LIVE_ITEM
+).limit(1)
 
 
 def get_category_by_name(db: Session, name: str) -> Optional[models.Category]:
     """
     Retrieve a category by its name from the database.
     """
-    return db.query(models.Category).filter(
-        models.Category.name == name
-    ).first()
+    return db.execute(
+        CATEGORY_BY_NAME, {"name": name}
+    ).scalars().first()
 
 
-def get_all_categories_query(db: Session) -> Query:
+def _projection(model: type, fields: Optional[List[str]]) -> list:
     """
-    Retrieve all categories query.
+    Return the columns to select for a sparse fieldset,
+    or the whole entity when no fields are requested.
     """
-    return db.query(models.Category)
+    if not fields:
+        return [model]
+    return [getattr(model, field) for field in fields]
+
+
+def get_all_categories_query(
+        db: Session,
+        fields: Optional[List[str]] = None
+) -> Query:
+    """
+    Retrieve all categories query, selecting only ``fields`` if given.
+    """
+    return db.query(*_projection(models.Category, fields))
 
 
 def create_category(
@@ -34,10 +73,12 @@ def create_category(
             status_code=400, detail="Category with this name already exists."
         )
 
-    new_category = models.Category(name=category.name)
-    db.add(new_category)
+    new_category = db.execute(
+        insert(models.Category)
+        .values(name=category.name)
+        .returning(models.Category)
+    ).scalar_one()
     db.commit()
-    db.refresh(new_category)
     return new_category
 
 
@@ -51,33 +92,86 @@ def delete_category(db: Session, category_id: int) -> models.Category:
     if not db_category:
         raise HTTPException(status_code=404, detail="Category not found.")
 
+    if db.execute(
+        select(models.Item.id)
+        .where(models.Item.category == db_category.name, LIVE_ITEM)
+        .limit(1)
+    ).first():
+        raise HTTPException(
+            status_code=400,
+            detail="Category still has items. Delete or move them first."
+        )
+
     db.delete(db_category)
     db.commit()
     return db_category
 
 
-def get_item_by_id(db: Session, item_id: int) -> models.Item:
+def get_item_by_id(
+        db: Session,
+        item_id: int,
+        fields: Optional[List[str]] = None
+) -> models.Item:
     """
-    Retrieve an item by its ID.
+    Retrieve an item by its ID, selecting only ``fields`` if given.
     """
-    db_item = db.query(models.Item).filter(models.Item.id == item_id).first()
+    result = db.execute(
+        _item_by_id_statement(tuple(fields or ())), {"item_id": item_id}
+    )
+    db_item = result.first() if fields else result.scalars().first()
     if not db_item:
         raise HTTPException(status_code=404, detail="Item not found.")
     return db_item
 
 
+def get_items_by_ids(
+        db: Session,
+        item_ids: List[int]
+) -> Tuple[List[models.Item], List[int]]:
+    """
+    Retrieve several items with one query. Returns the found items in
+    the requested order (without duplicates) and the ids not found.
+    """
+    requested_ids = list(dict.fromkeys(item_ids))
+    found = {
+        item.id: item
+        for item in db.execute(
+            select(models.Item).where(
+                models.Item.id.in_(requested_ids), LIVE_ITEM
+            )
+        ).scalars()
+    }
+    items = [found[item_id] for item_id in requested_ids if item_id in found]
+    missing = [item_id for item_id in requested_ids if item_id not in found]
+    return items, missing
+
+
 def get_item_by_name(db: Session, name: str) -> Optional[models.Item]:
     """
     Retrieve an item by its name.
     """
-    return db.query(models.Item).filter(models.Item.name == name).first()
+    return db.execute(ITEM_BY_NAME, {"name": name}).scalars().first()
+
+
+@lru_cache(maxsize=64)
+def _item_by_id_statement(fields: Tuple[str, ...]) -> Select:
+    """
+    Build the statement selecting a live item by ID, once per sparse
+    fieldset.
+    """
+    return select(*_projection(models.Item, list(fields))).where(
+        models.Item.id == bindparam("item_id"), LIVE_ITEM
+    ).limit(1)
 
 
-def get_all_items_query(db: Session) -> Query:
+def get_all_items_query(
+        db: Session,
+        fields: Optional[List[str]] = None
+) -> Query:
     """
-    Retrieve all items query.
+    Retrieve all live items query, selecting only ``fields`` if given.
     """
-    return db.query(models.Item)
+    return db.query(*_projection(models.Item, fields)).filter(LIVE_ITEM)
 
 
 def validate_category_exists(db: Session, category_name: str) -> None:
@@ -101,6 +195,231 @@ def validate_category_exists(db: Session, category_name: str) -> None:
         )
 
 
+def record_item_changes(db: Session, changes: List[dict]) -> None:
+    """
+    Append entries to the item change log in the caller's transaction,
+    so a change is logged exactly when it is committed.
+
+    Versions come from the counter row, which the transaction keeps
+    locked until it ends: a concurrent writer waits for it, so no
+    version can become visible after a higher one and be skipped by
+    clients that already moved past it. Since this serializes the item
+    writes of a world from here to their commit, call it as the last
+    statement before committing.
+    """
+    if not changes:
+        return
+
+    counter = models.ItemChangeCounter
+    statement = get_upsert_insert(db)(counter).values(
+        id=1, version=len(changes)
+    )
+    last = db.execute(
+        statement.on_conflict_do_update(
+            index_elements=["id"],
+            set_={"version": counter.version + statement.excluded.version}
+        ).returning(counter.version)
+    ).scalar_one()
+    first = last - len(changes) + 1
+    db.execute(insert(models.ItemChange), [
+        {**change, "version": first + offset}
+        for offset, change in enumerate(changes)
+    ])
+
+
+PRICE_RESOLUTIONS = ("hour", "day")
+
+
+def _bucket_start(moment: datetime, resolution: str) -> datetime:
+    """Return the start of the hour or day a moment falls in."""
+    if resolution == "hour":
+        return moment.replace(minute=0, second=0, microsecond=0)
+    return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _fold_candles(
+        db: Session,
+        table: type,
+        key: str,
+        points: List[Tuple[object, float]],
+        recorded_at: datetime
+) -> None:
+    """
+    Fold ``(key, price)`` points, in recording order, into the hourly
+    and daily candles of ``table`` with one upsert per resolution. A
+    point recorded before a candle's close, by a transaction that
+    committed late, leaves the close alone.
+    """
+    candles: Dict[object, dict] = {}
+    for key_value, price in points:
+        candle = candles.get(key_value)
+        if candle is None:
+            candles[key_value] = {
+                key: key_value, "open": price, "high": price, "low": price,
+                "close": price, "closed_at": recorded_at, "points": 1,
+            }
+        else:
+            candle["high"] = max(candle["high"], price)
+            candle["low"] = min(candle["low"], price)
+            candle["close"] = price
+            candle["points"] += 1
+
+    for resolution in PRICE_RESOLUTIONS:
+        bucket_start = _bucket_start(recorded_at, resolution)
+        statement = get_upsert_insert(db)(table).values([
+            {**candle, "resolution": resolution, "bucket_start": bucket_start}
+            for candle in candles.values()
+        ])
+        excluded = statement.excluded
+        is_later = excluded.closed_at >= table.closed_at
+        db.execute(statement.on_conflict_do_update(
+            index_elements=[key, "resolution", "bucket_start"],
+            set_={
+                "high": case(
+                    (excluded.high > table.high, excluded.high),
+                    else_=table.high
+                ),
+                "low": case(
+                    (excluded.low < table.low, excluded.low),
+                    else_=table.low
+                ),
+                "close": case(
+                    (is_later, excluded.close), else_=table.close
+                ),
+                "closed_at": case(
+                    (is_later, excluded.closed_at), else_=table.closed_at
+                ),
+                "points": table.points + excluded.points,
+            }
+        ))
+
+
+def record_price_points(
+        db: Session,
+        points: List[Tuple[int, str, float]],
+        recorded_at: Optional[datetime] = None
+) -> None:
+    """
+    Append ``(item_id, category, price)`` points to the price history
+    in the caller's transaction, and fold them into the hourly and
+    daily candles of their items and categories, so that range queries
+    read a few precomputed rows instead of every price point.
+    """
+    if not points:
+        return
+
+    recorded_at = recorded_at or datetime.now(tz=timezone.utc)
+    db.execute(insert(models.ItemPrice), [
+        {"item_id": item_id, "price": price, "recorded_at": recorded_at}
+        for item_id, _, price in points
+    ])
+    _fold_candles(
+        db, models.ItemPriceCandle, "item_id",
+        [(item_id, price) for item_id, _, price in points], recorded_at
+    )
+    _fold_candles(
+        db, models.CategoryPriceCandle, "category",
+        [(category, price) for _, category, price in points], recorded_at
+    )
+
+
+def get_price_candles(
+        db: Session,
+        table: type,
+        key: object,
+        resolution: str,
+        start: Optional[datetime],
+        end: Optional[datetime],
+        limit: int
+) -> List[object]:
+    """
+    Retrieve up to ``limit`` candles of an item (``ItemPriceCandle``
+    and its ID) or a category (``CategoryPriceCandle`` and its name)
+    starting in ``[start, end)``, oldest first. Without ``start``, the
+    latest candles are returned.
+    """
+    key_column = (
+        table.item_id if table is models.ItemPriceCandle else table.category
+    )
+    statement = select(table).where(
+        key_column == key, table.resolution == resolution
+    )
+    if start is not None:
+        statement = statement.where(table.bucket_start >= start)
+    if end is not None:
+        statement = statement.where(table.bucket_start < end)
+
+    if start is not None:
+        return db.execute(
+            statement.order_by(table.bucket_start).limit(limit)
+        ).scalars().all()
+
+    candles = db.execute(
+        statement.order_by(table.bucket_start.desc()).limit(limit)
+    ).scalars().all()
+    return candles[::-1]
+
+
+def get_item_changes(
+        db: Session,
+        since: int,
+        limit: int
+) -> Tuple[List[models.ItemChange], bool]:
+    """
+    Retrieve up to ``limit`` item changes newer than version ``since``,
+    and whether more are available.
+    """
+    changes = db.execute(
+        select(models.ItemChange)
+        .where(models.ItemChange.version > since)
+        .order_by(models.ItemChange.version)
+        .limit(limit + 1)
+    ).scalars().all()
+    return changes[:limit], len(changes) > limit
+
+
+def get_items_across_worlds(
+        session_factories: Dict[str, Callable[[], Session]],
+        after: Optional[Tuple[int, str]],
+        limit: int
+) -> Tuple[List[Tuple[str, models.Item]], bool]:
+    """
+    Retrieve up to ``limit`` live items of all worlds ordered by
+    ``(id, world)``, starting after the ``(id, world)`` key ``after``,
+    and whether more are available.
+
+    Each world's database is queried concurrently for its next
+    ``limit + 1`` items past the key, and the sorted results are
+    merged, so a page costs one indexed range scan per world.
+    """
+    def load_world(world: str) -> List[Tuple[int, str, models.Item]]:
+        statement = select(models.Item).where(LIVE_ITEM)
+        if after is not None:
+            after_id, after_world = after
+            # Within a world the key is the id alone: the rows of a
+            # world sorting after the cursor's may repeat its id.
+            statement = statement.where(
+                models.Item.id > after_id if world <= after_world
+                else models.Item.id >= after_id
+            )
+        with session_factories[world]() as db:
+            items = db.execute(
+                statement.order_by(models.Item.id).limit(limit + 1)
+            ).scalars().all()
+        return [(item.id, world, item) for item in items]
+
+    with ThreadPoolExecutor(max_workers=len(session_factories)) as pool:
+        pages = list(pool.map(load_world, session_factories))
+
+    merged = list(islice(
+        heapq.merge(*pages, key=lambda row: row[:2]), limit + 1
+    ))
+    return (
+        [(world, item) for _, world, item in merged[:limit]],
+        len(merged) > limit
+    )
+
+
 def create_item(
         db: Session,
         item: schemas.ItemCreate,
@@ -115,17 +434,24 @@ def create_item(
 
     validate_category_exists(db=db, category_name=item.category)
 
-    db_item = models.Item(
-        name=item.name,
-        description=item.description,
-        category=item.category,
-        quantity=item.quantity,
-        price=item.price,
-        creator_id=creator_id,
-    )
-    db.add(db_item)
+    db_item = db.execute(
+        insert(models.Item)
+        .values(
+            name=item.name,
+            description=item.description,
+            category=item.category,
+            quantity=item.quantity,
+            price=item.price,
+            creator_id=creator_id,
+        )
+        .returning(models.Item)
+    ).scalar_one()
+    if db_item.price is not None:
+        record_price_points(
+            db, [(db_item.id, db_item.category, db_item.price)]
+        )
+    record_item_changes(db, [{"item_id": db_item.id, "kind": "created"}])
     db.commit()
-    db.refresh(db_item)
     return db_item
 
 
@@ -137,27 +463,61 @@ def update_item_description(
     """
     Update the description of an existing item.
     """
-    db_item = db.query(models.Item).filter(models.Item.id == item_id).first()
+    if updated_item_data.description is None:
+        return get_item_by_id(db=db, item_id=item_id)
+
+    db_item = db.execute(
+        update(models.Item)
+        .where(models.Item.id == item_id, LIVE_ITEM)
+        .values(description=updated_item_data.description)
+        .returning(models.Item)
+    ).scalar_one_or_none()
     if not db_item:
         raise HTTPException(status_code=404, detail="Item not found.")
 
-    if updated_item_data.description is not None:
-        db_item.description = updated_item_data.description
-        db.commit()
-        db.refresh(db_item)
+    record_item_changes(db, [{"item_id": item_id, "kind": "updated"}])
+    db.commit()
+    return db_item
+
+
+def update_item_price(
+        db: Session,
+        item_id: int,
+        price: float
+) -> models.Item:
+    """
+    Change the price of an item and record it in the price history.
+    """
+    db_item = db.execute(
+        update(models.Item)
+        .where(models.Item.id == item_id, LIVE_ITEM)
+        .values(price=price)
+        .returning(models.Item)
+    ).scalar_one_or_none()
+    if not db_item:
+        raise HTTPException(status_code=404, detail="Item not found.")
 
+    record_price_points(db, [(item_id, db_item.category, price)])
+    record_item_changes(db, [{"item_id": item_id, "kind": "updated"}])
+    db.commit()
     return db_item
 
 
 def delete_item(db: Session, item_id: int) -> models.Item:
     """
-    Delete an item by its ID.
+    Delete an item by its ID. The row is only marked as deleted;
+    ``archive_deleted_items`` moves it out of the table later.
     """
-    db_item = db.query(models.Item).filter(models.Item.id == item_id).first()
+    db_item = db.execute(
+        update(models.Item)
+        .where(models.Item.id == item_id, LIVE_ITEM)
+        .values(deleted_at=func.now())
+        .returning(models.Item)
+    ).scalar_one_or_none()
     if not db_item:
         raise HTTPException(status_code=404, detail="Item not found.")
 
-    db.delete(db_item)
+    record_item_changes(db, [{"item_id": item_id, "kind": "deleted"}])
     db.commit()
     return db_item
 
@@ -168,20 +528,51 @@ def add_item_to_inventory(
         item_id: int
 ) -> models.Item:
     """
-    Assign an item to the user's inventory.
+    Assign an unowned item to the user's inventory.
+
+    The claim is a single conditional UPDATE guarded by
+    ``owner_id IS NULL``, so of several concurrent claims on the same
+    item exactly one wins and the others get a 409 instead of silently
+    overwriting it.
     """
-    item = db.query(models.Item).filter(models.Item.id == item_id).first()
-    if not item:
-        raise HTTPException(status_code=404, detail="Item not found.")
+    item = db.execute(
+        update(models.Item)
+        .where(
+            models.Item.id == item_id,
+            models.Item.owner_id.is_(None),
+            LIVE_ITEM
+        )
+        .values(owner_id=user_id)
+        .returning(models.Item)
+    ).scalar_one_or_none()
+
+    if item is None:
+        owner = db.execute(
+            select(models.Item.owner_id)
+            .where(models.Item.id == item_id, LIVE_ITEM)
+        ).one_or_none()
+        if owner is None:
+            raise HTTPException(status_code=404, detail="Item not found.")
+
+        if owner.owner_id == user_id:
+            raise HTTPException(
+                status_code=400, detail="Item already in user's inventory."
+            )
 
-    if item.owner_id == user_id:
         raise HTTPException(
-            status_code=400, detail="Item already in user's inventory."
+            status_code=409, detail="Item is owned by another user."
         )
 
-    item.owner_id = user_id
+    record_item_changes(db, [
+        {"item_id": item_id, "kind": "owner_changed", "owner_id": user_id}
+    ])
     db.commit()
-    db.refresh(item)
+    publish_owner_change(
+        item_id=item_id,
+        previous_owner_id=None,
+        owner_id=user_id,
+        world=session_world(db)
+    )
     return item
 
 
@@ -192,16 +583,491 @@ def remove_item_from_inventory(
 ) -> models.Item:
     """
     Remove an item from the user's inventory.
+
+    Like ``add_item_to_inventory`` this is one conditional UPDATE, so it
+    cannot release an item that another request has just claimed.
     """
-    item = db.query(models.Item).filter(
-        models.Item.id == item_id, models.Item.owner_id == user_id
-    ).first()
-    if not item:
+    item = db.execute(
+        update(models.Item)
+        .where(
+            models.Item.id == item_id,
+            models.Item.owner_id == user_id,
+            LIVE_ITEM
+        )
+        .values(owner_id=None)
+        .returning(models.Item)
+    ).scalar_one_or_none()
+    if item is None:
         raise HTTPException(
             status_code=404, detail="Item not found in user's inventory."
         )
 
-    item.owner_id = None
+    record_item_changes(db, [
+        {"item_id": item_id, "kind": "owner_changed", "owner_id": None}
+    ])
     db.commit()
-    db.refresh(item)
+    publish_owner_change(
+        item_id=item_id,
+        previous_owner_id=user_id,
+        owner_id=None,
+        world=session_world(db)
+    )
     return item
+
+
+def _count_owned_items(
+        db: Session,
+        owner_id: int,
+        item_ids: List[int]
+) -> int:
+    """
+    Count how many of the given items belong to the owner.
+    """
+    if not item_ids:
+        return 0
+
+    return db.execute(
+        select(func.count()).select_from(models.Item).where(
+            models.Item.id.in_(item_ids),
+            models.Item.owner_id == owner_id,
+            LIVE_ITEM
+        )
+    ).scalar_one()
+
+
+def get_user_trades_query(db: Session, user_id: int) -> Query:
+    """
+    Retrieve pending trades the user takes part in.
+    """
+    return db.query(models.Trade).filter(
+        models.Trade.status == "pending",
+        or_(
+            models.Trade.proposer_id == user_id,
+            models.Trade.partner_id == user_id
+        )
+    ).order_by(models.Trade.id)
+
+
+def create_trade(
+        db: Session,
+        proposer_id: int,
+        trade: schemas.TradeCreate
+) -> models.Trade:
+    """
+    Offer a trade to another user. Nothing changes hands until
+    the partner accepts it.
+    """
+    offered = set(trade.offered_item_ids)
+    requested = set(trade.requested_item_ids)
+
+    if trade.partner_id == proposer_id:
+        raise HTTPException(
+            status_code=400, detail="You cannot trade with yourself."
+        )
+
+    if not offered and not requested:
+        raise HTTPException(
+            status_code=400, detail="Trade must contain at least one item."
+        )
+
+    if not db.get(User, trade.partner_id):
+        raise HTTPException(status_code=404, detail="Trade partner not found.")
+
+    if _count_owned_items(db, proposer_id, list(offered)) != len(offered):
+        raise HTTPException(
+            status_code=400,
+            detail="Offered items must be in your inventory."
+        )
+
+    if _count_owned_items(
+            db, trade.partner_id, list(requested)
+    ) != len(requested):
+        raise HTTPException(
+            status_code=400,
+            detail="Requested items must be in the partner's inventory."
+        )
+
+    db_trade = models.Trade(
+        proposer_id=proposer_id,
+        partner_id=trade.partner_id,
+        status="pending",
+        items=[
+            models.TradeItem(item_id=item_id, giver_id=proposer_id)
+            for item_id in sorted(offered)
+        ] + [
+            models.TradeItem(item_id=item_id, giver_id=trade.partner_id)
+            for item_id in sorted(requested)
+        ],
+    )
+    db.add(db_trade)
+    db.commit()
+    return db_trade
+
+
+def _get_pending_trade(
+        db: Session,
+        trade_id: int,
+        user_id: int
+) -> models.Trade:
+    """
+    Retrieve a pending trade the user takes part in, locking its row.
+    """
+    db_trade = db.execute(
+        select(models.Trade)
+        .where(
+            models.Trade.id == trade_id,
+            or_(
+                models.Trade.proposer_id == user_id,
+                models.Trade.partner_id == user_id
+            )
+        )
+        .with_for_update()
+    ).scalar_one_or_none()
+    if not db_trade:
+        raise HTTPException(status_code=404, detail="Trade not found.")
+
+    if db_trade.status != "pending":
+        raise HTTPException(
+            status_code=400, detail="Trade is no longer pending."
+        )
+
+    return db_trade
+
+
+def accept_trade(db: Session, trade_id: int, user_id: int) -> models.Trade:
+    """
+    Accept a trade offer and swap the items in a single transaction.
+
+    The trade row and then the item rows (in id order) are locked before
+    two set-based UPDATEs move the items, so concurrent trades touching
+    the same items always lock in the same order and cannot deadlock.
+    If any item changed hands since the offer was made, nothing moves.
+    """
+    db_trade = _get_pending_trade(db=db, trade_id=trade_id, user_id=user_id)
+    if db_trade.partner_id != user_id:
+        raise HTTPException(
+            status_code=403, detail="Only the trade partner can accept it."
+        )
+
+    given = {db_trade.proposer_id: [], db_trade.partner_id: []}
+    for trade_item in db_trade.items:
+        given[trade_item.giver_id].append(trade_item.item_id)
+
+    db.execute(
+        select(models.Item.id)
+        .where(models.Item.id.in_([i.item_id for i in db_trade.items]))
+        .order_by(models.Item.id)
+        .with_for_update()
+    ).all()
+
+    receivers = {
+        db_trade.proposer_id: db_trade.partner_id,
+        db_trade.partner_id: db_trade.proposer_id,
+    }
+    with db.begin_nested():
+        for giver_id, item_ids in given.items():
+            if not item_ids:
+                continue
+
+            result = db.execute(
+                update(models.Item)
+                .where(
+                    models.Item.id.in_(item_ids),
+                    models.Item.owner_id == giver_id,
+                    LIVE_ITEM
+                )
+                .values(owner_id=receivers[giver_id])
+            )
+            if result.rowcount != len(item_ids):
+                raise HTTPException(
+                    status_code=409,
+                    detail="Some items in this trade have changed hands."
+                )
+
+    db_trade.status = "accepted"
+    db.flush()
+    record_item_changes(db, [
+        {
+            "item_id": item_id,
+            "kind": "owner_changed",
+            "owner_id": receivers[giver_id]
+        }
+        for giver_id, item_ids in given.items()
+        for item_id in item_ids
+    ])
+    db.commit()
+    for giver_id, item_ids in given.items():
+        for item_id in item_ids:
+            publish_owner_change(
+                item_id=item_id,
+                previous_owner_id=giver_id,
+                owner_id=receivers[giver_id],
+                world=session_world(db)
+            )
+    return db_trade
+
+
+def cancel_trade(db: Session, trade_id: int, user_id: int) -> models.Trade:
+    """
+    Cancel or decline a pending trade. Either side may do so.
+    """
+    db_trade = _get_pending_trade(db=db, trade_id=trade_id, user_id=user_id)
+    db_trade.status = "cancelled"
+    db.commit()
+    return db_trade
+
+
+def _merge_changes(changes: List[schemas.HoldingChange]) -> Dict[int, int]:
+    """
+    Sum the requested quantities per item.
+    """
+    amounts = {}
+    for change in changes:
+        amounts[change.item_id] = (
+            amounts.get(change.item_id, 0) + change.quantity
+        )
+    return amounts
+
+
+def _add_to_holding(
+        db: Session,
+        user_id: int,
+        item_id: int,
+        quantity: int
+) -> models.Holding:
+    """
+    Atomically add units to a user's stack, creating it if needed.
+    """
+    statement = get_upsert_insert(db)(models.Holding).values(
+        user_id=user_id, item_id=item_id, quantity=quantity
+    )
+    statement = statement.on_conflict_do_update(
+        index_elements=[models.Holding.user_id, models.Holding.item_id],
+        set_={
+            "quantity": models.Holding.quantity + statement.excluded.quantity
+        }
+    ).returning(models.Holding)
+
+    return db.execute(
+        statement, execution_options={"populate_existing": True}
+    ).scalar_one()
+
+
+def _take_from_holdings(
+        db: Session,
+        user_id: int,
+        amounts: Dict[int, int]
+) -> None:
+    """
+    Atomically take units from several of a user's stacks in one UPDATE.
+    Nothing is taken unless every stack holds enough.
+    """
+    needed = case(amounts, value=models.Holding.item_id)
+    with db.begin_nested():
+        result = db.execute(
+            update(models.Holding)
+            .where(
+                models.Holding.user_id == user_id,
+                models.Holding.item_id.in_(amounts),
+                models.Holding.quantity >= needed
+            )
+            .values(quantity=models.Holding.quantity - needed)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount != len(amounts):
+            raise HTTPException(
+                status_code=400, detail="Not enough items in inventory."
+            )
+
+
+def get_user_holdings_query(db: Session, user_id: int) -> Query:
+    """
+    Retrieve the user's non-empty stacks of live items query.
+    """
+    return db.query(models.Holding).join(
+        models.Item, models.Item.id == models.Holding.item_id
+    ).filter(
+        models.Holding.user_id == user_id,
+        models.Holding.quantity > 0,
+        LIVE_ITEM
+    ).order_by(models.Holding.item_id)
+
+
+def _take_from_stock(db: Session, item_id: int, quantity: int) -> None:
+    """
+    Atomically take units of an item from its stock.
+    """
+    taken = db.execute(
+        update(models.Item)
+        .where(
+            models.Item.id == item_id,
+            models.Item.quantity >= quantity,
+            LIVE_ITEM
+        )
+        .values(quantity=models.Item.quantity - quantity)
+        .returning(models.Item.id)
+    ).first()
+    if taken is None:
+        get_item_by_id(db=db, item_id=item_id, fields=["id"])
+
+        raise HTTPException(
+            status_code=400, detail="Not enough items in stock."
+        )
+
+
+def acquire_item_stack(
+        db: Session,
+        user_id: int,
+        item_id: int,
+        quantity: int
+) -> models.Holding:
+    """
+    Move units of an item from its stock into the user's stack.
+    """
+    _take_from_stock(db=db, item_id=item_id, quantity=quantity)
+    holding = _add_to_holding(
+        db=db, user_id=user_id, item_id=item_id, quantity=quantity
+    )
+    record_item_changes(db, [{"item_id": item_id, "kind": "updated"}])
+    db.commit()
+    return holding
+
+
+def consume_holdings(
+        db: Session,
+        user_id: int,
+        consume: schemas.HoldingsConsume
+) -> List[models.Holding]:
+    """
+    Use up units from one or more of the user's stacks.
+    """
+    amounts = _merge_changes(consume.items)
+    _take_from_holdings(db=db, user_id=user_id, amounts=amounts)
+    db.commit()
+
+    return db.query(models.Holding).filter(
+        models.Holding.user_id == user_id,
+        models.Holding.item_id.in_(amounts)
+    ).order_by(models.Holding.item_id).all()
+
+
+def get_recipes_query(db: Session) -> Query:
+    """
+    Retrieve the crafting recipes of live items query.
+    """
+    return db.query(models.Recipe).join(
+        models.Item, models.Item.id == models.Recipe.item_id
+    ).filter(LIVE_ITEM).order_by(models.Recipe.id)
+
+
+def create_recipe(
+        db: Session,
+        recipe: schemas.RecipeCreate
+) -> models.Recipe:
+    """
+    Create a crafting recipe. A recipe may not consume the item it
+    produces, and every item involved must exist.
+    """
+    ingredients = _merge_changes(recipe.ingredients)
+    if recipe.item_id in ingredients:
+        raise HTTPException(
+            status_code=400,
+            detail="A recipe cannot consume the item it produces."
+        )
+
+    item_ids = {recipe.item_id, *ingredients}
+    found = db.execute(
+        select(models.Item.id).where(models.Item.id.in_(item_ids), LIVE_ITEM)
+    ).scalars().all()
+    if len(found) != len(item_ids):
+        raise HTTPException(status_code=404, detail="Item not found.")
+
+    db_recipe = models.Recipe(
+        item_id=recipe.item_id,
+        quantity=recipe.quantity,
+        ingredients=[
+            models.RecipeIngredient(item_id=item_id, quantity=quantity)
+            for item_id, quantity in sorted(ingredients.items())
+        ]
+    )
+    db.add(db_recipe)
+    db.commit()
+    return db_recipe
+
+
+def craft_item(
+        db: Session,
+        user_id: int,
+        craft: schemas.CraftRequest
+) -> models.Holding:
+    """
+    Craft a recipe ``count`` times in one transaction: consume its
+    ingredients from the user's stacks and move the units it produces
+    from the item's stock into the user's stack.
+    """
+    recipe = db.get(models.Recipe, craft.recipe_id)
+    if not recipe:
+        raise HTTPException(status_code=404, detail="Recipe not found.")
+
+    _take_from_holdings(
+        db=db,
+        user_id=user_id,
+        amounts={
+            ingredient.item_id: ingredient.quantity * craft.count
+            for ingredient in recipe.ingredients
+        }
+    )
+    produced = recipe.quantity * craft.count
+    _take_from_stock(db=db, item_id=recipe.item_id, quantity=produced)
+    holding = _add_to_holding(
+        db=db, user_id=user_id, item_id=recipe.item_id, quantity=produced
+    )
+    record_item_changes(db, [{"item_id": recipe.item_id, "kind": "updated"}])
+    db.commit()
+    return holding
+
+
+def archive_deleted_items(
+        db: Session,
+        deleted_before: datetime,
+        batch_size: int = 1000,
+        on_batch: Optional[Callable[[int], None]] = None
+) -> int:
+    """
+    Move items deleted before ``deleted_before`` into the archive table,
+    committing after every ``batch_size`` rows so that each transaction
+    stays short. ``on_batch`` is called with the running total after
+    each batch. Returns the number of archived items.
+    """
+    columns = [column.name for column in models.ItemArchive.__table__.c]
+    columns.remove("archived_at")
+    items = models.Item.__table__.c
+
+    archived = 0
+    while True:
+        item_ids = db.execute(
+            select(models.Item.id)
+            .where(models.Item.deleted_at < deleted_before)
+            .order_by(models.Item.id)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        ).scalars().all()
+        if not item_ids:
+            return archived
+
+        db.execute(
+            insert(models.ItemArchive).from_select(
+                columns,
+                select(*[items[column] for column in columns])
+                .where(items.id.in_(item_ids))
+            )
+        )
+        db.execute(
+            delete(models.Item)
+            .where(models.Item.id.in_(item_ids))
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+        archived += len(item_ids)
+        if on_batch is not None:
+            on_batch(archived)
@@ -0,0 +1,168 @@
+import asyncio
+import json
+import threading
+from typing import AsyncIterator, Dict, Optional, Set
+
+from config import DEFAULT_WORLD, EVENTS_HEARTBEAT_SECONDS, EVENTS_QUEUE_SIZE
+
+
+class Subscription:
+    """
+    One connection's feed of a user's events.
+
+    Events are buffered in a bounded queue owned by the connection's
+    event loop. A consumer that falls ``max_queue`` events behind is
+    evicted: its buffer is dropped and ``get`` returns ``None``, after
+    which the client should reconnect and catch up from the change log.
+    """
+
+    def __init__(
+            self,
+            hub: "EventHub",
+            user_id: int,
+            loop: asyncio.AbstractEventLoop,
+            max_queue: int
+    ) -> None:
+        self.hub = hub
+        self.user_id = user_id
+        self.loop = loop
+        self.evicted = False
+        self._queue = asyncio.Queue(maxsize=max_queue)
+
+    async def get(self) -> Optional[dict]:
+        """Wait for the next event, or ``None`` once evicted."""
+        return await self._queue.get()
+
+    def _deliver(self, event: dict) -> None:
+        """Queue an event; runs on the subscription's event loop."""
+        if self.evicted:
+            return
+
+        try:
+            self._queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.evicted = True
+            self.hub.unsubscribe(self)
+            while not self._queue.empty():
+                self._queue.get_nowait()
+            self._queue.put_nowait(None)
+
+
+class EventHub:
+    """
+    In-process publish/subscribe of per-user events.
+
+    ``publish`` may be called from any thread, such as the threadpool
+    running the synchronous CRUD functions; delivery is handed to each
+    subscriber's event loop, so idle connections cost a queue each and
+    no thread.
+    """
+
+    def __init__(self, max_queue: int = 64) -> None:
+        self.max_queue = max_queue
+        self.evictions = 0
+        self._subscriptions: Dict[int, Set[Subscription]] = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, user_id: int) -> Subscription:
+        """Start receiving the user's events on the running event loop."""
+        subscription = Subscription(
+            hub=self,
+            user_id=user_id,
+            loop=asyncio.get_running_loop(),
+            max_queue=self.max_queue
+        )
+        with self._lock:
+            self._subscriptions.setdefault(user_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        """Stop delivering events to a subscription."""
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.user_id)
+            if subscriptions is None or subscription not in subscriptions:
+                return
+
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del self._subscriptions[subscription.user_id]
+            if subscription.evicted:
+                self.evictions += 1
+
+    def publish(self, user_id: int, event: dict) -> None:
+        """Send an event to every connection of the user."""
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(user_id, ()))
+
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(
+                    subscription._deliver, event
+                )
+            except RuntimeError:
+                # The connection's event loop has shut down.
+                self.unsubscribe(subscription)
+
+    def connection_count(self) -> int:
+        """Return the number of open subscriptions."""
+        with self._lock:
+            return sum(len(subs) for subs in self._subscriptions.values())
+
+
+inventory_events = EventHub(max_queue=EVENTS_QUEUE_SIZE)
+
+_world_hubs: Dict[str, EventHub] = {DEFAULT_WORLD: inventory_events}
+_world_hubs_lock = threading.Lock()
+
+
+def world_events(world: str) -> EventHub:
+    """
+    Return the hub of a world's events; user IDs are only unique within
+    a world. The default world's hub is ``inventory_events``.
+    """
+    with _world_hubs_lock:
+        hub = _world_hubs.get(world)
+        if hub is None:
+            hub = _world_hubs[world] = EventHub(max_queue=EVENTS_QUEUE_SIZE)
+    return hub
+
+
+def publish_owner_change(
+        item_id: int,
+        previous_owner_id: Optional[int],
+        owner_id: Optional[int],
+        world: str = DEFAULT_WORLD
+) -> None:
+    """Notify the old and new owner that an item changed hands."""
+    hub = world_events(world)
+    if previous_owner_id is not None:
+        hub.publish(
+            previous_owner_id, {"type": "item_removed", "item_id": item_id}
+        )
+    if owner_id is not None:
+        hub.publish(owner_id, {"type": "item_added", "item_id": item_id})
+
+
+async def sse_stream(
+        subscription: Subscription,
+        heartbeat: float = EVENTS_HEARTBEAT_SECONDS
+) -> AsyncIterator[str]:
+    """
+    Format a subscription as a server-sent event stream, with a comment
+    every ``heartbeat`` seconds to keep idle connections open.
+    """
+    try:
+        while True:
+            try:
+                event = await asyncio.wait_for(subscription.get(), heartbeat)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+
+            if event is None:
+                yield "event: evicted\ndata: {}\n\n"
+                return
+
+            yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+    finally:
+        subscription.hub.unsubscribe(subscription)
@@ -1,4 +1,7 @@
-from sqlalchemy import Column, Integer, String, Text, Float, ForeignKey
+from sqlalchemy import (
+    CheckConstraint, Column, DateTime, Index, Integer, String, Text, Float,
+    ForeignKey, func, text
+)
 from sqlalchemy.orm import relationship
 
 from database import Base
@@ -18,12 +21,37 @@ class Item(Base):
     """
     Represents an item in the system, including relationships
     to the user who created it and its owner.
+
+    Deleted items keep their row with ``deleted_at`` set until they are
+    archived. Names are unique among live items only, and the indexes
+    used by live reads cover live rows only.
     """
 
     __tablename__ = "items"
+    __table_args__ = (
+        Index(
+            "uq_items_name_live",
+            "name",
+            unique=True,
+            postgresql_where=text("deleted_at IS NULL"),
+            sqlite_where=text("deleted_at IS NULL"),
+        ),
+        Index(
+            "ix_items_live_owner_id",
+            "owner_id",
+            postgresql_where=text("deleted_at IS NULL"),
+            sqlite_where=text("deleted_at IS NULL"),
+        ),
+        Index(
+            "ix_items_deleted_at",
+            "deleted_at",
+            postgresql_where=text("deleted_at IS NOT NULL"),
+            sqlite_where=text("deleted_at IS NOT NULL"),
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    name = Column(String(255), unique=True, nullable=False)
+    name = Column(String(255), nullable=False)
     description = Column(Text)
     category = Column(String(255), nullable=False)
     quantity = Column(Integer)
@@ -38,3 +66,220 @@ class Item(Base):
     owner = relationship(
         "User", back_populates="inventory", foreign_keys=[owner_id]
     )
+
+    deleted_at = Column(DateTime(timezone=True), nullable=True)
+
+
+class ItemArchive(Base):
+    """
+    Represents a deleted item moved out of ``items`` by the archival
+    job, so dead rows do not bloat the live table and its indexes.
+    """
+
+    __tablename__ = "items_archive"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    name = Column(String(255), nullable=False)
+    description = Column(Text)
+    category = Column(String(255), nullable=False)
+    quantity = Column(Integer)
+    price = Column(Float)
+    creator_id = Column(Integer, nullable=False)
+    owner_id = Column(Integer, nullable=True)
+    deleted_at = Column(DateTime(timezone=True), nullable=False)
+    archived_at = Column(
+        DateTime(timezone=True), nullable=False, server_default=func.now()
+    )
+
+
+class Trade(Base):
+    """
+    Represents a trade offer between two users. The offer is executed
+    in one transaction when the partner accepts it.
+    """
+
+    __tablename__ = "trades"
+
+    id = Column(Integer, primary_key=True, index=True)
+    proposer_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    partner_id = Column(
+        Integer, ForeignKey("users.id"), nullable=False, index=True
+    )
+    status = Column(String(20), nullable=False, default="pending")
+
+    items = relationship(
+        "TradeItem", back_populates="trade", cascade="all, delete-orphan"
+    )
+
+
+class TradeItem(Base):
+    """
+    Represents an item taking part in a trade and the user giving it away.
+    """
+
+    __tablename__ = "trade_items"
+
+    trade_id = Column(
+        Integer,
+        ForeignKey("trades.id", ondelete="CASCADE"),
+        primary_key=True
+    )
+    item_id = Column(
+        Integer,
+        ForeignKey("items.id", ondelete="CASCADE"),
+        primary_key=True
+    )
+    giver_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+
+    trade = relationship("Trade", back_populates="items")
+
+
+class Holding(Base):
+    """
+    Represents how many units of a stackable item a user holds,
+    so a stack of any size is a single row. Stacks are filled from the
+    item's stock and are separate from owning the item itself.
+    """
+
+    __tablename__ = "inventory_holdings"
+    __table_args__ = (
+        CheckConstraint("quantity >= 0", name="ck_holdings_quantity"),
+    )
+
+    user_id = Column(
+        Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True
+    )
+    item_id = Column(
+        Integer, ForeignKey("items.id", ondelete="CASCADE"), primary_key=True
+    )
+    quantity = Column(Integer, nullable=False, default=0)
+
+
+class Recipe(Base):
+    """
+    Represents a way of crafting ``quantity`` units of an item out of
+    units of other items.
+    """
+
+    __tablename__ = "recipes"
+    __table_args__ = (
+        CheckConstraint("quantity > 0", name="ck_recipes_quantity"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    item_id = Column(
+        Integer, ForeignKey("items.id", ondelete="CASCADE"), nullable=False
+    )
+    quantity = Column(Integer, nullable=False, default=1)
+
+    ingredients = relationship(
+        "RecipeIngredient",
+        lazy="selectin",
+        cascade="all, delete-orphan",
+        order_by="RecipeIngredient.item_id"
+    )
+
+
+class RecipeIngredient(Base):
+    """
+    Represents the units of an item a recipe consumes.
+    """
+
+    __tablename__ = "recipe_ingredients"
+    __table_args__ = (
+        CheckConstraint("quantity > 0", name="ck_recipe_ingredients_quantity"),
+    )
+
+    recipe_id = Column(
+        Integer, ForeignKey("recipes.id", ondelete="CASCADE"), primary_key=True
+    )
+    item_id = Column(
+        Integer, ForeignKey("items.id", ondelete="CASCADE"), primary_key=True
+    )
+    quantity = Column(Integer, nullable=False)
+
+
+class ItemChange(Base):
+    """
+    Represents one entry of the item change log. Versions increase
+    with every change, so clients can sync by asking for the changes
+    after the last version they have seen.
+    """
+
+    __tablename__ = "item_changes"
+
+    version = Column(Integer, primary_key=True, autoincrement=False)
+    item_id = Column(Integer, nullable=False)
+    kind = Column(String(20), nullable=False)
+    owner_id = Column(Integer, nullable=True)
+    changed_at = Column(
+        DateTime(timezone=True), nullable=False, server_default=func.now()
+    )
+
+
+class ItemChangeCounter(Base):
+    """
+    Holds the last version given to an item change. Writers bump it in
+    their own transaction, so its row stays locked until they commit
+    and versions become visible in the order they were given out.
+    """
+
+    __tablename__ = "item_change_counter"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    version = Column(Integer, nullable=False)
+
+
+class ItemPrice(Base):
+    """
+    Represents a price an item was given. The item's prices are
+    its history; ``Item.price`` is the latest one.
+    """
+
+    __tablename__ = "item_prices"
+    __table_args__ = (
+        Index("ix_item_prices_item_id_recorded_at", "item_id", "recorded_at"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    item_id = Column(Integer, nullable=False)
+    price = Column(Float, nullable=False)
+    recorded_at = Column(DateTime(timezone=True), nullable=False)
+
+
+class ItemPriceCandle(Base):
+    """
+    Represents the open, high, low and close price of an item over one
+    hour or day, updated as prices are recorded.
+    """
+
+    __tablename__ = "item_price_candles"
+
+    item_id = Column(Integer, primary_key=True)
+    resolution = Column(String(4), primary_key=True)
+    bucket_start = Column(DateTime(timezone=True), primary_key=True)
+    open = Column(Float, nullable=False)
+    high = Column(Float, nullable=False)
+    low = Column(Float, nullable=False)
+    close = Column(Float, nullable=False)
+    closed_at = Column(DateTime(timezone=True), nullable=False)
+    points = Column(Integer, nullable=False)
+
+
+class CategoryPriceCandle(Base):
+    """
+    Represents the open, high, low and close price of the items of a
+    category over one hour or day, updated as prices are recorded.
+    """
+
+    __tablename__ = "category_price_candles"
+
+    category = Column(String(255), primary_key=True)
+    resolution = Column(String(4), primary_key=True)
+    bucket_start = Column(DateTime(timezone=True), primary_key=True)
+    open = Column(Float, nullable=False)
+    high = Column(Float, nullable=False)
+    low = Column(Float, nullable=False)
+    close = Column(Float, nullable=False)
+    closed_at = Column(DateTime(timezone=True), nullable=False)
+    points = Column(Integer, nullable=False)
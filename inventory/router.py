@@ -1,32 +1,116 @@
-from fastapi import APIRouter, Depends, Request
+from datetime import datetime
+from typing import Callable, List, Optional, Type
+
+import anyio
+from fastapi import (
+    APIRouter, Depends, HTTPException, Request, WebSocket, status
+)
+from fastapi.responses import Response, StreamingResponse
+from pydantic import BaseModel
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import HTTPConnection
 
-from database import get_db
+from config import SINGLEFLIGHT_MAX_WAIT_MS
+from database import get_db, get_world, shards
 from inventory import crud, models, schemas
+from inventory.archival import ARCHIVE_JOB_TYPE
+from inventory.batching import claim_batchers
+from inventory.events import sse_stream, world_events
+from jobs import crud as jobs_crud
+from jobs.schemas import JobRead
 from pagination import paginate, PaginatedResponse
-from users.auth import get_current_user
+from singleflight import SingleFlight
+from users.auth import (
+    authenticate_token, get_current_superuser, get_current_token_user,
+    get_current_user
+)
 from users.models import User
+from users.schemas import TokenUser
 
 
 router = APIRouter()
 
+list_reads = SingleFlight(max_wait=SINGLEFLIGHT_MAX_WAIT_MS / 1000)
+
+
+def _read_page(
+        request: Request,
+        response_type: Type[BaseModel],
+        load: Callable[[], PaginatedResponse]
+) -> Response:
+    """
+    Load and serialize a list page, sharing the work with identical
+    requests for the same world already in flight.
+    """
+    def load_json() -> bytes:
+        page = response_type.model_validate(load(), from_attributes=True)
+        return page.model_dump_json(exclude_unset=True).encode()
+
+    return Response(
+        content=list_reads.do(
+            (get_world(request), str(request.url)), load_json
+        ),
+        media_type="application/json"
+    )
+
+
+def _parse_fields(
+        fields: Optional[str],
+        schema: Type[BaseModel]
+) -> Optional[List[str]]:
+    """
+    Turn a comma-separated ``fields`` parameter into a list of columns
+    to select, always starting with ``id``.
+    """
+    if not fields:
+        return None
+
+    requested = [field.strip() for field in fields.split(",")]
+    requested = [field for field in requested if field]
+    unknown = [
+        field for field in requested if field not in schema.model_fields
+    ]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail={
+                "message": f"Unknown fields: {', '.join(unknown)}.",
+                "allowed_fields": list(schema.model_fields),
+            }
+        )
+
+    return list(dict.fromkeys(["id"] + requested))
+
 
 @router.get(
     "/categories/",
-    response_model=PaginatedResponse[schemas.Category],
+    response_model=PaginatedResponse[schemas.CategoryPartial],
+    response_model_exclude_unset=True,
     tags=["categories"]
 )
 def read_all_categories(
         page: int = 1,
         limit: int = 5,
+        fields: Optional[str] = None,
         db: Session = Depends(get_db),
         request: Request = None
-) -> PaginatedResponse[schemas.Category]:
+) -> Response:
     """
-    Retrieve a paginated list of categories.
+    Retrieve a paginated list of categories. Pass ``fields`` as
+    a comma-separated list to return only those fields.
     """
-    query = crud.get_all_categories_query(db=db)
-    return paginate(query=query, page=page, limit=limit, request=request)
+    field_names = _parse_fields(fields, schemas.Category)
+    return _read_page(
+        request=request,
+        response_type=PaginatedResponse[schemas.CategoryPartial],
+        load=lambda: paginate(
+            query=crud.get_all_categories_query(db=db, fields=field_names),
+            page=page,
+            limit=limit,
+            request=request
+        )
+    )
 
 
 @router.post(
@@ -62,35 +146,289 @@ def remove_category(
     return db_category
 
 
+PRICE_CANDLES_LIMIT = 1000
+
+
+def _read_candles(
+        db: Session,
+        table: type,
+        key: object,
+        resolution: str,
+        start: Optional[datetime],
+        end: Optional[datetime],
+        limit: int
+) -> schemas.PriceCandles:
+    """Validate a candle range request and load the candles."""
+    if resolution not in crud.PRICE_RESOLUTIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=(
+                "resolution must be one of: "
+                f"{', '.join(crud.PRICE_RESOLUTIONS)}."
+            )
+        )
+    if not 1 <= limit <= PRICE_CANDLES_LIMIT:
+        raise HTTPException(
+            status_code=400,
+            detail=f"limit must be between 1 and {PRICE_CANDLES_LIMIT}."
+        )
+    if start is not None and end is not None and start >= end:
+        raise HTTPException(
+            status_code=400, detail="start must be before end."
+        )
+
+    candles = crud.get_price_candles(
+        db=db,
+        table=table,
+        key=key,
+        resolution=resolution,
+        start=start,
+        end=end,
+        limit=limit
+    )
+    return schemas.PriceCandles(
+        resolution=resolution,
+        candles=[schemas.PriceCandle.model_validate(c) for c in candles]
+    )
+
+
 @router.get(
-    "/items/{item_id}", response_model=schemas.ItemRead, tags=["items"]
+    "/categories/{category_id}/prices",
+    response_model=schemas.PriceCandles,
+    tags=["categories"]
+)
+def read_category_prices(
+        category_id: int,
+        resolution: str = "hour",
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        limit: int = 168,
+        db: Session = Depends(get_db)
+) -> schemas.PriceCandles:
+    """
+    Retrieve the open, high, low and close prices of the category's
+    items per ``hour`` or ``day`` starting in ``[start, end)``, oldest
+    first; without ``start``, the latest ``limit`` periods.
+    """
+    db_category = db.get(models.Category, category_id)
+    if not db_category:
+        raise HTTPException(status_code=404, detail="Category not found.")
+
+    return _read_candles(
+        db=db,
+        table=models.CategoryPriceCandle,
+        key=db_category.name,
+        resolution=resolution,
+        start=start,
+        end=end,
+        limit=limit
+    )
+
+
+ITEM_BATCH_QUERY_LIMIT = 100
+ITEM_BATCH_BODY_LIMIT = 1000
+
+
+def _read_item_batch(
+        db: Session,
+        item_ids: List[int],
+        limit: int
+) -> schemas.ItemBatch:
+    """
+    Fetch up to ``limit`` items in one query.
+    """
+    if not item_ids or len(item_ids) > limit:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Provide between 1 and {limit} item IDs."
+        )
+
+    items, missing = crud.get_items_by_ids(db=db, item_ids=item_ids)
+    return schemas.ItemBatch(
+        items=[schemas.ItemRead.model_validate(item) for item in items],
+        missing=missing
+    )
+
+
+@router.get(
+    "/items/batch", response_model=schemas.ItemBatch, tags=["items"]
+)
+def read_item_batch(
+        ids: str,
+        db: Session = Depends(get_db)
+) -> schemas.ItemBatch:
+    """
+    Retrieve several items by a comma-separated list of IDs,
+    in the requested order.
+    """
+    try:
+        item_ids = [int(item_id) for item_id in ids.split(",") if item_id]
+    except ValueError:
+        raise HTTPException(
+            status_code=400, detail="IDs must be comma-separated integers."
+        )
+
+    return _read_item_batch(
+        db=db, item_ids=item_ids, limit=ITEM_BATCH_QUERY_LIMIT
+    )
+
+
+@router.post(
+    "/items/batch", response_model=schemas.ItemBatch, tags=["items"]
+)
+def read_item_batch_from_body(
+        batch: schemas.ItemBatchRequest,
+        db: Session = Depends(get_db)
+) -> schemas.ItemBatch:
+    """
+    Retrieve several items by a list of IDs in the request body,
+    for sets too large for a query string.
+    """
+    return _read_item_batch(
+        db=db, item_ids=batch.ids, limit=ITEM_BATCH_BODY_LIMIT
+    )
+
+
+ITEM_CHANGES_LIMIT = 1000
+
+
+@router.get(
+    "/items/changes",
+    response_model=schemas.ItemChangesPage,
+    tags=["items"]
+)
+def read_item_changes(
+        since: int = 0,
+        limit: int = 100,
+        db: Session = Depends(get_db)
+) -> schemas.ItemChangesPage:
+    """
+    Retrieve the item changes made after version ``since``, oldest
+    first. Pass ``next_since`` back as ``since`` to get the next page;
+    clients keep their copy of the catalog in sync this way instead of
+    re-reading every item.
+    """
+    if since < 0 or not 1 <= limit <= ITEM_CHANGES_LIMIT:
+        raise HTTPException(
+            status_code=400,
+            detail=(
+                "since must not be negative and limit must be between "
+                f"1 and {ITEM_CHANGES_LIMIT}."
+            )
+        )
+
+    changes, has_more = crud.get_item_changes(db=db, since=since, limit=limit)
+    return schemas.ItemChangesPage(
+        changes=[schemas.ItemChange.model_validate(c) for c in changes],
+        next_since=changes[-1].version if changes else since,
+        has_more=has_more
+    )
+
+
+@router.get(
+    "/items/{item_id}",
+    response_model=schemas.ItemPartial,
+    response_model_exclude_unset=True,
+    tags=["items"]
 )
 def read_item(
         item_id: int,
+        fields: Optional[str] = None,
         db: Session = Depends(get_db)
 ) -> models.Item:
     """
-    Retrieve an item by its ID.
+    Retrieve an item by its ID. Pass ``fields`` as a comma-separated
+    list to return only those fields.
     """
-    return crud.get_item_by_id(db=db, item_id=item_id)
+    return crud.get_item_by_id(
+        db=db,
+        item_id=item_id,
+        fields=_parse_fields(fields, schemas.ItemRead)
+    )
 
 
 @router.get(
     "/items/",
-    response_model=PaginatedResponse[schemas.ItemRead],
+    response_model=PaginatedResponse[schemas.ItemPartial],
+    response_model_exclude_unset=True,
     tags=["items"]
 )
 def read_all_items(
         page: int = 1,
         limit: int = 5,
+        fields: Optional[str] = None,
         db: Session = Depends(get_db),
         request: Request = None
-) -> PaginatedResponse[schemas.ItemRead]:
+) -> Response:
     """
-    Retrieve a paginated list of items.
+    Retrieve a paginated list of items. Pass ``fields`` as
+    a comma-separated list (e.g. ``fields=name,price``) to select
+    and return only those fields.
     """
-    query = crud.get_all_items_query(db=db)
-    return paginate(query=query, page=page, limit=limit, request=request)
+    field_names = _parse_fields(fields, schemas.ItemRead)
+    return _read_page(
+        request=request,
+        response_type=PaginatedResponse[schemas.ItemPartial],
+        load=lambda: paginate(
+            query=crud.get_all_items_query(db=db, fields=field_names),
+            page=page,
+            limit=limit,
+            request=request
+        )
+    )
+
+
+WORLD_ITEMS_LIMIT = 100
+
+
+@router.get(
+    "/worlds/items/",
+    response_model=schemas.WorldItemsPage,
+    tags=["items"]
+)
+def read_items_across_worlds(
+        after: Optional[str] = None,
+        limit: int = 20
+) -> schemas.WorldItemsPage:
+    """
+    Retrieve the items of every world, ordered by ID and world. Pass
+    ``next_after`` back as ``after`` to get the next page.
+    """
+    cursor = None
+    if after is not None:
+        after_id, _, after_world = after.partition(":")
+        if not after_id.isdigit() or not after_world:
+            raise HTTPException(
+                status_code=400, detail="after must be an ID:world pair."
+            )
+        cursor = (int(after_id), after_world)
+
+    if not 1 <= limit <= WORLD_ITEMS_LIMIT:
+        raise HTTPException(
+            status_code=400,
+            detail=f"limit must be between 1 and {WORLD_ITEMS_LIMIT}."
+        )
+
+    items, has_more = crud.get_items_across_worlds(
+        session_factories={
+            world: shards.session_factory(world) for world in shards.worlds
+        },
+        after=cursor,
+        limit=limit
+    )
+    return schemas.WorldItemsPage(
+        items=[
+            schemas.WorldItem(
+                world=world,
+                **schemas.ItemRead.model_validate(item).model_dump()
+            )
+            for world, item in items
+        ],
+        next_after=(
+            f"{items[-1][1].id}:{items[-1][0]}" if items else after
+        ),
+        has_more=has_more
+    )
 
 
 @router.post("/items/", response_model=schemas.ItemRead, tags=["items"])
@@ -105,6 +443,31 @@ def create_item(
     return crud.create_item(db=db, item=item, creator_id=current_user.id)
 
 
+@router.post(
+    "/items/archive",
+    response_model=JobRead,
+    status_code=202,
+    tags=["items"]
+)
+def archive_deleted_items(
+        after_days: Optional[int] = None,
+        db: Session = Depends(get_db),
+        current_user: User = Depends(get_current_superuser)
+) -> JobRead:
+    """
+    Start a background job moving items deleted more than
+    ``after_days`` ago into the archive. Follow it at ``/jobs/{id}``.
+    """
+    payload = {} if after_days is None else {"after_days": after_days}
+    job = jobs_crud.enqueue_job(
+        db=db,
+        job_type=ARCHIVE_JOB_TYPE,
+        payload=payload,
+        created_by=current_user.id
+    )
+    return JobRead.model_validate(job)
+
+
 @router.put(
     "/items/{item_id}",
     response_model=schemas.ItemRead,
@@ -125,6 +488,54 @@ def update_item(
     return db_item
 
 
+@router.put(
+    "/items/{item_id}/price",
+    response_model=schemas.ItemRead,
+    tags=["items"]
+)
+def update_item_price(
+        item_id: int,
+        item: schemas.ItemPriceUpdate,
+        db: Session = Depends(get_db),
+        current_user: User = Depends(get_current_user)
+) -> models.Item:
+    """
+    Change an item's price. Every price is kept in the item's history.
+    """
+    return crud.update_item_price(db=db, item_id=item_id, price=item.price)
+
+
+@router.get(
+    "/items/{item_id}/prices",
+    response_model=schemas.PriceCandles,
+    tags=["items"]
+)
+def read_item_prices(
+        item_id: int,
+        resolution: str = "hour",
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        limit: int = 168,
+        db: Session = Depends(get_db)
+) -> schemas.PriceCandles:
+    """
+    Retrieve the item's open, high, low and close prices per ``hour``
+    or ``day`` starting in ``[start, end)``, oldest first; without
+    ``start``, the latest ``limit`` periods.
+    """
+    crud.get_item_by_id(db=db, item_id=item_id, fields=["id"])
+
+    return _read_candles(
+        db=db,
+        table=models.ItemPriceCandle,
+        key=item_id,
+        resolution=resolution,
+        start=start,
+        end=end,
+        limit=limit
+    )
+
+
 @router.delete(
     "/items/{item_id}",
     response_model=schemas.ItemRead,
@@ -150,11 +561,16 @@ def remove_item(
 def assign_item_to_user_inventory(
     item_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    world: str = Depends(get_world)
 ) -> schemas.ItemRead:
     """
     Assign an item to the current user's inventory.
     """
+    claim_batcher = claim_batchers.get(world)
+    if claim_batcher is not None:
+        return claim_batcher.claim(user_id=current_user.id, item_id=item_id)
+
     item = crud.add_item_to_inventory(
         db=db, user_id=current_user.id, item_id=item_id
     )
@@ -174,3 +590,255 @@ def remove_item_from_user_inventory(
         db=db, user_id=current_user.id, item_id=item_id
     )
     return schemas.ItemRead.model_validate(item)
+
+
+def _stream_token(connection: HTTPConnection) -> str:
+    """
+    Read the access token of an event stream from the ``Authorization``
+    header or, for browser clients that cannot set headers on
+    ``EventSource`` and ``WebSocket``, from the ``token`` query parameter.
+    """
+    authorization = connection.headers.get("authorization", "")
+    if authorization[:7].lower() == "bearer ":
+        return authorization[7:]
+    return connection.query_params.get("token", "")
+
+
+@router.get("/inventory/events", tags=["inventory"])
+async def stream_inventory_events(request: Request) -> StreamingResponse:
+    """
+    Stream the current user's inventory changes as server-sent events
+    (``item_added`` and ``item_removed``).
+    """
+    world = get_world(request)
+    current_user = await run_in_threadpool(
+        authenticate_token, _stream_token(request), world
+    )
+    subscription = world_events(world).subscribe(current_user.id)
+    return StreamingResponse(
+        sse_stream(subscription),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.websocket("/inventory/events/ws")
+async def inventory_events_websocket(websocket: WebSocket) -> None:
+    """
+    Send the current user's inventory changes over a WebSocket as JSON
+    messages. A client that falls too far behind is disconnected with
+    code 1013 and should reconnect and catch up from ``/items/changes``.
+    """
+    try:
+        world = get_world(websocket)
+        current_user = await run_in_threadpool(
+            authenticate_token, _stream_token(websocket), world
+        )
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    subscription = world_events(world).subscribe(current_user.id)
+    try:
+        await websocket.accept()
+        async with anyio.create_task_group() as task_group:
+            async def watch_disconnect() -> None:
+                while (await websocket.receive())["type"] != (
+                        "websocket.disconnect"
+                ):
+                    pass
+                task_group.cancel_scope.cancel()
+
+            task_group.start_soon(watch_disconnect)
+            while True:
+                event = await subscription.get()
+                if event is None:
+                    await websocket.close(
+                        code=status.WS_1013_TRY_AGAIN_LATER
+                    )
+                    break
+                await websocket.send_json(event)
+            task_group.cancel_scope.cancel()
+    finally:
+        subscription.hub.unsubscribe(subscription)
+
+
+@router.get(
+    "/inventory/trades/",
+    response_model=PaginatedResponse[schemas.TradeRead],
+    tags=["inventory"]
+)
+def read_user_trades(
+        page: int = 1,
+        limit: int = 5,
+        db: Session = Depends(get_db),
+        current_user: TokenUser = Depends(get_current_token_user),
+        request: Request = None
+) -> PaginatedResponse[schemas.TradeRead]:
+    """
+    Retrieve a paginated list of the current user's pending trades.
+    """
+    query = crud.get_user_trades_query(db=db, user_id=current_user.id)
+    return paginate(query=query, page=page, limit=limit, request=request)
+
+
+@router.post(
+    "/inventory/trades/",
+    response_model=schemas.TradeRead,
+    tags=["inventory"]
+)
+def offer_trade(
+        trade: schemas.TradeCreate,
+        db: Session = Depends(get_db),
+        current_user: User = Depends(get_current_user)
+) -> models.Trade:
+    """
+    Offer a trade of items to another user.
+    """
+    return crud.create_trade(
+        db=db, proposer_id=current_user.id, trade=trade
+    )
+
+
+@router.post(
+    "/inventory/trades/{trade_id}/accept",
+    response_model=schemas.TradeRead,
+    tags=["inventory"]
+)
+def accept_trade(
+        trade_id: int,
+        db: Session = Depends(get_db),
+        current_user: User = Depends(get_current_user)
+) -> models.Trade:
+    """
+    Accept a trade offered to the current user, swapping the items.
+    """
+    return crud.accept_trade(
+        db=db, trade_id=trade_id, user_id=current_user.id
+    )
+
+
+@router.delete(
+    "/inventory/trades/{trade_id}",
+    response_model=schemas.TradeRead,
+    tags=["inventory"]
+)
+def cancel_trade(
+        trade_id: int,
+        db: Session = Depends(get_db),
+        current_user: User = Depends(get_current_user)
+) -> models.Trade:
+    """
+    Cancel or decline a pending trade.
+    """
+    return crud.cancel_trade(
+        db=db, trade_id=trade_id, user_id=current_user.id
+    )
+
+
+@router.get(
+    "/inventory/holdings/",
+    response_model=PaginatedResponse[schemas.Holding],
+    tags=["inventory"]
+)
+def read_user_holdings(
+        page: int = 1,
+        limit: int = 5,
+        db: Session = Depends(get_db),
+        current_user: TokenUser = Depends(get_current_token_user),
+        request: Request = None
+) -> PaginatedResponse[schemas.Holding]:
+    """
+    Retrieve a paginated list of the current user's item stacks.
+    """
+    query = crud.get_user_holdings_query(db=db, user_id=current_user.id)
+    return paginate(query=query, page=page, limit=limit, request=request)
+
+
+@router.post(
+    "/inventory/holdings/consume",
+    response_model=List[schemas.Holding],
+    tags=["inventory"]
+)
+def consume_holdings(
+        consume: schemas.HoldingsConsume,
+        db: Session = Depends(get_db),
+        current_user: User = Depends(get_current_user)
+) -> List[models.Holding]:
+    """
+    Use up units from the current user's item stacks.
+    """
+    return crud.consume_holdings(
+        db=db, user_id=current_user.id, consume=consume
+    )
+
+
+@router.get(
+    "/recipes/",
+    response_model=PaginatedResponse[schemas.Recipe],
+    tags=["recipes"]
+)
+def read_recipes(
+        page: int = 1,
+        limit: int = 5,
+        db: Session = Depends(get_db),
+        request: Request = None
+) -> PaginatedResponse[schemas.Recipe]:
+    """
+    Retrieve a paginated list of crafting recipes.
+    """
+    query = crud.get_recipes_query(db=db)
+    return paginate(query=query, page=page, limit=limit, request=request)
+
+
+@router.post("/recipes/", response_model=schemas.Recipe, tags=["recipes"])
+def create_recipe(
+        recipe: schemas.RecipeCreate,
+        db: Session = Depends(get_db),
+        current_user: User = Depends(get_current_superuser)
+) -> models.Recipe:
+    """
+    Create a crafting recipe (superusers only).
+    """
+    return crud.create_recipe(db=db, recipe=recipe)
+
+
+@router.post(
+    "/inventory/holdings/craft",
+    response_model=schemas.Holding,
+    tags=["inventory"]
+)
+def craft_item(
+        craft: schemas.CraftRequest,
+        db: Session = Depends(get_db),
+        current_user: User = Depends(get_current_user)
+) -> models.Holding:
+    """
+    Craft a recipe out of the current user's item stacks, taking the
+    crafted units from the item's stock.
+    """
+    return crud.craft_item(db=db, user_id=current_user.id, craft=craft)
+
+
+@router.post(
+    "/inventory/holdings/{item_id}",
+    response_model=schemas.Holding,
+    tags=["inventory"]
+)
+def acquire_item_stack(
+        item_id: int,
+        quantity: int = 1,
+        db: Session = Depends(get_db),
+        current_user: User = Depends(get_current_user)
+) -> models.Holding:
+    """
+    Take units of an item from its stock into the current user's stack.
+    """
+    if quantity < 1:
+        raise HTTPException(
+            status_code=400, detail="Quantity must be greater than 0."
+        )
+
+    return crud.acquire_item_stack(
+        db=db, user_id=current_user.id, item_id=item_id, quantity=quantity
+    )
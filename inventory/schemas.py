@@ -1,5 +1,6 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from datetime import datetime
+from typing import List, Optional
 
 
 class CategoryBase(BaseModel):
@@ -33,6 +34,15 @@ class Category(CategoryBase):
         }
 
 
+class CategoryPartial(BaseModel):
+    """Model for reading a Category restricted to the requested fields."""
+    id: int
+    name: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
+
 class ItemBase(BaseModel):
     """Base model for Item in a cyberpunk-themed game."""
     name: str
@@ -82,6 +92,69 @@ class ItemRead(ItemBase):
         }
 
 
+class ItemPartial(BaseModel):
+    """
+    Model for reading an Item restricted to the requested fields.
+    Fields that were not requested are left out of the response.
+    """
+    id: int
+    name: Optional[str] = None
+    description: Optional[str] = None
+    category: Optional[str] = None
+    quantity: Optional[int] = None
+    price: Optional[float] = None
+    creator_id: Optional[int] = None
+    owner_id: Optional[int] = None
+
+    class Config:
+        from_attributes = True
+        json_schema_extra = {
+            "example": {
+                "id": 101,
+                "name": "Laser Rifle",
+                "price": 3000.0
+            }
+        }
+
+
+class ItemBatchRequest(BaseModel):
+    """Model for requesting several items by ID."""
+    ids: List[int]
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "ids": [101, 102, 205]
+            }
+        }
+
+
+class ItemBatch(BaseModel):
+    """Model for several items fetched at once."""
+    items: List[ItemRead]
+    missing: List[int]
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "items": [
+                    {
+                        "id": 101,
+                        "name": "Laser Rifle",
+                        "description": "A high-tech weapon "
+                                       "capable of firing plasma rounds.",
+                        "category": "Weapon",
+                        "quantity": 5,
+                        "price": 3000.0,
+                        "creator_id": 1,
+                        "owner_id": 2
+                    }
+                ],
+                "missing": [102, 205]
+            }
+        }
+
+
 class ItemUpdateDescription(BaseModel):
     """Model for updating the description of an Item."""
     description: Optional[str] = None
@@ -92,3 +165,247 @@ class ItemUpdateDescription(BaseModel):
                 "description": "Updated description for the weapon."
             }
         }
+
+
+class ItemPriceUpdate(BaseModel):
+    """Model for changing the price of an Item."""
+    price: float = Field(ge=0)
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "price": 2499.99
+            }
+        }
+
+
+class TradeCreate(BaseModel):
+    """Model for offering a trade to another user."""
+    partner_id: int
+    offered_item_ids: List[int] = []
+    requested_item_ids: List[int] = []
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "partner_id": 2,
+                "offered_item_ids": [101, 102],
+                "requested_item_ids": [205]
+            }
+        }
+
+
+class TradeItem(BaseModel):
+    """Model representing an item in a trade and who gives it away."""
+    item_id: int
+    giver_id: int
+
+    class Config:
+        from_attributes = True
+
+
+class TradeRead(BaseModel):
+    """Model for reading a trade offer with its items."""
+    id: int
+    proposer_id: int
+    partner_id: int
+    status: str
+    items: List[TradeItem]
+
+    class Config:
+        from_attributes = True
+        json_schema_extra = {
+            "example": {
+                "id": 7,
+                "proposer_id": 1,
+                "partner_id": 2,
+                "status": "pending",
+                "items": [
+                    {"item_id": 101, "giver_id": 1},
+                    {"item_id": 102, "giver_id": 1},
+                    {"item_id": 205, "giver_id": 2}
+                ]
+            }
+        }
+
+
+class Holding(BaseModel):
+    """Model representing a stack of an item in a user's inventory."""
+    item_id: int
+    quantity: int
+
+    class Config:
+        from_attributes = True
+        json_schema_extra = {
+            "example": {
+                "item_id": 12,
+                "quantity": 999
+            }
+        }
+
+
+class HoldingChange(BaseModel):
+    """Model for a number of units of an item to add or take away."""
+    item_id: int
+    quantity: int = Field(gt=0)
+
+
+class HoldingsConsume(BaseModel):
+    """Model for consuming several stacks at once."""
+    items: List[HoldingChange] = Field(min_length=1)
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "items": [
+                    {"item_id": 12, "quantity": 30},
+                    {"item_id": 15, "quantity": 1}
+                ]
+            }
+        }
+
+
+class RecipeCreate(BaseModel):
+    """Model for creating a crafting recipe."""
+    item_id: int
+    quantity: int = Field(default=1, gt=0)
+    ingredients: List[HoldingChange] = Field(min_length=1)
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "item_id": 20,
+                "quantity": 1,
+                "ingredients": [
+                    {"item_id": 15, "quantity": 2},
+                    {"item_id": 16, "quantity": 1}
+                ]
+            }
+        }
+
+
+class Recipe(RecipeCreate):
+    """Model representing a crafting recipe."""
+    id: int
+
+    class Config:
+        from_attributes = True
+
+
+class CraftRequest(BaseModel):
+    """Model for crafting a recipe ``count`` times."""
+    recipe_id: int
+    count: int = Field(default=1, gt=0)
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "recipe_id": 3,
+                "count": 2
+            }
+        }
+
+
+class ItemChange(BaseModel):
+    """Model representing one change to an item."""
+    version: int
+    item_id: int
+    kind: str
+    owner_id: Optional[int] = None
+    changed_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class ItemChangesPage(BaseModel):
+    """Model representing a page of the item change log."""
+    changes: List[ItemChange]
+    next_since: int
+    has_more: bool
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "changes": [
+                    {
+                        "version": 42,
+                        "item_id": 101,
+                        "kind": "owner_changed",
+                        "owner_id": 2,
+                        "changed_at": "2026-10-19T12:00:00Z"
+                    }
+                ],
+                "next_since": 42,
+                "has_more": False
+            }
+        }
+
+
+class WorldItem(ItemRead):
+    """Model representing an item of a given world."""
+    world: str
+
+
+class WorldItemsPage(BaseModel):
+    """Model representing a page of items across all worlds."""
+    items: List[WorldItem]
+    next_after: Optional[str]
+    has_more: bool
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "items": [
+                    {
+                        "id": 7,
+                        "name": "Mantis Blades",
+                        "description": "Arm-mounted blades.",
+                        "category": "Cyberware",
+                        "quantity": 1,
+                        "price": 3000.0,
+                        "creator_id": 1,
+                        "owner_id": None,
+                        "world": "night-city"
+                    }
+                ],
+                "next_after": "7:night-city",
+                "has_more": True
+            }
+        }
+
+
+class PriceCandle(BaseModel):
+    """Model representing the prices of one hour or day."""
+    bucket_start: datetime
+    open: float
+    high: float
+    low: float
+    close: float
+    points: int
+
+    class Config:
+        from_attributes = True
+
+
+class PriceCandles(BaseModel):
+    """Model representing price candles, oldest first."""
+    resolution: str
+    candles: List[PriceCandle]
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "resolution": "hour",
+                "candles": [
+                    {
+                        "bucket_start": "2026-10-19T12:00:00Z",
+                        "open": 2400.0,
+                        "high": 2650.0,
+                        "low": 2350.0,
+                        "close": 2499.99,
+                        "points": 14
+                    }
+                ]
+            }
+        }
@@ -0,0 +1,190 @@
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+
+from fastapi import HTTPException
+from sqlalchemy import and_, insert, or_, select, update
+from sqlalchemy.orm import Session
+
+from jobs import models
+from jobs.registry import JOB_TYPES
+
+
+def enqueue_job(
+        db: Session,
+        job_type: str,
+        payload: Optional[dict] = None,
+        created_by: Optional[int] = None
+) -> models.Job:
+    """
+    Queue a job of a registered type for the workers.
+    """
+    if job_type not in JOB_TYPES:
+        raise ValueError(f"Unknown job type: {job_type}")
+
+    job = db.execute(
+        insert(models.Job)
+        .values(
+            type=job_type,
+            payload=payload or {},
+            status="queued",
+            max_attempts=JOB_TYPES[job_type].max_attempts,
+            created_by=created_by,
+        )
+        .returning(models.Job)
+    ).scalar_one()
+    db.commit()
+    return job
+
+
+def get_job(db: Session, job_id: int) -> models.Job:
+    """
+    Retrieve a job by its ID.
+    """
+    job = db.get(models.Job, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    return job
+
+
+def claim_job(
+        db: Session,
+        job_types: List[str],
+        lease_seconds: float
+) -> Optional[models.Job]:
+    """
+    Claim the next due job of the given types and lease it to the caller.
+
+    Rows locked by other workers are skipped (``SKIP LOCKED``), so
+    workers never wait on each other. A running job whose lease has
+    expired is claimed again, or failed if it has no attempts left.
+    """
+    while job_types:
+        now = datetime.now(tz=timezone.utc)
+        job = db.execute(
+            select(models.Job)
+            .where(
+                models.Job.type.in_(job_types),
+                or_(
+                    and_(
+                        models.Job.status == "queued",
+                        models.Job.run_after <= now
+                    ),
+                    and_(
+                        models.Job.status == "running",
+                        models.Job.locked_until < now
+                    ),
+                )
+            )
+            .order_by(models.Job.run_after, models.Job.id)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+        ).scalar_one_or_none()
+        if job is None:
+            db.commit()
+            return None
+
+        if job.attempts >= job.max_attempts:
+            job.status = "failed"
+            job.error = "The worker running the job stopped."
+            job.finished_at = now
+            job.locked_until = None
+            db.commit()
+            continue
+
+        job.status = "running"
+        job.attempts += 1
+        job.locked_until = now + timedelta(seconds=lease_seconds)
+        db.commit()
+        return job
+
+
+def _leased(job_id: int, attempt: int) -> tuple:
+    """
+    Match a job only while the given attempt still holds its lease. A
+    job claimed again after its lease expired has a higher attempt
+    number, so the earlier worker can no longer change it.
+    """
+    return (
+        models.Job.id == job_id,
+        models.Job.status == "running",
+        models.Job.attempts == attempt,
+    )
+
+
+def report_progress(
+        db: Session,
+        job_id: int,
+        attempt: int,
+        progress: float,
+        lease_seconds: float
+) -> bool:
+    """
+    Record a running job's progress and extend its lease. Returns
+    whether the attempt still held the lease.
+    """
+    updated = db.execute(
+        update(models.Job)
+        .where(*_leased(job_id, attempt))
+        .values(
+            progress=min(max(progress, 0.0), 1.0),
+            locked_until=(
+                datetime.now(tz=timezone.utc)
+                + timedelta(seconds=lease_seconds)
+            )
+        )
+    ).rowcount
+    db.commit()
+    return updated == 1
+
+
+def finish_job(
+        db: Session,
+        job_id: int,
+        attempt: int,
+        result: Optional[dict]
+) -> bool:
+    """
+    Mark a job as succeeded with its result. Returns whether the
+    attempt still held the lease; otherwise nothing is changed.
+    """
+    updated = db.execute(
+        update(models.Job)
+        .where(*_leased(job_id, attempt))
+        .values(
+            status="succeeded",
+            progress=1.0,
+            result=result,
+            error=None,
+            locked_until=None,
+            finished_at=datetime.now(tz=timezone.utc)
+        )
+    ).rowcount
+    db.commit()
+    return updated == 1
+
+
+def fail_job(
+        db: Session,
+        job_id: int,
+        attempt: int,
+        error: str,
+        retry_at: Optional[datetime]
+) -> bool:
+    """
+    Record a failed attempt: queue the job again at ``retry_at``,
+    or mark it as failed if it will not be retried. Returns whether
+    the attempt still held the lease; otherwise nothing is changed.
+    """
+    values = {"error": error, "locked_until": None}
+    if retry_at is None:
+        values.update(
+            status="failed", finished_at=datetime.now(tz=timezone.utc)
+        )
+    else:
+        values.update(status="queued", run_after=retry_at)
+
+    updated = db.execute(
+        update(models.Job).where(*_leased(job_id, attempt)).values(**values)
+    ).rowcount
+    db.commit()
+    return updated == 1
@@ -0,0 +1,40 @@
+from sqlalchemy import (
+    JSON, Column, DateTime, Float, ForeignKey, Index, Integer, String, Text,
+    func
+)
+
+from database import Base
+
+
+class Job(Base):
+    """
+    Represents a background job. Workers claim queued jobs whose
+    ``run_after`` has passed, and running jobs whose lease expired
+    because their worker stopped.
+    """
+
+    __tablename__ = "jobs"
+    __table_args__ = (
+        Index("ix_jobs_status_run_after", "status", "run_after"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    type = Column(String(50), nullable=False)
+    payload = Column(JSON, nullable=False, default=dict)
+    status = Column(String(20), nullable=False, default="queued")
+    progress = Column(Float, nullable=False, default=0.0)
+    result = Column(JSON, nullable=True)
+    error = Column(Text, nullable=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=3)
+    run_after = Column(
+        DateTime(timezone=True), nullable=False, server_default=func.now()
+    )
+    locked_until = Column(DateTime(timezone=True), nullable=True)
+    created_by = Column(
+        Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True
+    )
+    created_at = Column(
+        DateTime(timezone=True), nullable=False, server_default=func.now()
+    )
+    finished_at = Column(DateTime(timezone=True), nullable=True)
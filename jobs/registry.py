@@ -0,0 +1,41 @@
+from typing import Callable, Dict, NamedTuple, Optional
+
+from sqlalchemy.orm import Session
+
+
+JobHandler = Callable[[Session, dict, Callable[[float], None]], Optional[dict]]
+
+
+class JobType(NamedTuple):
+    """
+    How to run one type of job: its handler, how many may run at once
+    in a worker process, how often it is tried and the base delay
+    before a retry, doubled after each failed attempt.
+    """
+    handler: JobHandler
+    max_concurrency: int = 1
+    max_attempts: int = 3
+    backoff_seconds: float = 10.0
+
+
+JOB_TYPES: Dict[str, JobType] = {}
+
+
+def register_job_type(
+        name: str,
+        handler: JobHandler,
+        max_concurrency: int = 1,
+        max_attempts: int = 3,
+        backoff_seconds: float = 10.0
+) -> None:
+    """
+    Register a job handler. It is called with a database session, the
+    job's payload and a function reporting progress between 0 and 1,
+    and may return a JSON-serializable result.
+    """
+    JOB_TYPES[name] = JobType(
+        handler=handler,
+        max_concurrency=max_concurrency,
+        max_attempts=max_attempts,
+        backoff_seconds=backoff_seconds
+    )
@@ -0,0 +1,27 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+
+from database import get_db
+from jobs import crud, schemas
+from users.auth import get_current_token_user
+from users.schemas import TokenUser
+
+
+router = APIRouter()
+
+
+@router.get("/jobs/{job_id}", response_model=schemas.JobRead, tags=["jobs"])
+def read_job(
+        job_id: int,
+        db: Session = Depends(get_db),
+        current_user: TokenUser = Depends(get_current_token_user)
+) -> schemas.JobRead:
+    """
+    Retrieve the status and progress of a background job.
+    Only the user who started it, or a superuser, can see it.
+    """
+    job = crud.get_job(db=db, job_id=job_id)
+    if job.created_by != current_user.id and not current_user.is_superuser:
+        raise HTTPException(status_code=404, detail="Job not found.")
+
+    return schemas.JobRead.model_validate(job)
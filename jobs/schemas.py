@@ -0,0 +1,35 @@
+from datetime import datetime
+from typing import Optional
+
+from pydantic import BaseModel
+
+
+class JobRead(BaseModel):
+    """Model for reading the state of a background job."""
+    id: int
+    type: str
+    status: str
+    progress: float
+    result: Optional[dict] = None
+    error: Optional[str] = None
+    attempts: int
+    max_attempts: int
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+        json_schema_extra = {
+            "example": {
+                "id": 7,
+                "type": "archive_deleted_items",
+                "status": "running",
+                "progress": 0.4,
+                "result": None,
+                "error": None,
+                "attempts": 1,
+                "max_attempts": 3,
+                "created_at": "2026-10-19T12:00:00Z",
+                "finished_at": None
+            }
+        }
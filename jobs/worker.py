@@ -0,0 +1,189 @@
+import logging
+import random
+import threading
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from config import JOB_LEASE_SECONDS, JOB_POLL_SECONDS, JOB_WORKERS
+from database import shards
+from jobs import crud
+from jobs.registry import JOB_TYPES, JobType
+
+
+logger = logging.getLogger(__name__)
+
+MAX_BACKOFF_SECONDS = 60 * 60
+
+
+class JobWorkerPool:
+    """
+    Threads running queued jobs from the ``jobs`` table.
+
+    Each type of job runs at most ``max_concurrency`` at a time in this
+    process. Failed attempts are retried with exponential backoff and
+    jitter until the job's attempts are used up.
+    """
+
+    def __init__(
+            self,
+            session_factory: Callable[[], Session],
+            workers: int = 2,
+            poll_interval: float = 1.0,
+            lease_seconds: float = 300.0,
+            job_types: Optional[Dict[str, JobType]] = None
+    ) -> None:
+        self._session_factory = session_factory
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.job_types = JOB_TYPES if job_types is None else job_types
+        self._running = Counter()
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._threads = []
+
+    def start(self) -> None:
+        """Start the worker threads."""
+        for number in range(self.workers - len(self._threads)):
+            thread = threading.Thread(
+                target=self._run, name=f"job-worker-{number}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self) -> None:
+        """Stop the workers once their current jobs finish."""
+        self._stopped.set()
+
+    def run_once(self) -> bool:
+        """Claim and run one due job. Returns whether a job ran."""
+        reserved = self._reserve_slots()
+        job = None
+        try:
+            with self._session_factory() as db:
+                job = crud.claim_job(
+                    db=db, job_types=reserved, lease_seconds=self.lease_seconds
+                )
+        finally:
+            self._release_slots([
+                name for name in reserved if job is None or name != job.type
+            ])
+
+        if job is None:
+            return False
+
+        try:
+            self._execute(job.id, job.type, job.payload, job.attempts)
+        finally:
+            self._release_slots([job.type])
+        return True
+
+    def _run(self) -> None:
+        """Run jobs until stopped, polling while there are none."""
+        while not self._stopped.is_set():
+            try:
+                ran = self.run_once()
+            except Exception:
+                logger.exception("Claiming a job failed.")
+                ran = False
+            if not ran:
+                self._stopped.wait(self.poll_interval)
+
+    def _reserve_slots(self) -> List[str]:
+        """
+        Take a slot of every job type below its concurrency limit, so
+        that no other thread claims more jobs of those types meanwhile.
+        """
+        with self._lock:
+            reserved = [
+                name for name, job_type in self.job_types.items()
+                if self._running[name] < job_type.max_concurrency
+            ]
+            self._running.update(reserved)
+        return reserved
+
+    def _release_slots(self, job_types: List[str]) -> None:
+        """Give back slots taken by ``_reserve_slots``."""
+        with self._lock:
+            self._running.subtract(job_types)
+
+    def _execute(
+            self, job_id: int, job_type: str, payload: dict, attempt: int
+    ) -> None:
+        """Run a claimed job and record its outcome."""
+        def report_progress(progress: float) -> None:
+            with self._session_factory() as progress_db:
+                crud.report_progress(
+                    db=progress_db,
+                    job_id=job_id,
+                    attempt=attempt,
+                    progress=progress,
+                    lease_seconds=self.lease_seconds
+                )
+
+        definition = self.job_types[job_type]
+        try:
+            with self._session_factory() as db:
+                result = definition.handler(db, payload, report_progress)
+        except Exception as exc:
+            logger.exception("Job %d (%s) failed.", job_id, job_type)
+            self._record_failure(job_id, definition, attempt, exc)
+            return
+
+        with self._session_factory() as db:
+            finished = crud.finish_job(
+                db=db, job_id=job_id, attempt=attempt, result=result
+            )
+        if not finished:
+            logger.warning(
+                "Job %d (%s) lost its lease; its result was dropped.",
+                job_id, job_type
+            )
+
+    def _record_failure(
+            self,
+            job_id: int,
+            definition: JobType,
+            attempt: int,
+            exc: Exception
+    ) -> None:
+        """Schedule a retry with backoff, or fail the job."""
+        retry_at = None
+        if attempt < definition.max_attempts:
+            delay = min(
+                definition.backoff_seconds * 2 ** (attempt - 1),
+                MAX_BACKOFF_SECONDS
+            )
+            retry_at = datetime.now(tz=timezone.utc) + timedelta(
+                seconds=random.uniform(delay / 2, delay)
+            )
+
+        with self._session_factory() as db:
+            failed = crud.fail_job(
+                db=db,
+                job_id=job_id,
+                attempt=attempt,
+                error=repr(exc),
+                retry_at=retry_at
+            )
+        if not failed:
+            logger.warning(
+                "Job %d lost its lease; its failure was dropped.", job_id
+            )
+
+
+# Jobs are stored in their world's database, so each world has a pool.
+job_worker_pools: List[JobWorkerPool] = []
+if JOB_WORKERS > 0:
+    job_worker_pools = [
+        JobWorkerPool(
+            session_factory=shards.session_factory(world),
+            workers=JOB_WORKERS,
+            poll_interval=JOB_POLL_SECONDS,
+            lease_seconds=JOB_LEASE_SECONDS
+        )
+        for world in shards.worlds
+    ]
@@ -1,12 +1,41 @@
 from fastapi import APIRouter, FastAPI
 
+from compression import CompressionMiddleware
+from concurrency import ConcurrencyLimitMiddleware, concurrency_limiter
+from config import (
+    COMPRESSION_MIN_SIZE, IDEMPOTENCY_MAX_KEYS, IDEMPOTENCY_STORE,
+    IDEMPOTENCY_TTL_SECONDS, RATE_LIMIT_ALGORITHM, RATE_LIMIT_BURST,
+    RATE_LIMIT_PER_MINUTE
+)
+from idempotency import (
+    DatabaseIdempotencyStore, IdempotencyMiddleware, InMemoryIdempotencyStore
+)
 from inventory import models
-from database import engine
+from inventory.archival import item_archivers
+from jobs.worker import job_worker_pools
+from database import SessionLocal, shards
+from health import InFlightMiddleware, readiness_probe, request_gauge
+from profiling import ProfilingMiddleware
+from querylog import QueryContextMiddleware, slow_query_log
+from ratelimit import RateLimitMiddleware, SlidingWindow, TokenBucket
 
+from concurrency import router as concurrency_router
+from health import router as health_router
 from inventory import router as inventory_router
+from jobs import router as jobs_router
+from profiling import router as profiling_router
 from users import router as users_router
 
-models.Base.metadata.create_all(bind=engine)
+for shard_engine in shards.engines().values():
+    models.Base.metadata.create_all(bind=shard_engine)
+    if slow_query_log is not None:
+        slow_query_log.install(shard_engine)
+
+for item_archiver in item_archivers:
+    item_archiver.start()
+
+for job_workers in job_worker_pools:
+    job_workers.start()
 
 router = APIRouter()
 
@@ -25,8 +54,52 @@ app = FastAPI(
     }
 )
 
+if IDEMPOTENCY_STORE == "database":
+    app.add_middleware(
+        IdempotencyMiddleware,
+        store=DatabaseIdempotencyStore(session_factory=SessionLocal),
+        ttl=IDEMPOTENCY_TTL_SECONDS
+    )
+elif IDEMPOTENCY_STORE != "off":
+    app.add_middleware(
+        IdempotencyMiddleware,
+        store=InMemoryIdempotencyStore(max_keys=IDEMPOTENCY_MAX_KEYS),
+        ttl=IDEMPOTENCY_TTL_SECONDS
+    )
+
+app.add_middleware(CompressionMiddleware, minimum_size=COMPRESSION_MIN_SIZE)
+
+if RATE_LIMIT_PER_MINUTE > 0:
+    app.add_middleware(
+        RateLimitMiddleware,
+        limiter=(
+            SlidingWindow(limit=RATE_LIMIT_PER_MINUTE, window=60)
+            if RATE_LIMIT_ALGORITHM == "sliding_window"
+            else TokenBucket(
+                capacity=RATE_LIMIT_BURST, rate=RATE_LIMIT_PER_MINUTE / 60
+            )
+        )
+    )
+
+app.add_middleware(ProfilingMiddleware)
+
+if slow_query_log is not None:
+    app.add_middleware(QueryContextMiddleware)
+
+if concurrency_limiter is not None:
+    app.add_middleware(
+        ConcurrencyLimitMiddleware, limiter=concurrency_limiter
+    )
+    readiness_probe.checks["concurrency"] = concurrency_limiter.readiness
+
+app.add_middleware(InFlightMiddleware, gauge=request_gauge)
+
 app.include_router(users_router.router)
 app.include_router(inventory_router.router)
+app.include_router(jobs_router.router)
+app.include_router(profiling_router)
+app.include_router(health_router)
+app.include_router(concurrency_router)
 
 
 @app.get("/", tags=["initial"])
@@ -42,6 +115,8 @@ def welcome_message():
             "get_current_user": "/users/me",
             "get_items": "/items/",
             "get_categories": "/categories/",
+            "liveness": "/healthz",
+            "readiness": "/readyz",
             "documentation_swagger": "/docs",
             "documentation_redoc": "/redoc"
         },
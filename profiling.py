@@ -0,0 +1,306 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextvars import Context, ContextVar
+from types import CodeType, FrameType
+from typing import Callable, Optional
+
+import anyio
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import PlainTextResponse
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import MutableHeaders
+from starlette.requests import HTTPConnection
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from config import PROFILE_MAX_PER_MINUTE, PROFILE_SAMPLE_INTERVAL_MS
+from database import get_world, shards
+from ratelimit import InMemoryStore, TokenBucket
+from users.auth import (
+    get_current_superuser, get_current_user, get_token_payload
+)
+
+
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+# anyio's worker threads run sync endpoints in the request's context.
+ANYIO_ROOT = os.path.dirname(os.path.abspath(anyio.__file__))
+
+_profiled = ContextVar("profiled", default=False)
+
+
+def _frame_label(code: CodeType) -> str:
+    """Describe a frame as ``function (path:line)``."""
+    filename = code.co_filename
+    if filename.startswith(PROJECT_ROOT + os.sep):
+        filename = os.path.relpath(filename, PROJECT_ROOT)
+    else:
+        filename = os.sep.join(filename.split(os.sep)[-2:])
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})"
+
+
+def _is_application_code(code: CodeType) -> bool:
+    """Check whether a frame runs this project's code."""
+    filename = code.co_filename
+    return (
+        filename.startswith(PROJECT_ROOT + os.sep)
+        and "site-packages" not in filename
+        and not filename.startswith(os.path.abspath(__file__))
+    )
+
+
+def _serves_profiled_request(frame: Optional[FrameType]) -> bool:
+    """
+    Check whether a thread's stack belongs to a profiled request: the
+    event loop while it runs the request's task, or a worker thread
+    running a function in the request's context.
+    """
+    while frame is not None:
+        code = frame.f_code
+        if code is ProfilingMiddleware._profile.__code__:
+            return True
+        if code.co_filename.startswith(ANYIO_ROOT + os.sep):
+            context = frame.f_locals.get("context")
+            if isinstance(context, Context):
+                return context.get(_profiled, False)
+        frame = frame.f_back
+    return False
+
+
+class SamplingProfiler:
+    """
+    Statistical profiler aggregating collapsed stacks.
+
+    While at least one profiled request is in flight, a background
+    thread records the stacks of the threads serving profiled requests
+    every ``interval`` seconds. Other requests' threads and threads not
+    running this project's code are left out. Samples are counted per distinct
+    stack, at most ``max_stacks`` of them, in the collapsed format read
+    by flame graph tools.
+    """
+
+    def __init__(
+            self, interval: float = 0.005, max_stacks: int = 10_000
+    ) -> None:
+        self.interval = interval
+        self.max_stacks = max_stacks
+        self.samples = 0
+        self._stacks = Counter()
+        self._active = 0
+        self._wake = threading.Condition()
+        self._thread = None
+
+    def begin(self) -> None:
+        """Start sampling for a profiled request."""
+        with self._wake:
+            self._active += 1
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="sampling-profiler", daemon=True
+                )
+                self._thread.start()
+            self._wake.notify()
+
+    def end(self) -> None:
+        """Stop sampling for a profiled request."""
+        with self._wake:
+            self._active -= 1
+
+    def collapsed(self) -> str:
+        """Return the samples as ``frame;frame;frame count`` lines."""
+        with self._wake:
+            stacks = sorted(self._stacks.items())
+        return "".join(f"{stack} {count}\n" for stack, count in stacks)
+
+    def reset(self) -> None:
+        """Discard the collected samples."""
+        with self._wake:
+            self._stacks.clear()
+
+    def sample(self) -> None:
+        """Record the current stack of threads serving profiled requests."""
+        own_thread = threading.get_ident()
+        stacks = []
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_thread or not _serves_profiled_request(frame):
+                continue
+
+            codes = []
+            while frame is not None:
+                codes.append(frame.f_code)
+                frame = frame.f_back
+            if any(_is_application_code(code) for code in codes):
+                stacks.append(
+                    ";".join(_frame_label(code) for code in reversed(codes))
+                )
+
+        with self._wake:
+            self.samples += 1
+            for stack in stacks:
+                if (
+                        stack not in self._stacks
+                        and len(self._stacks) >= self.max_stacks
+                ):
+                    stack = "[other stacks]"
+                self._stacks[stack] += 1
+
+    def _run(self) -> None:
+        """Sample while profiled requests are in flight."""
+        while True:
+            with self._wake:
+                while not self._active:
+                    self._wake.wait()
+            self.sample()
+            time.sleep(self.interval)
+
+
+def _is_superuser(
+        scope: Scope,
+        session_factory: Callable[[str], Callable[[], Session]]
+) -> bool:
+    """
+    Check for a valid bearer token of a user who is a superuser in the
+    database, so that a demoted superuser's old token cannot profile.
+    """
+    for name, value in scope.get("headers", []):
+        if name == b"authorization" and value[:7].lower() == b"bearer ":
+            try:
+                world = get_world(HTTPConnection(scope))
+                payload = get_token_payload(
+                    token=value[7:].decode(), world=world
+                )
+                with session_factory(world)() as db:
+                    user = get_current_user(payload=payload, db=db)
+                return user.is_superuser
+            except (HTTPException, UnicodeDecodeError):
+                return False
+    return False
+
+
+class ProfilingMiddleware:
+    """
+    Profile requests sent by a superuser with an ``X-Profile: 1``
+    header. At most ``max_per_minute`` requests are profiled; others run
+    unprofiled, and a limit of 0 disables profiling. The response's
+    ``X-Profile`` header says whether the request was ``sampled`` (with
+    the number of samples taken in ``X-Profile-Samples``) or
+    ``rate-limited``.
+    """
+
+    def __init__(
+            self,
+            app: ASGIApp,
+            profiler: Optional[SamplingProfiler] = None,
+            max_per_minute: int = PROFILE_MAX_PER_MINUTE,
+            clock: Callable[[], float] = time.monotonic,
+            session_factory: Callable[
+                [str], Callable[[], Session]
+            ] = shards.session_factory
+    ) -> None:
+        self.app = app
+        self.session_factory = session_factory
+        self.profiler = profiler or default_profiler
+        self.limiter = None
+        if max_per_minute > 0:
+            self.limiter = TokenBucket(
+                capacity=max_per_minute, rate=max_per_minute / 60
+            )
+        self.store = InMemoryStore(max_keys=1)
+        self.clock = clock
+
+    async def __call__(
+            self, scope: Scope, receive: Receive, send: Send
+    ) -> None:
+        if (
+                self.limiter is None
+                or scope["type"] != "http"
+                or not self._requested(scope)
+                or not await run_in_threadpool(
+                    _is_superuser, scope, self.session_factory
+                )
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        allowed, _ = self.limiter.consume(
+            self.store, "profile", 1, self.clock()
+        )
+        if not allowed:
+            await self.app(scope, receive, _with_headers(
+                send, {"X-Profile": "rate-limited"}
+            ))
+            return
+
+        samples_before = self.profiler.samples
+
+        async def send_with_profile(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers["X-Profile"] = "sampled"
+                headers["X-Profile-Samples"] = str(
+                    self.profiler.samples - samples_before
+                )
+            await send(message)
+
+        self.profiler.begin()
+        try:
+            await self._profile(scope, receive, send_with_profile)
+        finally:
+            self.profiler.end()
+
+    async def _profile(
+            self, scope: Scope, receive: Receive, send: Send
+    ) -> None:
+        """Run a profiled request; the sampler looks for this frame."""
+        token = _profiled.set(True)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _profiled.reset(token)
+
+    @staticmethod
+    def _requested(scope: Scope) -> bool:
+        """Check for the opt-in header."""
+        for name, value in scope.get("headers", []):
+            if name == b"x-profile":
+                return value == b"1"
+        return False
+
+
+def _with_headers(send: Send, extra: dict) -> Send:
+    """Wrap ``send`` to add headers to the response."""
+    async def wrapped(message: Message) -> None:
+        if message["type"] == "http.response.start":
+            headers = MutableHeaders(scope=message)
+            for name, value in extra.items():
+                headers[name] = value
+        await send(message)
+
+    return wrapped
+
+
+default_profiler = SamplingProfiler(
+    interval=PROFILE_SAMPLE_INTERVAL_MS / 1000
+)
+
+router = APIRouter(dependencies=[Depends(get_current_superuser)])
+
+
+@router.get(
+    "/admin/profile", response_class=PlainTextResponse, tags=["admin"]
+)
+def read_profile() -> str:
+    """
+    Download the samples of profiled requests as collapsed stacks, for
+    ``flamegraph.pl`` or speedscope.
+    """
+    return default_profiler.collapsed()
+
+
+@router.delete("/admin/profile", tags=["admin"])
+def reset_profile() -> dict:
+    """Discard the collected samples."""
+    default_profiler.reset()
+    return {"detail": "Profile reset."}
@@ -0,0 +1,231 @@
+import contextvars
+import hashlib
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Connection, Engine, ExecutionContext
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from config import SLOW_QUERY_EXPLAIN_LIMIT, SLOW_QUERY_MS
+
+
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# The ASGI scope of the request being handled, set by
+# QueryContextMiddleware. The router adds the matched route to the same
+# dict, so the route template is known by the time queries run.
+current_scope: contextvars.ContextVar[Optional[Scope]] = (
+    contextvars.ContextVar("current_scope", default=None)
+)
+
+_PLACEHOLDER = r"(?:\?|%\([^)]*\)s|%s|\$\d+|:\w+)"
+_PLACEHOLDER_LIST = re.compile(
+    rf"\(\s*{_PLACEHOLDER}(?:\s*,\s*{_PLACEHOLDER})+\s*\)"
+)
+
+
+def fingerprint(statement: str) -> str:
+    """
+    Identify a statement regardless of whitespace and of how many
+    values an expanded ``IN`` list has.
+    """
+    normalized = _PLACEHOLDER_LIST.sub("(...)", " ".join(statement.split()))
+    return hashlib.sha1(normalized.encode()).hexdigest()[:16]
+
+
+def parameter_shape(parameters: Any) -> Any:
+    """Describe bound parameters by type, without their values."""
+    if isinstance(parameters, dict):
+        return {
+            name: type(value).__name__
+            for name, value in parameters.items()
+        }
+    if isinstance(parameters, (list, tuple)):
+        if parameters and isinstance(parameters[0], (dict, list, tuple)):
+            return {
+                "rows": len(parameters),
+                "row": parameter_shape(parameters[0]),
+            }
+        return [type(value).__name__ for value in parameters]
+    return None
+
+
+def _route() -> Optional[str]:
+    """Return the current request's route, if any."""
+    scope = current_scope.get()
+    if scope is None:
+        return None
+    route = scope.get("route")
+    path = getattr(route, "path", None) or scope.get("path")
+    return f"{scope.get('method', 'WS')} {path}"
+
+
+def _caller() -> Optional[str]:
+    """Return the innermost function of this project on the stack."""
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if (
+                filename.startswith(PROJECT_ROOT + os.sep)
+                and "site-packages" not in filename
+                and filename != os.path.abspath(__file__)
+        ):
+            module = frame.f_globals.get("__name__", "?")
+            return f"{module}.{frame.f_code.co_name}"
+        frame = frame.f_back
+    return None
+
+
+class SlowQueryLog:
+    """
+    Log statements slower than ``threshold`` seconds as JSON, with the
+    shape of their parameters, the route and the project function that
+    ran them.
+
+    The first ``explain_limit`` slow occurrences of each statement
+    fingerprint also get the plan from ``EXPLAIN`` (``EXPLAIN QUERY
+    PLAN`` on SQLite), which only plans the statement and does not run
+    it again. Only single ``SELECT`` statements are explained.
+    """
+
+    def __init__(
+            self,
+            threshold: float = 0.2,
+            explain_limit: int = 3,
+            max_fingerprints: int = 1000
+    ) -> None:
+        self.threshold = threshold
+        self.explain_limit = explain_limit
+        self.max_fingerprints = max_fingerprints
+        self._explained = OrderedDict()
+        self._lock = threading.Lock()
+
+    def install(self, engine: Engine) -> None:
+        """Start timing the engine's statements."""
+        event.listen(engine, "before_cursor_execute", self._before)
+        event.listen(engine, "after_cursor_execute", self._after)
+
+    def remove(self, engine: Engine) -> None:
+        """Stop timing the engine's statements."""
+        event.remove(engine, "before_cursor_execute", self._before)
+        event.remove(engine, "after_cursor_execute", self._after)
+
+    def _before(
+            self,
+            conn: Connection,
+            cursor: Any,
+            statement: str,
+            parameters: Any,
+            context: Optional[ExecutionContext],
+            executemany: bool
+    ) -> None:
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    def _after(
+            self,
+            conn: Connection,
+            cursor: Any,
+            statement: str,
+            parameters: Any,
+            context: Optional[ExecutionContext],
+            executemany: bool
+    ) -> None:
+        starts: List[float] = conn.info.get("query_start")
+        if not starts:
+            return
+        duration = time.perf_counter() - starts.pop()
+        if duration < self.threshold:
+            return
+
+        statement_fingerprint = fingerprint(statement)
+        record = {
+            "event": "slow_query",
+            "duration_ms": round(duration * 1000, 2),
+            "fingerprint": statement_fingerprint,
+            "statement": statement,
+            "parameters": parameter_shape(parameters),
+            "executemany": executemany,
+            "route": _route(),
+            "function": _caller(),
+        }
+        if not executemany and self._should_explain(
+                statement, statement_fingerprint
+        ):
+            record["plan"] = self._explain(conn, statement, parameters)
+        logger.warning(json.dumps(record, default=str))
+
+    def _should_explain(
+            self, statement: str, statement_fingerprint: str
+    ) -> bool:
+        """Count an occurrence; True while the fingerprint has budget."""
+        if not statement.lstrip().upper().startswith("SELECT"):
+            return False
+
+        with self._lock:
+            count = self._explained.pop(statement_fingerprint, 0)
+            self._explained[statement_fingerprint] = count + 1
+            while len(self._explained) > self.max_fingerprints:
+                self._explained.popitem(last=False)
+        return count < self.explain_limit
+
+    @staticmethod
+    def _explain(
+            conn: Connection, statement: str, parameters: Any
+    ) -> List[str]:
+        """
+        Plan the statement on the same connection, with a plain DBAPI
+        cursor so that it is not timed itself. On PostgreSQL this is done
+        in a savepoint, so a failure cannot abort the transaction.
+        """
+        sqlite = conn.dialect.name == "sqlite"
+        explain = "EXPLAIN QUERY PLAN " if sqlite else "EXPLAIN "
+        cursor = conn.connection.cursor()
+        try:
+            if not sqlite:
+                cursor.execute("SAVEPOINT slow_query_explain")
+            try:
+                cursor.execute(explain + statement, parameters)
+                rows = cursor.fetchall()
+            except Exception as exc:
+                rows = [("EXPLAIN failed: " + str(exc),)]
+                if not sqlite:
+                    cursor.execute("ROLLBACK TO SAVEPOINT slow_query_explain")
+            if not sqlite:
+                cursor.execute("RELEASE SAVEPOINT slow_query_explain")
+        finally:
+            cursor.close()
+        return [" ".join(str(column) for column in row) for row in rows]
+
+
+class QueryContextMiddleware:
+    """Make the current request known to the slow query log."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(
+            self, scope: Scope, receive: Receive, send: Send
+    ) -> None:
+        token = current_scope.set(scope)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            current_scope.reset(token)
+
+
+slow_query_log = (
+    SlowQueryLog(
+        threshold=SLOW_QUERY_MS / 1000, explain_limit=SLOW_QUERY_EXPLAIN_LIMIT
+    )
+    if SLOW_QUERY_MS > 0 else None
+)
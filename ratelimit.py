@@ -0,0 +1,238 @@
+import json
+import math
+from abc import ABC, abstractmethod
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, List, Optional, Pattern, Tuple
+
+from jose import JWTError
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from config import DEFAULT_WORLD
+from users.tokens import decode_token
+
+
+Decision = Tuple[bool, float]
+
+
+class RateLimitStore(ABC):
+    """
+    Storage for per-key limiter state.
+
+    ``update`` must apply ``updater`` to the key's state atomically;
+    a shared store (e.g. Redis) would do this with a script or a
+    compare-and-set loop so that all workers see the same buckets.
+    """
+
+    @abstractmethod
+    def update(
+            self,
+            key: str,
+            updater: Callable[[Optional[tuple]], Tuple[tuple, Decision]],
+            ttl: float
+    ) -> Decision:
+        """Apply ``updater`` to the key's state and return its decision."""
+
+
+class InMemoryStore(RateLimitStore):
+    """Per-process store with expiry and a bound on the number of keys."""
+
+    def __init__(self, max_keys: int = 100_000) -> None:
+        self.max_keys = max_keys
+        self._states = OrderedDict()
+        self._lock = threading.Lock()
+
+    def update(
+            self,
+            key: str,
+            updater: Callable[[Optional[tuple]], Tuple[tuple, Decision]],
+            ttl: float
+    ) -> Decision:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._states.pop(key, None)
+            state = entry[0] if entry and entry[1] > now else None
+            new_state, decision = updater(state)
+            self._states[key] = (new_state, now + ttl)
+            while len(self._states) > self.max_keys:
+                self._states.popitem(last=False)
+        return decision
+
+
+class TokenBucket:
+    """
+    Token bucket holding up to ``capacity`` tokens and refilled at
+    ``rate`` tokens per second. A request spends its cost in tokens,
+    at most ``capacity`` of them, so that a small bucket still admits
+    expensive requests when full.
+    """
+
+    def __init__(self, capacity: float, rate: float) -> None:
+        self.capacity = capacity
+        self.rate = rate
+
+    def consume(
+            self, store: RateLimitStore, key: str, cost: float, now: float
+    ) -> Decision:
+        """Spend ``cost`` tokens if available."""
+        cost = min(cost, self.capacity)
+
+        def updater(state: Optional[tuple]) -> Tuple[tuple, Decision]:
+            tokens, updated_at = state or (self.capacity, now)
+            tokens = min(
+                self.capacity, tokens + (now - updated_at) * self.rate
+            )
+            if tokens >= cost:
+                return (tokens - cost, now), (True, 0.0)
+            return (tokens, now), (False, (cost - tokens) / self.rate)
+
+        return store.update(key, updater, ttl=self.capacity / self.rate)
+
+
+class SlidingWindow:
+    """
+    Sliding window counter allowing ``limit`` cost units per ``window``
+    seconds, weighting the previous window by how much of it still
+    overlaps the sliding window. A request counts at most ``limit``
+    units.
+    """
+
+    def __init__(self, limit: float, window: float) -> None:
+        self.limit = limit
+        self.window = window
+
+    def consume(
+            self, store: RateLimitStore, key: str, cost: float, now: float
+    ) -> Decision:
+        """Count ``cost`` units if the window has room."""
+        cost = min(cost, self.limit)
+
+        def updater(state: Optional[tuple]) -> Tuple[tuple, Decision]:
+            start = now - now % self.window
+            window_start, current, previous = state or (start, 0.0, 0.0)
+            if window_start != start:
+                adjacent = math.isclose(start - window_start, self.window)
+                previous = current if adjacent else 0.0
+                current = 0.0
+
+            elapsed = now - start
+            used = previous * (1 - elapsed / self.window) + current
+            if used + cost <= self.limit:
+                return (start, current + cost, previous), (True, 0.0)
+
+            if previous:
+                excess = used + cost - self.limit
+                retry_after = min(
+                    excess * self.window / previous, self.window - elapsed
+                )
+            else:
+                retry_after = self.window - elapsed
+            return (start, current, previous), (False, retry_after)
+
+        return store.update(key, updater, ttl=2 * self.window)
+
+
+DEFAULT_ROUTE_COSTS = [
+    ("POST", r"^/token$", 10),
+    ("POST", r"^/register$", 10),
+    ("POST", r"^/token/refresh$", 2),
+    ("GET", r"^/items/$", 2),
+    ("GET", r"^/categories/$", 2),
+]
+
+
+def token_subject(scope: Scope) -> Optional[str]:
+    """
+    Return the user of a valid bearer token, if the request has one,
+    qualified by its world unless that is the default one.
+    """
+    for name, value in scope.get("headers", []):
+        if name == b"authorization" and value[:7].lower() == b"bearer ":
+            try:
+                payload = decode_token(value[7:].decode())
+                subject = str(payload["sub"])
+            except (JWTError, KeyError, UnicodeDecodeError):
+                return None
+            world = payload.get("world", DEFAULT_WORLD)
+            return subject if world == DEFAULT_WORLD else f"{world}/{subject}"
+    return None
+
+
+def client_key(scope: Scope) -> str:
+    """
+    Identify the caller: the user of a valid bearer token,
+    otherwise the client IP.
+    """
+    subject = token_subject(scope)
+    if subject is not None:
+        return "user:" + subject
+
+    client = scope.get("client")
+    return "ip:" + (client[0] if client else "unknown")
+
+
+class RateLimitMiddleware:
+    """
+    Reject callers that exceed their limit with ``429 Too Many Requests``
+    and a ``Retry-After`` header. Each request costs the weight of the
+    first matching ``(method, path regex, cost)`` rule, or 1.
+    """
+
+    def __init__(
+            self,
+            app: ASGIApp,
+            limiter: object,
+            store: Optional[RateLimitStore] = None,
+            route_costs: Optional[List[Tuple[str, str, float]]] = None,
+            key_func: Callable[[Scope], str] = client_key,
+            clock: Callable[[], float] = time.monotonic
+    ) -> None:
+        self.app = app
+        self.limiter = limiter
+        self.store = store or InMemoryStore()
+        self.route_costs: List[Tuple[str, Pattern, float]] = [
+            (method, re.compile(path), cost)
+            for method, path, cost in (
+                DEFAULT_ROUTE_COSTS if route_costs is None else route_costs
+            )
+        ]
+        self.key_func = key_func
+        self.clock = clock
+
+    def cost(self, method: str, path: str) -> float:
+        """Return the weight of a request."""
+        for rule_method, pattern, cost in self.route_costs:
+            if rule_method == method and pattern.match(path):
+                return cost
+        return 1
+
+    async def __call__(
+            self, scope: Scope, receive: Receive, send: Send
+    ) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        allowed, retry_after = self.limiter.consume(
+            self.store,
+            self.key_func(scope),
+            self.cost(scope["method"], scope["path"]),
+            self.clock()
+        )
+        if allowed:
+            await self.app(scope, receive, send)
+            return
+
+        body = json.dumps({"detail": "Too many requests."}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(math.ceil(retry_after)).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,147 @@
+"""
+Move a world's database to another server.
+
+    python rebalance.py SOURCE_URL TARGET_URL [--batch-size N]
+
+Every table is copied in batches, parents before children, into an empty
+target database, and the row counts are compared afterwards. Stop
+writes to the world first (e.g. by taking its workers out of rotation),
+then point the world at ``TARGET_URL`` in ``SHARD_URLS`` and restart the
+workers. The source database is left untouched.
+"""
+import argparse
+from typing import Callable, Dict, Optional
+
+from sqlalchemy import (
+    Integer, Table, create_engine, func, insert, inspect, select, text,
+    tuple_
+)
+from sqlalchemy.engine import Connection, Engine
+
+import idempotency  # noqa: F401
+import jobs.models  # noqa: F401
+import users.models  # noqa: F401
+from database import Base
+from inventory import models  # noqa: F401
+
+
+def copy_table(
+        source: Connection,
+        target: Connection,
+        table: Table,
+        batch_size: int
+) -> int:
+    """Copy a table in primary key order, one batch at a time."""
+    primary_key = list(table.primary_key.columns)
+    key = primary_key[0] if len(primary_key) == 1 else tuple_(*primary_key)
+    copied = 0
+    last = None
+    while True:
+        statement = select(table).order_by(*primary_key).limit(batch_size)
+        if last is not None:
+            statement = statement.where(
+                key > (last[0] if len(primary_key) == 1 else tuple_(*last))
+            )
+        rows = source.execute(statement).mappings().all()
+        if not rows:
+            return copied
+
+        target.execute(insert(table), [dict(row) for row in rows])
+        copied += len(rows)
+        last = [rows[-1][column.name] for column in primary_key]
+
+
+def _reset_sequences(target: Connection, table: Table) -> None:
+    """Move a PostgreSQL ID sequence, if the table has one, past the copy."""
+    primary_key = list(table.primary_key.columns)
+    if len(primary_key) != 1 or not isinstance(primary_key[0].type, Integer):
+        return
+
+    # pg_get_serial_sequence() is NULL for columns without a sequence,
+    # and setval() then does nothing.
+    target.execute(
+        text(
+            "SELECT setval(pg_get_serial_sequence(:table, :column), "
+            f"(SELECT COALESCE(MAX({primary_key[0].name}), 0) + 1 "
+            f"FROM {table.name}), false)"
+        ),
+        {"table": table.name, "column": primary_key[0].name}
+    )
+
+
+def copy_world(
+        source: Engine,
+        target: Engine,
+        batch_size: int = 1000,
+        on_table: Optional[Callable[[str, int], None]] = None
+) -> Dict[str, int]:
+    """
+    Copy every table of a world's database into an empty database in
+    one transaction and return the number of rows per table.
+    """
+    Base.metadata.create_all(bind=target)
+    counts = {}
+    with source.connect() as source_connection, \
+            target.begin() as target_connection:
+        for table in Base.metadata.sorted_tables:
+            if target_connection.execute(
+                    select(func.count()).select_from(table)
+            ).scalar():
+                raise ValueError(
+                    f"Table {table.name} of the target database is not empty."
+                )
+
+        for table in Base.metadata.sorted_tables:
+            counts[table.name] = copy_table(
+                source_connection, target_connection, table, batch_size
+            )
+            if target.dialect.name == "postgresql":
+                _reset_sequences(target_connection, table)
+            if on_table is not None:
+                on_table(table.name, counts[table.name])
+
+        if inspect(source_connection).has_table("alembic_version"):
+            versions = source_connection.execute(
+                text("SELECT version_num FROM alembic_version")
+            ).scalars().all()
+            target_connection.execute(text(
+                "CREATE TABLE IF NOT EXISTS alembic_version "
+                "(version_num VARCHAR(32) NOT NULL PRIMARY KEY)"
+            ))
+            for version in versions:
+                target_connection.execute(
+                    text("INSERT INTO alembic_version VALUES (:version)"),
+                    {"version": version}
+                )
+
+        for table in Base.metadata.sorted_tables:
+            copied = target_connection.execute(
+                select(func.count()).select_from(table)
+            ).scalar()
+            if copied != counts[table.name]:
+                raise RuntimeError(
+                    f"Copied {copied} rows of {table.name}, "
+                    f"expected {counts[table.name]}."
+                )
+    return counts
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Copy a world's database to another database."
+    )
+    parser.add_argument("source_url")
+    parser.add_argument("target_url")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    arguments = parser.parse_args()
+
+    copy_world(
+        source=create_engine(arguments.source_url),
+        target=create_engine(arguments.target_url),
+        batch_size=arguments.batch_size,
+        on_table=lambda name, rows: print(f"{name}: {rows} rows")
+    )
+
+
+if __name__ == "__main__":
+    main()
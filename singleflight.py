@@ -0,0 +1,101 @@
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, Hashable, TypeVar
+
+
+T = TypeVar("T")
+
+
+@dataclass
+class FlightStats:
+    """Counters for one key."""
+    executions: int = 0
+    shared: int = 0
+    timeouts: int = 0
+    errors: int = 0
+
+
+class _Call:
+    """An in-flight call that other callers can wait for."""
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.waiters = 0
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesce identical concurrent calls.
+
+    The first caller for a key runs the function; callers arriving with
+    the same key while it runs wait for its result instead of running
+    it again. Nothing is cached once the call has finished. A waiter
+    gives up after ``max_wait`` seconds and runs the function itself, so
+    one slow call cannot hold up every other request for its key.
+    """
+
+    def __init__(self, max_wait: float = 2.0, max_keys: int = 1024) -> None:
+        self.max_wait = max_wait
+        self.max_keys = max_keys
+        self._calls: Dict[Hashable, _Call] = {}
+        self._stats = OrderedDict()
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, function: Callable[[], T]) -> T:
+        """Return ``function()``, sharing a concurrent call's result."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                call.waiters += 1
+
+        if leader:
+            return self._execute(key, call, function)
+
+        if not call.done.wait(self.max_wait):
+            self._count(key, "timeouts")
+            return function()
+
+        self._count(key, "shared")
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def _execute(
+            self, key: Hashable, call: _Call, function: Callable[[], T]
+    ) -> T:
+        """Run the function for every caller waiting on the key."""
+        try:
+            call.result = function()
+        except Exception as exc:
+            call.error = exc
+            self._count(key, "errors")
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+            self._count(key, "executions")
+        return call.result
+
+    def _count(self, key: Hashable, counter: str) -> None:
+        """Increment a key's counter, keeping stats for recent keys only."""
+        with self._lock:
+            stats = self._stats.pop(key, None) or FlightStats()
+            setattr(stats, counter, getattr(stats, counter) + 1)
+            self._stats[key] = stats
+            while len(self._stats) > self.max_keys:
+                self._stats.popitem(last=False)
+
+    def stats(self) -> Dict[Hashable, FlightStats]:
+        """Return a copy of the counters of the most recent keys."""
+        with self._lock:
+            return {
+                key: FlightStats(**vars(stats))
+                for key, stats in self._stats.items()
+            }
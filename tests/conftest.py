@@ -1,5 +1,5 @@
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, delete
 from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.pool import StaticPool
 import pytest
@@ -21,7 +21,7 @@ engine = create_engine(
 )
 
 TestingSessionLocal = sessionmaker(
-    autocommit=False, autoflush=False, bind=engine
+    autocommit=False, autoflush=False, expire_on_commit=False, bind=engine
 )
 
 Base.metadata.create_all(bind=engine)
@@ -43,6 +43,21 @@ def db_session() -> Session:
     connection.close()
 
 
+@pytest.fixture(scope="function")
+def committing_sessions() -> sessionmaker:
+    """
+    Fixture with sessions on connections of their own, which commit for
+    real; every table is emptied afterwards.
+    """
+    separate_engine = create_engine(engine.url)
+    yield sessionmaker(bind=separate_engine, expire_on_commit=False)
+
+    with separate_engine.begin() as connection:
+        for table in reversed(Base.metadata.sorted_tables):
+            connection.execute(delete(table))
+    separate_engine.dispose()
+
+
 @pytest.fixture(scope="function")
 def test_client(db_session: Session) -> TestClient:
     """
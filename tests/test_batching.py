@@ -0,0 +1,118 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy.orm import Session
+
+from inventory import models
+from inventory.batching import InventoryClaimBatcher
+from tests.conftest import TestingSessionLocal
+from users.models import User
+
+
+def test_batched_claims_resolve_individually(
+        db_session: Session,
+        create_test_user: User,
+        create_test_item: models.Item
+):
+    """Test that concurrent claims flushed together get their own result."""
+    players = [
+        User(
+            username=f"player{i}",
+            email=f"player{i}@example.com",
+            hashed_password="hashed",
+            is_active=True
+        )
+        for i in range(8)
+    ]
+    db_session.add_all(players)
+    db_session.commit()
+    player_ids = [player.id for player in players]
+    item_id = create_test_item.id
+
+    connection = db_session.connection()
+    batcher = InventoryClaimBatcher(
+        session_factory=lambda: TestingSessionLocal(bind=connection),
+        window_ms=200
+    )
+
+    def claim(user_id: int, claimed_item_id: int) -> object:
+        try:
+            return batcher.claim(user_id=user_id, item_id=claimed_item_id)
+        except HTTPException as exc:
+            return exc.status_code
+
+    with ThreadPoolExecutor(max_workers=len(player_ids) + 1) as executor:
+        results = list(executor.map(
+            claim,
+            player_ids + [player_ids[0]],
+            [item_id] * len(player_ids) + [999]
+        ))
+
+    winners = [result for result in results if not isinstance(result, int)]
+    assert len(winners) == 1
+    assert winners[0].owner_id in player_ids
+    assert sorted(
+        result for result in results if isinstance(result, int)
+    ) == [404] + [409] * (len(player_ids) - 1)
+
+    db_session.expire_all()
+    assert db_session.get(models.Item, item_id).owner_id == winners[0].owner_id
+
+    with pytest.raises(HTTPException) as exc_info:
+        batcher.claim(user_id=winners[0].owner_id, item_id=item_id)
+    assert exc_info.value.status_code == 400
+
+
+def test_failed_flush_fails_its_batch_only(
+        db_session: Session,
+        create_test_user: User,
+        create_test_item: models.Item
+):
+    """Test that an error fails the batch and later claims still flush."""
+    connection = db_session.connection()
+    calls = []
+
+    def session_factory() -> Session:
+        calls.append(None)
+        if len(calls) == 1:
+            raise RuntimeError("Database is down.")
+        return TestingSessionLocal(bind=connection)
+
+    batcher = InventoryClaimBatcher(
+        session_factory=session_factory, window_ms=1
+    )
+
+    with pytest.raises(RuntimeError):
+        batcher.claim(user_id=create_test_user.id, item_id=create_test_item.id)
+    item = batcher.claim(
+        user_id=create_test_user.id, item_id=create_test_item.id
+    )
+    assert item.owner_id == create_test_user.id
+
+
+def test_slow_flush_times_out(
+        create_test_user: User,
+        create_test_item: models.Item
+):
+    """Test that a caller gives up with a 503 on a stuck flush."""
+    unblock = threading.Event()
+
+    def session_factory() -> Session:
+        unblock.wait()
+        raise RuntimeError("Database is down.")
+
+    batcher = InventoryClaimBatcher(
+        session_factory=session_factory, window_ms=1, timeout_ms=50
+    )
+
+    try:
+        with pytest.raises(HTTPException) as exc_info:
+            batcher.claim(
+                user_id=create_test_user.id, item_id=create_test_item.id
+            )
+    finally:
+        unblock.set()
+    assert exc_info.value.status_code == 503
+    assert exc_info.value.headers == {"Retry-After": "1"}
@@ -0,0 +1,115 @@
+import gzip
+
+from fastapi import FastAPI
+from fastapi.responses import Response, StreamingResponse
+from fastapi.testclient import TestClient
+
+from compression import CompressionMiddleware, choose_encoding
+
+
+def make_client() -> TestClient:
+    """Build a tiny app behind the compression middleware."""
+    app = FastAPI()
+
+    @app.get("/large")
+    def large() -> dict:
+        return {"items": ["cyberdeck"] * 500}
+
+    @app.get("/small")
+    def small() -> dict:
+        return {"ok": True}
+
+    @app.get("/image")
+    def image() -> Response:
+        return Response(b"\x89PNG" * 1000, media_type="image/png")
+
+    @app.get("/stream")
+    def stream() -> StreamingResponse:
+        return StreamingResponse(
+            (b"chunk %d\n" % i for i in range(1000)),
+            media_type="text/plain"
+        )
+
+    @app.get("/events")
+    def events() -> StreamingResponse:
+        return StreamingResponse(
+            (b"data: %d\n\n" % i for i in range(1000)),
+            media_type="text/event-stream"
+        )
+
+    app.add_middleware(CompressionMiddleware, minimum_size=500)
+    return TestClient(app)
+
+
+def test_choose_encoding():
+    """Test Accept-Encoding negotiation with quality values."""
+    assert choose_encoding("gzip, deflate") == "gzip"
+    assert choose_encoding("gzip;q=0, deflate") is None
+    assert choose_encoding("*") is not None
+    assert choose_encoding("") is None
+
+
+def test_compresses_large_json_only():
+    """Test the size threshold and the content-type allowlist."""
+    client = make_client()
+
+    response = client.get("/large", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["vary"]
+    assert response.json() == {"items": ["cyberdeck"] * 500}
+
+    response = client.get("/small", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+
+    response = client.get("/image", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+
+    response = client.get("/large", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in response.headers
+
+
+def test_compresses_streaming_responses():
+    """Test that streamed bodies are compressed chunk by chunk."""
+    client = make_client()
+
+    with client.stream(
+            "GET", "/stream", headers={"Accept-Encoding": "gzip"}
+    ) as response:
+        assert response.headers["content-encoding"] == "gzip"
+        assert "content-length" not in response.headers
+        raw = b"".join(response.iter_raw())
+
+    assert gzip.decompress(raw) == b"".join(
+        b"chunk %d\n" % i for i in range(1000)
+    )
+
+
+def test_event_streams_are_not_compressed():
+    """Test that server-sent events are passed through as they are."""
+    client = make_client()
+
+    with client.stream(
+            "GET", "/events", headers={"Accept-Encoding": "gzip"}
+    ) as response:
+        assert "content-encoding" not in response.headers
+        raw = b"".join(response.iter_raw())
+
+    assert raw.startswith(b"data: 0\n\n")
+
+
+def test_reuses_precompressed_bodies():
+    """Test that identical GET bodies are compressed only once."""
+    app = FastAPI()
+
+    @app.get("/catalog")
+    def catalog() -> dict:
+        return {"items": ["katana"] * 500}
+
+    middleware = CompressionMiddleware(app, minimum_size=500)
+    client = TestClient(middleware)
+
+    first = client.get("/catalog", headers={"Accept-Encoding": "gzip"})
+    second = client.get("/catalog", headers={"Accept-Encoding": "gzip"})
+
+    assert first.json() == second.json()
+    assert len(middleware._cache) == 1
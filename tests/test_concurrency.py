@@ -0,0 +1,135 @@
+from fastapi import FastAPI
+from starlette.testclient import TestClient
+
+from concurrency import AdaptiveLimiter, ConcurrencyLimitMiddleware
+
+
+class FakeClock:
+    """Clock advanced by hand."""
+
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_client(limiter: AdaptiveLimiter) -> TestClient:
+    """Build an app behind the concurrency limiter."""
+    app = FastAPI()
+
+    @app.get("/items/")
+    def read_items() -> dict:
+        return {}
+
+    @app.post("/token")
+    def login() -> dict:
+        return {}
+
+    app.add_middleware(ConcurrencyLimitMiddleware, limiter=limiter)
+    return TestClient(app)
+
+
+def test_lower_priorities_are_shed_first():
+    """Test that catalog browsing is rejected before logins."""
+    limiter = AdaptiveLimiter(initial_limit=4)
+    assert all(limiter.acquire("low") is not None for _ in range(3))
+
+    assert limiter.acquire("low") is None
+    assert limiter.acquire("high") is not None
+    assert limiter.acquire("high") is None
+    assert limiter.stats()["admitted"] == {"low": 3, "high": 1}
+    assert limiter.stats()["rejected"] == {"low": 1, "high": 1}
+
+
+def test_limit_follows_latency():
+    """Test additive increase and multiplicative decrease."""
+    clock = FakeClock()
+    limiter = AdaptiveLimiter(
+        initial_limit=10, min_limit=2, tolerance=2, backoff=0.5, clock=clock
+    )
+
+    limiter.acquire("normal")
+    limiter.release(0.1, busy=True, status=200)
+    assert limiter.limit == 10.1
+
+    for _ in range(3):
+        limiter.acquire("normal")
+        limiter.release(0.5, busy=True, status=200)
+    assert limiter.limit == 5.05
+
+    clock.now = 1
+    limiter.acquire("normal")
+    limiter.release(0.1, busy=True, status=500)
+    assert limiter.limit == 2.525
+
+    clock.now = 2
+    limiter.acquire("normal")
+    limiter.release(0.5, busy=True, status=200)
+    assert limiter.limit == 2
+    assert limiter.in_flight == 0
+
+
+def test_fast_client_errors_do_not_lower_the_baseline():
+    """
+    Test that quick 4xx responses mixed into steady traffic neither
+    pin the baseline nor shed load the worker can handle.
+    """
+    clock = FakeClock()
+    limiter = AdaptiveLimiter(initial_limit=20, min_limit=4, clock=clock)
+
+    for request in range(2000):
+        clock.now += 0.01
+        busy = limiter.acquire("normal")
+        if request % 10 == 0:
+            limiter.release(0.0005, busy=busy, status=401)
+        else:
+            limiter.release(0.01, busy=busy, status=200)
+
+    assert limiter.baseline == 0.01
+    assert limiter.limit == 20
+
+
+def test_baseline_follows_a_slower_database():
+    """Test that the baseline is relearned from recent responses."""
+    limiter = AdaptiveLimiter(initial_limit=20, window=50)
+
+    for latency in [0.001] * 50 + [0.01] * 50:
+        limiter.acquire("normal")
+        limiter.release(latency, busy=False, status=200)
+
+    assert limiter.baseline == 0.01
+
+
+def test_limit_only_grows_when_used():
+    """Test that an idle worker does not raise its limit."""
+    limiter = AdaptiveLimiter(initial_limit=10)
+
+    busy = limiter.acquire("normal")
+    limiter.release(0.1, busy=busy, status=200)
+
+    assert busy is False
+    assert limiter.limit == 10
+
+
+def test_requests_over_the_limit_get_503():
+    """Test the rejection of requests beyond their class's share."""
+    limiter = AdaptiveLimiter(initial_limit=4)
+    client = make_client(limiter)
+    limiter.in_flight = 3
+
+    response = client.get("/items/")
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
+
+    assert client.post("/token").status_code == 200
+    assert limiter.in_flight == 3
+    assert limiter.readiness() == {"ok": True, "in_flight": 3, "limit": 4.25}
+
+
+def test_limiter_is_a_readiness_check():
+    """Test that a worker whose slots are all taken is not ready."""
+    limiter = AdaptiveLimiter(initial_limit=4)
+    limiter.in_flight = 4
+
+    assert limiter.readiness()["ok"] is False
@@ -0,0 +1,112 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from starlette.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+from inventory import models
+from inventory.events import EventHub, inventory_events, sse_stream
+from users.auth import create_user_access_token
+from users.models import User
+
+
+def test_publish_reaches_only_the_users_subscriptions():
+    """Test that events published from another thread are delivered."""
+    hub = EventHub(max_queue=4)
+
+    async def scenario():
+        mine = hub.subscribe(user_id=1)
+        other = hub.subscribe(user_id=2)
+        thread = threading.Thread(
+            target=hub.publish, args=(1, {"type": "item_added"})
+        )
+        thread.start()
+        thread.join()
+
+        assert await asyncio.wait_for(mine.get(), 1) == {"type": "item_added"}
+        await asyncio.sleep(0)
+        assert other._queue.empty()
+
+    asyncio.run(scenario())
+
+
+def test_slow_consumer_is_evicted():
+    """Test that a subscription whose queue overflows is dropped."""
+    hub = EventHub(max_queue=2)
+
+    async def scenario():
+        subscription = hub.subscribe(user_id=1)
+        for item_id in range(3):
+            hub.publish(1, {"type": "item_added", "item_id": item_id})
+        await asyncio.sleep(0)
+
+        assert subscription.evicted
+        assert await subscription.get() is None
+        assert hub.connection_count() == 0
+        assert hub.evictions == 1
+
+    asyncio.run(scenario())
+
+
+def test_sse_stream_formats_events():
+    """Test the event stream's events, keep-alives and eviction."""
+    hub = EventHub(max_queue=1)
+
+    async def scenario():
+        subscription = hub.subscribe(user_id=1)
+        stream = sse_stream(subscription, heartbeat=0.01)
+
+        assert await stream.__anext__() == ": keep-alive\n\n"
+        hub.publish(1, {"type": "item_added", "item_id": 7})
+        assert await stream.__anext__() == (
+            'event: item_added\ndata: {"type": "item_added", "item_id": 7}\n\n'
+        )
+        hub.publish(1, {"type": "item_added", "item_id": 8})
+        hub.publish(1, {"type": "item_added", "item_id": 9})
+        await asyncio.sleep(0)
+        assert await stream.__anext__() == "event: evicted\ndata: {}\n\n"
+
+    asyncio.run(scenario())
+
+
+def test_websocket_receives_inventory_changes(
+        test_client: TestClient,
+        create_test_user: User,
+        create_test_item: models.Item
+):
+    """Test that adding and removing an item is pushed to the owner."""
+    item_id = create_test_item.id
+    token = create_user_access_token(create_test_user)
+    headers = {"Authorization": f"Bearer {token}"}
+
+    with test_client.websocket_connect(
+            f"/inventory/events/ws?token={token}"
+    ) as websocket:
+        test_client.post(f"/inventory/add/{item_id}", headers=headers)
+        assert websocket.receive_json() == {
+            "type": "item_added", "item_id": item_id
+        }
+
+        test_client.delete(f"/inventory/remove/{item_id}", headers=headers)
+        assert websocket.receive_json() == {
+            "type": "item_removed", "item_id": item_id
+        }
+
+    # The server side of the socket finishes in the test client's thread.
+    deadline = time.monotonic() + 1
+    while inventory_events.connection_count() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert inventory_events.connection_count() == 0
+
+
+def test_websocket_rejects_invalid_token(test_client: TestClient):
+    """Test that a connection without a valid token is refused."""
+    with pytest.raises(WebSocketDisconnect) as exc_info:
+        with test_client.websocket_connect(
+                "/inventory/events/ws?token=invalid"
+        ):
+            pass
+
+    assert exc_info.value.code == 1008
@@ -0,0 +1,152 @@
+import time
+
+import anyio
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import StaticPool
+from starlette.testclient import TestClient
+
+import health
+from health import (
+    InFlightMiddleware, ReadinessProbe, RequestGauge, migration_heads
+)
+from config import DEFAULT_WORLD
+from main import app
+
+
+@pytest.fixture
+def probe(monkeypatch) -> ReadinessProbe:
+    """Serve /readyz from a probe of a database of its own."""
+    engine = create_engine(
+        "sqlite://",
+        poolclass=StaticPool,
+        connect_args={"check_same_thread": False}
+    )
+    probe = ReadinessProbe(
+        engines={DEFAULT_WORLD: engine},
+        gauge=RequestGauge(),
+        db_budget=1,
+        max_in_flight=2
+    )
+    monkeypatch.setattr(health, "readiness_probe", probe)
+    return probe
+
+
+def set_alembic_version(
+        probe: ReadinessProbe,
+        revision: str,
+        world: str = DEFAULT_WORLD
+) -> None:
+    """Stamp a world's probed database with a migration revision."""
+    with probe.engines[world].begin() as connection:
+        connection.execute(text(
+            "CREATE TABLE IF NOT EXISTS alembic_version "
+            "(version_num VARCHAR(32) NOT NULL)"
+        ))
+        connection.execute(text("DELETE FROM alembic_version"))
+        connection.execute(
+            text("INSERT INTO alembic_version VALUES (:revision)"),
+            {"revision": revision}
+        )
+
+
+def test_healthz():
+    """Test that liveness does not depend on anything."""
+    response = TestClient(app).get("/healthz")
+
+    assert response.status_code == 200
+    assert response.json() == {"status": "ok"}
+
+
+def test_readyz(probe: ReadinessProbe):
+    """Test a ready worker, with and without Alembic managing the schema."""
+    client = TestClient(app)
+
+    response = client.get("/readyz")
+    assert response.status_code == 200
+    assert response.json()["status"] == "ready"
+
+    set_alembic_version(probe, migration_heads()[0])
+    response = client.get("/readyz")
+    assert response.status_code == 200
+    assert response.json()["checks"]["migrations"]["current"] == list(
+        migration_heads()
+    )
+
+
+def test_readyz_behind_migrations(probe: ReadinessProbe):
+    """Test that an outdated schema is not ready."""
+    set_alembic_version(probe, "0cb5e53f6c9d")
+
+    response = TestClient(app).get("/readyz")
+
+    assert response.status_code == 503
+    assert response.json()["checks"]["migrations"]["ok"] is False
+
+
+def test_readyz_checks_every_world(probe: ReadinessProbe, tmp_path):
+    """Test that an outdated or broken world database is not ready."""
+    probe.engines["moon"] = create_engine(f"sqlite:///{tmp_path}/moon.db")
+    set_alembic_version(probe, migration_heads()[0])
+    set_alembic_version(probe, "0cb5e53f6c9d", world="moon")
+
+    response = TestClient(app).get("/readyz")
+    assert response.status_code == 503
+    checks = response.json()["checks"]
+    assert checks["migrations"]["ok"] is True
+    assert checks["migrations:moon"]["ok"] is False
+
+    probe.engines["moon"] = create_engine(
+        f"sqlite:///{tmp_path}/missing/moon.db"
+    )
+    response = TestClient(app).get("/readyz")
+    assert response.status_code == 503
+    assert response.json()["checks"]["database:moon"]["ok"] is False
+
+
+def test_readyz_sheds_load(probe: ReadinessProbe):
+    """Test that an overloaded worker reports itself unavailable."""
+    probe.gauge.in_flight = 3
+
+    response = TestClient(app).get("/readyz")
+
+    assert response.status_code == 503
+    assert response.json()["checks"]["load"] == {
+        "ok": False, "in_flight": 3, "limit": 2
+    }
+
+
+def test_readyz_database_budget(probe: ReadinessProbe, monkeypatch):
+    """Test that a database slower than the budget fails the check."""
+    check_database = probe.check_database
+
+    def slow_check_database():
+        time.sleep(0.3)
+        return check_database()
+
+    monkeypatch.setattr(probe, "check_database", slow_check_database)
+    probe.db_budget = 0.1
+
+    response = TestClient(app).get("/readyz")
+
+    assert response.status_code == 503
+    assert response.json()["checks"]["database"] == {
+        "ok": False, "error": "timeout"
+    }
+
+
+def test_event_streams_are_not_counted():
+    """Test that open event streams do not count as load."""
+    gauge = RequestGauge()
+    seen = []
+
+    async def app(scope, receive, send) -> None:
+        seen.append(gauge.in_flight)
+
+    middleware = InFlightMiddleware(app, gauge)
+    for path in ("/inventory/events", "/readyz", "/items/"):
+        anyio.run(middleware, {"type": "http", "path": path}, None, None)
+
+    assert seen == [0, 0, 1]
+    assert gauge.in_flight == 0
@@ -0,0 +1,259 @@
+import pytest
+from fastapi import HTTPException
+from sqlalchemy.orm import Session
+from starlette.testclient import TestClient
+
+from inventory import schemas, crud, models
+from users.auth import create_access_token, create_user_access_token
+from users.models import User
+
+
+@pytest.fixture(scope="function")
+def create_test_ammo(
+        db_session: Session,
+        create_test_user: User,
+        create_test_category: models.Category
+) -> models.Item:
+    """Fixture to create a stackable item with plenty of stock."""
+    item = models.Item(
+        name="Ammo",
+        category=create_test_category.name,
+        quantity=1000,
+        price=1.0,
+        creator_id=create_test_user.id
+    )
+    db_session.add(item)
+    db_session.commit()
+    yield item
+
+
+def test_acquire_item_stack_increments_one_row(
+        db_session: Session,
+        create_test_user: User,
+        create_test_ammo: models.Item
+):
+    """Test that acquiring units grows a single stack."""
+    for _ in range(3):
+        holding = crud.acquire_item_stack(
+            db=db_session,
+            user_id=create_test_user.id,
+            item_id=create_test_ammo.id,
+            quantity=333
+        )
+
+    assert holding.quantity == 999
+    assert crud.get_user_holdings_query(
+        db=db_session, user_id=create_test_user.id
+    ).count() == 1
+
+    db_session.refresh(create_test_ammo)
+    assert create_test_ammo.quantity == 1
+
+    with pytest.raises(HTTPException) as exc_info:
+        crud.acquire_item_stack(
+            db=db_session,
+            user_id=create_test_user.id,
+            item_id=create_test_ammo.id,
+            quantity=2
+        )
+    assert exc_info.value.status_code == 400
+    assert exc_info.value.detail == "Not enough items in stock."
+
+
+def test_owned_items_are_not_stacks(
+        db_session: Session,
+        create_test_user: User,
+        create_test_item: models.Item
+):
+    """Test that claiming and removing a whole item leaves stacks alone."""
+    crud.add_item_to_inventory(
+        db=db_session, user_id=create_test_user.id, item_id=create_test_item.id
+    )
+    assert crud.get_user_holdings_query(
+        db=db_session, user_id=create_test_user.id
+    ).count() == 0
+
+    crud.acquire_item_stack(
+        db=db_session,
+        user_id=create_test_user.id,
+        item_id=create_test_item.id,
+        quantity=1
+    )
+    crud.remove_item_from_inventory(
+        db=db_session, user_id=create_test_user.id, item_id=create_test_item.id
+    )
+    holdings = crud.get_user_holdings_query(
+        db=db_session, user_id=create_test_user.id
+    ).all()
+    assert [(h.item_id, h.quantity) for h in holdings] \
+        == [(create_test_item.id, 1)]
+
+
+def test_consume_holdings_is_all_or_nothing(
+        db_session: Session,
+        create_test_user: User,
+        create_test_ammo: models.Item,
+        create_test_item: models.Item
+):
+    """Test that consuming several stacks fails without partial changes."""
+    crud.acquire_item_stack(
+        db=db_session,
+        user_id=create_test_user.id,
+        item_id=create_test_ammo.id,
+        quantity=10
+    )
+    crud.acquire_item_stack(
+        db=db_session,
+        user_id=create_test_user.id,
+        item_id=create_test_item.id,
+        quantity=1
+    )
+
+    with pytest.raises(HTTPException) as exc_info:
+        crud.consume_holdings(
+            db=db_session,
+            user_id=create_test_user.id,
+            consume=schemas.HoldingsConsume(items=[
+                {"item_id": create_test_ammo.id, "quantity": 5},
+                {"item_id": create_test_item.id, "quantity": 2}
+            ])
+        )
+    assert exc_info.value.status_code == 400
+
+    holdings = crud.consume_holdings(
+        db=db_session,
+        user_id=create_test_user.id,
+        consume=schemas.HoldingsConsume(items=[
+            {"item_id": create_test_ammo.id, "quantity": 5},
+            {"item_id": create_test_ammo.id, "quantity": 5},
+            {"item_id": create_test_item.id, "quantity": 1}
+        ])
+    )
+    assert [holding.quantity for holding in holdings] == [0, 0]
+
+
+def test_craft_item_follows_recipe(
+        db_session: Session,
+        create_test_user: User,
+        create_test_ammo: models.Item,
+        create_test_item: models.Item
+):
+    """Test that crafting consumes the recipe and takes produced stock."""
+    ammo_id, item_id = create_test_ammo.id, create_test_item.id
+    user_id = create_test_user.id
+    recipe = crud.create_recipe(
+        db=db_session,
+        recipe=schemas.RecipeCreate(
+            item_id=item_id,
+            quantity=2,
+            ingredients=[{"item_id": ammo_id, "quantity": 10}]
+        )
+    )
+    crud.acquire_item_stack(
+        db=db_session, user_id=user_id, item_id=ammo_id, quantity=30
+    )
+
+    holding = crud.craft_item(
+        db=db_session,
+        user_id=user_id,
+        craft=schemas.CraftRequest(recipe_id=recipe.id, count=2)
+    )
+    assert holding.quantity == 4
+
+    db_session.refresh(create_test_item)
+    assert create_test_item.quantity == 1
+    with pytest.raises(HTTPException) as exc_info:
+        crud.craft_item(
+            db=db_session,
+            user_id=user_id,
+            craft=schemas.CraftRequest(recipe_id=recipe.id, count=10)
+        )
+    assert exc_info.value.detail == "Not enough items in inventory."
+
+    with pytest.raises(HTTPException) as exc_info:
+        crud.craft_item(
+            db=db_session,
+            user_id=user_id,
+            craft=schemas.CraftRequest(recipe_id=recipe.id)
+        )
+    assert exc_info.value.detail == "Not enough items in stock."
+
+
+def test_recipe_cannot_consume_its_product(
+        db_session: Session,
+        create_test_item: models.Item
+):
+    """Test that a recipe producing one of its ingredients is rejected."""
+    with pytest.raises(HTTPException) as exc_info:
+        crud.create_recipe(
+            db=db_session,
+            recipe=schemas.RecipeCreate(
+                item_id=create_test_item.id,
+                ingredients=[{"item_id": create_test_item.id, "quantity": 1}]
+            )
+        )
+    assert exc_info.value.status_code == 400
+
+
+def test_craft_item_endpoint(
+        test_client: TestClient,
+        db_session: Session,
+        create_test_user: User,
+        create_test_ammo: models.Item,
+        create_test_item: models.Item
+):
+    """Test creating a recipe and crafting it through the API."""
+    ammo_id, item_id = create_test_ammo.id, create_test_item.id
+    headers = {
+        "Authorization": "Bearer " + create_access_token(
+            data={"sub": str(create_test_user.id)}
+        )
+    }
+    recipe = {
+        "item_id": item_id,
+        "ingredients": [{"item_id": ammo_id, "quantity": 20}]
+    }
+
+    response = test_client.post("/recipes/", json=recipe, headers=headers)
+    assert response.status_code == 403
+
+    create_test_user.is_superuser = True
+    db_session.add(create_test_user)
+    db_session.commit()
+    superuser_headers = {
+        "Authorization": "Bearer " + create_user_access_token(
+            create_test_user
+        )
+    }
+    response = test_client.post(
+        "/recipes/", json=recipe, headers=superuser_headers
+    )
+    assert response.status_code == 200
+    recipe_id = response.json()["id"]
+    assert response.json()["quantity"] == 1
+
+    response = test_client.post(
+        f"/inventory/holdings/{ammo_id}?quantity=30", headers=headers
+    )
+    assert response.status_code == 200
+    assert response.json() == {"item_id": ammo_id, "quantity": 30}
+
+    response = test_client.post(
+        "/inventory/holdings/craft",
+        json={"recipe_id": recipe_id},
+        headers=headers
+    )
+    assert response.status_code == 200
+    assert response.json() == {"item_id": item_id, "quantity": 1}
+
+    response = test_client.get("/inventory/holdings/", headers=headers)
+    assert response.status_code == 200
+    assert response.json()["items"] == [
+        {"item_id": ammo_id, "quantity": 10},
+        {"item_id": item_id, "quantity": 1}
+    ]
+
+    response = test_client.post(
+        "/inventory/holdings/craft", json={"recipe_id": 999}, headers=headers
+    )
+    assert response.status_code == 404
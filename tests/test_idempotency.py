@@ -0,0 +1,174 @@
+import uuid
+
+from fastapi import FastAPI, HTTPException
+from sqlalchemy.orm import Session
+from starlette.testclient import TestClient
+
+from idempotency import (
+    DatabaseIdempotencyStore, IdempotencyMiddleware, InMemoryIdempotencyStore,
+    StoredResponse, idempotency_scope
+)
+from tests.conftest import TestingSessionLocal
+from users.auth import create_access_token
+from users.models import User
+
+
+def make_client() -> tuple:
+    """Build an app counting how often its endpoints actually run."""
+    calls = []
+    app = FastAPI()
+
+    @app.post("/things/")
+    def create_thing(thing: dict) -> dict:
+        calls.append(thing)
+        return {"id": len(calls), **thing}
+
+    @app.post("/broken/")
+    def broken() -> dict:
+        calls.append(None)
+        raise HTTPException(status_code=503, detail="Try again.")
+
+    @app.post("/token")
+    def login() -> dict:
+        calls.append(None)
+        return {"access_token": uuid.uuid4().hex}
+
+    app.add_middleware(
+        IdempotencyMiddleware, store=InMemoryIdempotencyStore()
+    )
+    return TestClient(app), calls
+
+
+def test_retry_replays_response_without_running_endpoint():
+    """Test that a retried request gets the stored response."""
+    client, calls = make_client()
+    headers = {"Idempotency-Key": "abc"}
+
+    first = client.post("/things/", json={"name": "Katana"}, headers=headers)
+    retry = client.post("/things/", json={"name": "Katana"}, headers=headers)
+
+    assert len(calls) == 1
+    assert retry.status_code == first.status_code == 200
+    assert retry.json() == first.json() == {"id": 1, "name": "Katana"}
+    assert retry.headers["idempotent-replayed"] == "true"
+
+    client.post("/things/", json={"name": "Katana"})
+    assert len(calls) == 2
+
+
+def test_key_reused_for_different_request():
+    """Test that a user cannot reuse a key with another request body."""
+    client, calls = make_client()
+    headers = {
+        "Idempotency-Key": "abc",
+        "Authorization": "Bearer " + create_access_token(data={"sub": "7"})
+    }
+
+    client.post("/things/", json={"name": "Katana"}, headers=headers)
+    response = client.post(
+        "/things/", json={"name": "Shotgun"}, headers=headers
+    )
+
+    assert response.status_code == 422
+    assert len(calls) == 1
+
+
+def test_server_errors_are_not_stored():
+    """Test that a request failing with a 5xx can be retried."""
+    client, calls = make_client()
+    headers = {"Idempotency-Key": "abc"}
+
+    client.post("/broken/", headers=headers)
+    response = client.post("/broken/", headers=headers)
+
+    assert response.status_code == 503
+    assert len(calls) == 2
+
+
+def test_anonymous_keys_are_scoped_by_client_and_body():
+    """Test that anonymous clients picking the same key stay apart."""
+    def scope(address: str) -> dict:
+        return {"type": "http", "headers": [], "client": (address, 5000)}
+
+    assert idempotency_scope(scope("10.0.0.1"), b"{}") == idempotency_scope(
+        scope("10.0.0.1"), b"{}"
+    )
+    assert idempotency_scope(scope("10.0.0.1"), b"{}") != idempotency_scope(
+        scope("10.0.0.2"), b"{}"
+    )
+    assert idempotency_scope(scope("10.0.0.1"), b"{}") != idempotency_scope(
+        scope("10.0.0.1"), b"[]"
+    )
+
+
+def test_credentials_are_not_stored():
+    """Test that token responses are never replayed."""
+    client, calls = make_client()
+    headers = {"Idempotency-Key": "abc"}
+
+    first = client.post("/token", headers=headers)
+    retry = client.post("/token", headers=headers)
+
+    assert len(calls) == 2
+    assert "idempotent-replayed" not in retry.headers
+    assert retry.json() != first.json()
+
+
+def test_in_memory_store_is_bounded():
+    """Test that the oldest keys are dropped beyond ``max_keys``."""
+    store = InMemoryIdempotencyStore(max_keys=2)
+    for key in ("a", "b", "c"):
+        store.begin(key, "fingerprint", lock_timeout=60)
+
+    assert store.begin("a", "fingerprint", lock_timeout=60) is None
+    assert store.begin("c", "fingerprint", lock_timeout=60) is not None
+
+
+def test_database_store(db_session: Session):
+    """Test reserving, completing and taking over expired keys."""
+    store = DatabaseIdempotencyStore(
+        session_factory=lambda: TestingSessionLocal(
+            bind=db_session.connection()
+        )
+    )
+
+    assert store.begin("key", "fp", lock_timeout=60) is None
+    assert store.begin("key", "fp", lock_timeout=60) == StoredResponse(
+        fingerprint="fp"
+    )
+
+    response = StoredResponse(
+        fingerprint="fp",
+        status=200,
+        headers=(("content-type", "application/json"),),
+        body=b"{}"
+    )
+    store.complete("key", response, ttl=60)
+    assert store.begin("key", "fp", lock_timeout=60) == response
+
+    store.complete("key", response, ttl=-1)
+    assert store.begin("key", "other", lock_timeout=60) is None
+
+    store.release("key")
+    assert store.begin("key", "fp", lock_timeout=60) is None
+
+
+def test_register_retry_does_not_fail(
+        test_client: TestClient, db_session: Session
+):
+    """Test that retrying a registration returns the first response."""
+    headers = {"Idempotency-Key": uuid.uuid4().hex}
+    user_data = {
+        "username": "retrier",
+        "email": "retrier@example.com",
+        "password": "password123"
+    }
+
+    first = test_client.post("/register", json=user_data, headers=headers)
+    retry = test_client.post("/register", json=user_data, headers=headers)
+
+    assert first.status_code == retry.status_code == 200
+    assert retry.json() == first.json()
+    assert db_session.query(User).filter(
+        User.username == "retrier"
+    ).count() == 1
@@ -1,9 +1,15 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
 import pytest
 from fastapi import HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, sessionmaker
 
+from database import get_db
 from inventory import schemas, crud, models
 from fastapi.testclient import TestClient
+from main import app
+from users.auth import create_access_token
 from users.models import User
 
 
@@ -66,6 +72,137 @@ def test_remove_item_from_inventory(
     assert exc_info.value.detail == "Item not found in user's inventory."
 
 
+def test_add_item_to_inventory_owned_by_another_user(
+        db_session: Session,
+        create_test_user: User,
+        create_test_item: models.Item
+):
+    """Test that claiming another user's item is a conflict."""
+    other_user = User(
+        username="otheruser",
+        email="otheruser@example.com",
+        hashed_password="hashed",
+        is_active=True
+    )
+    db_session.add(other_user)
+    db_session.commit()
+
+    crud.add_item_to_inventory(
+        db=db_session, user_id=create_test_user.id, item_id=create_test_item.id
+    )
+
+    with pytest.raises(HTTPException) as exc_info:
+        crud.add_item_to_inventory(
+            db=db_session, user_id=other_user.id, item_id=create_test_item.id
+        )
+    assert exc_info.value.status_code == 409
+    assert exc_info.value.detail == "Item is owned by another user."
+
+    db_session.refresh(create_test_item)
+    assert create_test_item.owner_id == create_test_user.id
+
+
+def test_stale_claims_after_the_first_conflict(
+        db_session: Session,
+        create_test_item: models.Item
+):
+    """
+    Test that claims made from a stale view of an unowned item get a 409
+    once the first claim went through, leaving the first owner in place.
+    """
+    players = [
+        User(
+            username=f"player{i}",
+            email=f"player{i}@example.com",
+            hashed_password="hashed",
+            is_active=True
+        )
+        for i in range(10)
+    ]
+    db_session.add_all(players)
+    db_session.commit()
+
+    # Every player has seen the item as unowned before claiming it.
+    assert create_test_item.owner_id is None
+
+    winners, conflicts = [], 0
+    for player in players:
+        try:
+            crud.add_item_to_inventory(
+                db=db_session, user_id=player.id, item_id=create_test_item.id
+            )
+            winners.append(player.id)
+        except HTTPException as exc:
+            assert exc.status_code == 409
+            conflicts += 1
+
+    assert len(winners) == 1
+    assert conflicts == len(players) - 1
+
+    db_session.refresh(create_test_item)
+    assert create_test_item.owner_id == winners[0]
+
+
+def test_parallel_claims_have_single_winner(
+        committing_sessions: sessionmaker
+):
+    """
+    Test that players racing to claim one item, each on a connection of
+    their own, produce exactly one owner and 409s for everyone else.
+    """
+    workers = 8
+    with committing_sessions() as db:
+        players = [
+            User(
+                username=f"racer{i}",
+                email=f"racer{i}@example.com",
+                hashed_password="hashed",
+                is_active=True
+            )
+            for i in range(workers)
+        ]
+        db.add_all(players)
+        db.add(models.Category(name="Loot"))
+        db.flush()
+        item = models.Item(
+            name="Prize",
+            category="Loot",
+            quantity=1,
+            price=1.0,
+            creator_id=players[0].id
+        )
+        db.add(item)
+        db.commit()
+        item_id, player_ids = item.id, [player.id for player in players]
+
+    def override_get_db():
+        with committing_sessions() as db:
+            yield db
+
+    barrier = threading.Barrier(workers)
+
+    def claim(player_id: int) -> int:
+        token = create_access_token(data={"sub": str(player_id)})
+        client = TestClient(app)
+        barrier.wait()
+        return client.post(
+            f"/inventory/add/{item_id}",
+            headers={"Authorization": f"Bearer {token}"}
+        ).status_code
+
+    app.dependency_overrides[get_db] = override_get_db
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            statuses = list(pool.map(claim, player_ids))
+    finally:
+        app.dependency_overrides.pop(get_db)
+
+    assert sorted(statuses) == [200] + [409] * (workers - 1)
+    with committing_sessions() as db:
+        owner_id = db.get(models.Item, item_id).owner_id
+    assert owner_id == player_ids[statuses.index(200)]
+
+
 def test_read_all_categories_pagination(
         test_client: TestClient,
         db_session: Session
@@ -154,3 +291,33 @@ def test_docs_redoc_available(test_client: TestClient):
     """Test if the ReDoc documentation is available."""
     response = test_client.get("/redoc")
     assert response.status_code == 200
+
+
+def test_items_sparse_fieldset(
+        test_client: TestClient,
+        db_session: Session,
+        create_test_item: models.Item
+):
+    """Test that fields= narrows both the query and the response."""
+    query = crud.get_all_items_query(db=db_session, fields=["id", "name"])
+    assert "description" not in str(query.statement)
+
+    response = test_client.get("/items/?fields=name,price")
+    assert response.status_code == 200
+    assert response.json()["items"] == [
+        {"id": create_test_item.id, "name": "Test Item", "price": 100.0}
+    ]
+
+    response = test_client.get(f"/items/{create_test_item.id}?fields=name")
+    assert response.json() == {"id": create_test_item.id, "name": "Test Item"}
+
+    response = test_client.get(f"/items/{create_test_item.id}")
+    assert response.json()["description"] == "Test Description"
+    assert response.json()["owner_id"] is None
+
+    response = test_client.get("/categories/?fields=name")
+    assert response.json()["items"][0].keys() == {"id", "name"}
+
+    response = test_client.get("/items/?fields=name,secret")
+    assert response.status_code == 400
+    assert "id" in response.json()["detail"]["allowed_fields"]
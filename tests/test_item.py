@@ -23,6 +23,22 @@ def test_get_item_by_id(db_session: Session, create_test_item: models.Item):
     assert exc_info.value.detail == "Item not found."
 
 
+def test_get_item_by_id_with_fields(
+        db_session: Session, create_test_item: models.Item
+):
+    """Test for getting only some columns of an item by its ID."""
+    item_id = create_test_item.id
+
+    result = crud.get_item_by_id(
+        db=db_session, item_id=item_id, fields=["id", "name"]
+    )
+
+    assert tuple(result) == (item_id, "Test Item")
+    assert crud.get_item_by_id(
+        db=db_session, item_id=item_id, fields=["name"]
+    ).name == "Test Item"
+
+
 def test_get_item_by_name(db_session: Session, create_test_item: models.Item):
     """Test for getting an item by its name."""
     result = crud.get_item_by_name(db=db_session, name=create_test_item.name)
@@ -395,3 +411,56 @@ def test_delete_item_unauthorized(
     response = test_client.delete(url=f"/items/{item.id}")
     assert response.status_code == 401
     assert response.json()["detail"] == "Not authenticated"
+
+
+def test_get_items_by_ids(
+        db_session: Session,
+        create_test_user: User,
+        create_test_category: models.Category
+):
+    """Test fetching several items in the requested order."""
+    items = [
+        models.Item(
+            name=f"Batch Item {i}",
+            category=create_test_category.name,
+            quantity=1,
+            price=10.0,
+            creator_id=create_test_user.id
+        )
+        for i in range(3)
+    ]
+    db_session.add_all(items)
+    db_session.commit()
+    ids = [item.id for item in items]
+
+    found, missing = crud.get_items_by_ids(
+        db=db_session, item_ids=[ids[2], 999, ids[0], ids[2]]
+    )
+
+    assert [item.id for item in found] == [ids[2], ids[0]]
+    assert missing == [999]
+
+
+def test_read_item_batch(
+        test_client: TestClient,
+        create_test_item: models.Item
+):
+    """Test the batch endpoints with query string and body."""
+    item_id = create_test_item.id
+
+    response = test_client.get(f"/items/batch?ids=998,{item_id}")
+    assert response.status_code == 200
+    assert [item["id"] for item in response.json()["items"]] == [item_id]
+    assert response.json()["missing"] == [998]
+
+    response = test_client.post("/items/batch", json={"ids": [item_id]})
+    assert response.status_code == 200
+    assert response.json()["items"][0]["name"] == "Test Item"
+
+    response = test_client.get("/items/batch?ids=1,two")
+    assert response.status_code == 400
+
+    response = test_client.get(
+        "/items/batch?ids=" + ",".join(str(i) for i in range(101))
+    )
+    assert response.status_code == 400
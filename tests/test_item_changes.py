@@ -0,0 +1,126 @@
+import threading
+
+from sqlalchemy.orm import Session, sessionmaker
+from starlette.testclient import TestClient
+
+from inventory import crud, models, schemas
+from users.auth import create_access_token
+from users.models import User
+
+
+def test_item_writes_are_logged(
+        db_session: Session,
+        create_test_user: User,
+        create_test_category: models.Category
+):
+    """Test that every item write appends to the change log in order."""
+    item = crud.create_item(
+        db=db_session,
+        item=schemas.ItemCreate(
+            name="Gorilla Arms",
+            category=create_test_category.name,
+            quantity=1,
+            price=3000.0
+        ),
+        creator_id=create_test_user.id
+    )
+    item_id = item.id
+    user_id = create_test_user.id
+    crud.update_item_description(
+        db=db_session,
+        item_id=item_id,
+        updated_item_data=schemas.ItemUpdateDescription(description="Heavy.")
+    )
+    crud.add_item_to_inventory(db=db_session, user_id=user_id, item_id=item_id)
+    crud.remove_item_from_inventory(
+        db=db_session, user_id=user_id, item_id=item_id
+    )
+    crud.delete_item(db=db_session, item_id=item_id)
+
+    changes, has_more = crud.get_item_changes(db=db_session, since=0, limit=10)
+
+    assert not has_more
+    assert [(c.item_id, c.kind, c.owner_id) for c in changes] == [
+        (item_id, "created", None),
+        (item_id, "updated", None),
+        (item_id, "owner_changed", user_id),
+        (item_id, "owner_changed", None),
+        (item_id, "deleted", None),
+    ]
+    versions = [c.version for c in changes]
+    assert versions == sorted(versions)
+
+
+def test_read_item_changes_pages(
+        test_client: TestClient,
+        create_test_user: User,
+        create_test_item: models.Item
+):
+    """Test paging through the change feed with next_since."""
+    item_id = create_test_item.id
+    token = create_access_token(data={"sub": str(create_test_user.id)})
+    headers = {"Authorization": f"Bearer {token}"}
+    for description in ("One.", "Two.", "Three."):
+        test_client.put(
+            f"/items/{item_id}",
+            json={"description": description},
+            headers=headers
+        )
+
+    response = test_client.get("/items/changes?limit=2")
+    assert response.status_code == 200
+    page = response.json()
+    assert len(page["changes"]) == 2
+    assert page["has_more"] is True
+    assert page["next_since"] == page["changes"][-1]["version"]
+
+    response = test_client.get(
+        f"/items/changes?since={page['next_since']}&limit=2"
+    )
+    last_page = response.json()
+    assert [c["item_id"] for c in last_page["changes"]] == [item_id]
+    assert last_page["has_more"] is False
+
+    response = test_client.get(
+        f"/items/changes?since={last_page['next_since']}"
+    )
+    assert response.json()["changes"] == []
+    assert response.json()["next_since"] == last_page["next_since"]
+
+
+def test_read_item_changes_invalid_limit(test_client: TestClient):
+    """Test that an out-of-range limit is rejected."""
+    response = test_client.get("/items/changes?limit=0")
+
+    assert response.status_code == 400
+
+
+def test_versions_become_visible_in_commit_order(
+        committing_sessions: sessionmaker
+):
+    """
+    Test that a writer cannot take a version while an earlier writer's
+    version is uncommitted, so readers never skip a version.
+    """
+    first, second = committing_sessions(), committing_sessions()
+    crud.record_item_changes(first, [{"item_id": 1, "kind": "updated"}])
+
+    def write_second() -> None:
+        crud.record_item_changes(second, [{"item_id": 2, "kind": "updated"}])
+        second.commit()
+
+    writer = threading.Thread(target=write_second)
+    writer.start()
+    writer.join(timeout=0.5)
+    assert writer.is_alive()
+
+    first.commit()
+    writer.join(timeout=5)
+    assert not writer.is_alive()
+
+    with committing_sessions() as reader:
+        changes, _ = crud.get_item_changes(db=reader, since=0, limit=10)
+    assert [c.item_id for c in changes] == [1, 2]
+    assert changes[0].version < changes[1].version
+    first.close()
+    second.close()
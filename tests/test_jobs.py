@@ -0,0 +1,231 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+from starlette.testclient import TestClient
+
+from jobs import crud, models
+from jobs.registry import JOB_TYPES, JobType
+from jobs.worker import JobWorkerPool
+from tests.conftest import TestingSessionLocal
+from users.auth import create_user_access_token
+from users.models import User
+
+
+def report_and_return(db, payload, report_progress):
+    """Job reporting progress and echoing its payload."""
+    report_progress(0.5)
+    return {"echo": payload}
+
+
+def always_fail(db, payload, report_progress):
+    """Job that always fails."""
+    raise RuntimeError("boom")
+
+
+@pytest.fixture(scope="function")
+def job_types(monkeypatch) -> dict:
+    """Fixture registering the test job types."""
+    types = {
+        "echo": JobType(handler=report_and_return, max_concurrency=1),
+        "fail": JobType(handler=always_fail, max_attempts=2),
+    }
+    for name, job_type in types.items():
+        monkeypatch.setitem(JOB_TYPES, name, job_type)
+    yield types
+
+
+@pytest.fixture(scope="function")
+def pool(db_session: Session, job_types: dict) -> JobWorkerPool:
+    """Fixture with a worker pool sharing the test transaction."""
+    yield JobWorkerPool(
+        session_factory=lambda: TestingSessionLocal(
+            bind=db_session.connection()
+        ),
+        job_types=job_types
+    )
+
+
+def reload(db: Session, job: models.Job) -> models.Job:
+    """Read a job's current state."""
+    db.expire_all()
+    return db.get(models.Job, job.id)
+
+
+def test_job_runs_and_reports_result(db_session: Session, pool):
+    """Test that a queued job is claimed, run and completed."""
+    job = crud.enqueue_job(db=db_session, job_type="echo", payload={"a": 1})
+
+    assert pool.run_once() is True
+    job = reload(db_session, job)
+    assert job.status == "succeeded"
+    assert job.progress == 1.0
+    assert job.result == {"echo": {"a": 1}}
+    assert job.attempts == 1
+
+    assert pool.run_once() is False
+
+
+def test_failed_job_is_retried_with_backoff(db_session: Session, pool):
+    """Test that a failed attempt is retried later, then gives up."""
+    job = crud.enqueue_job(db=db_session, job_type="fail")
+
+    pool.run_once()
+    job = reload(db_session, job)
+    assert job.status == "queued"
+    assert job.attempts == 1
+    assert "boom" in job.error
+    assert pool.run_once() is False
+
+    db_session.execute(
+        update(models.Job)
+        .where(models.Job.id == job.id)
+        .values(run_after=datetime.now(tz=timezone.utc) - timedelta(1))
+    )
+    db_session.commit()
+    pool.run_once()
+
+    job = reload(db_session, job)
+    assert job.status == "failed"
+    assert job.attempts == 2
+    assert job.finished_at is not None
+
+
+def test_concurrency_limit_per_job_type(db_session: Session, pool):
+    """Test that a type at its concurrency limit is not claimed."""
+    crud.enqueue_job(db=db_session, job_type="echo")
+    pool._running["echo"] = 1
+
+    assert pool.run_once() is False
+
+    pool._running["echo"] = 0
+    assert pool.run_once() is True
+
+
+def test_expired_lease_is_claimed_again(db_session: Session, pool):
+    """Test that a job left running by a stopped worker is picked up."""
+    job = crud.enqueue_job(db=db_session, job_type="echo")
+    db_session.execute(
+        update(models.Job)
+        .where(models.Job.id == job.id)
+        .values(
+            status="running",
+            attempts=1,
+            locked_until=datetime.now(tz=timezone.utc) - timedelta(1)
+        )
+    )
+    db_session.commit()
+
+    assert pool.run_once() is True
+    job = reload(db_session, job)
+    assert job.status == "succeeded"
+    assert job.attempts == 2
+
+
+def test_stale_worker_cannot_change_a_reclaimed_job(
+        db_session: Session,
+        job_types: dict
+):
+    """Test that a worker whose lease expired no longer updates the job."""
+    job = crud.enqueue_job(db=db_session, job_type="echo")
+    attempts = [
+        crud.claim_job(
+            db=db_session, job_types=["echo"], lease_seconds=lease
+        ).attempts
+        for lease in (-1, 60)
+    ]
+    assert attempts == [1, 2]
+
+    assert crud.report_progress(
+        db=db_session, job_id=job.id, attempt=1, progress=0.9,
+        lease_seconds=60
+    ) is False
+    assert crud.finish_job(
+        db=db_session, job_id=job.id, attempt=1, result={"late": True}
+    ) is False
+    assert crud.fail_job(
+        db=db_session, job_id=job.id, attempt=1, error="late",
+        retry_at=None
+    ) is False
+    job = reload(db_session, job)
+    assert (job.status, job.result, job.error) == ("running", None, None)
+
+    assert crud.finish_job(
+        db=db_session, job_id=job.id, attempt=2, result={}
+    ) is True
+    assert reload(db_session, job).status == "succeeded"
+
+
+def test_read_job_permissions(
+        test_client: TestClient,
+        db_session: Session,
+        create_test_user: User,
+        job_types: dict
+):
+    """Test that only the job's creator can read it."""
+    other = User(
+        username="other", email="other@example.com", hashed_password="x"
+    )
+    db_session.add(other)
+    db_session.commit()
+    job = crud.enqueue_job(
+        db=db_session, job_type="echo", created_by=create_test_user.id
+    )
+    job_id = job.id
+    owner_token = create_user_access_token(create_test_user)
+    other_token = create_user_access_token(other)
+
+    response = test_client.get(
+        f"/jobs/{job_id}", headers={"Authorization": f"Bearer {owner_token}"}
+    )
+    assert response.status_code == 200
+    assert response.json()["status"] == "queued"
+
+    response = test_client.get(
+        f"/jobs/{job_id}", headers={"Authorization": f"Bearer {other_token}"}
+    )
+    assert response.status_code == 404
+
+
+def test_archive_endpoint_requires_superuser(
+        test_client: TestClient,
+        db_session: Session,
+        create_test_user: User
+):
+    """Test that only superusers can start the archival job."""
+    token = create_user_access_token(create_test_user)
+    headers = {"Authorization": f"Bearer {token}"}
+    response = test_client.post("/items/archive", headers=headers)
+    assert response.status_code == 403
+
+    create_test_user.is_superuser = True
+    db_session.add(create_test_user)
+    db_session.commit()
+    token = create_user_access_token(create_test_user)
+    headers = {"Authorization": f"Bearer {token}"}
+    response = test_client.post(
+        "/items/archive?after_days=7", headers=headers
+    )
+
+    assert response.status_code == 202
+    assert response.json()["type"] == "archive_deleted_items"
+    assert response.json()["status"] == "queued"
+
+
+def test_demoted_superuser_is_refused_at_once(
+        test_client: TestClient,
+        db_session: Session,
+        create_test_user: User
+):
+    """Test that admin routes check the database, not the token claims."""
+    create_test_user.is_superuser = True
+    db_session.commit()
+    token = create_user_access_token(create_test_user)
+    headers = {"Authorization": f"Bearer {token}"}
+
+    create_test_user.is_superuser = False
+    db_session.commit()
+    response = test_client.post("/items/archive", headers=headers)
+
+    assert response.status_code == 403
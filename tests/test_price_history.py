@@ -0,0 +1,166 @@
+from datetime import datetime, timezone
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from starlette.testclient import TestClient
+
+from inventory import crud, models
+from users.auth import create_access_token
+from users.models import User
+
+
+def at(hour: int, minute: int, day: int = 1) -> datetime:
+    """Return a moment on the given day of October 2077."""
+    return datetime(2077, 10, day, hour, minute, tzinfo=timezone.utc)
+
+
+def test_price_points_fold_into_candles(
+        db_session: Session,
+        create_test_item: models.Item
+):
+    """Test the hourly, daily and category candles of recorded prices."""
+    item_id = create_test_item.id
+    category = create_test_item.category
+    for price, moment in [
+        (100.0, at(9, 5)),
+        (140.0, at(9, 20)),
+        (80.0, at(9, 40)),
+        (120.0, at(9, 55)),
+        (90.0, at(10, 15)),
+    ]:
+        crud.record_price_points(
+            db_session, [(item_id, category, price)], recorded_at=moment
+        )
+    db_session.commit()
+
+    hours = crud.get_price_candles(
+        db=db_session, table=models.ItemPriceCandle, key=item_id,
+        resolution="hour", start=None, end=None, limit=10
+    )
+    assert [
+        (c.open, c.high, c.low, c.close, c.points) for c in hours
+    ] == [(100.0, 140.0, 80.0, 120.0, 4), (90.0, 90.0, 90.0, 90.0, 1)]
+
+    days = crud.get_price_candles(
+        db=db_session, table=models.CategoryPriceCandle, key=category,
+        resolution="day", start=None, end=None, limit=10
+    )
+    assert [
+        (c.open, c.high, c.low, c.close, c.points) for c in days
+    ] == [(100.0, 140.0, 80.0, 90.0, 5)]
+    assert db_session.scalar(
+        select(func.count()).select_from(models.ItemPrice)
+    ) == 5
+
+
+def test_late_price_point_keeps_close(
+        db_session: Session,
+        create_test_item: models.Item
+):
+    """Test that a point committed after a later one keeps its close."""
+    for price, moment in [(100.0, at(9, 40)), (140.0, at(9, 20))]:
+        crud.record_price_points(
+            db_session,
+            [(create_test_item.id, create_test_item.category, price)],
+            recorded_at=moment
+        )
+    db_session.commit()
+
+    hours = crud.get_price_candles(
+        db=db_session, table=models.ItemPriceCandle,
+        key=create_test_item.id, resolution="hour", start=None, end=None,
+        limit=10
+    )
+    assert [(c.high, c.close, c.points) for c in hours] \
+        == [(140.0, 100.0, 2)]
+
+
+def test_price_candle_ranges(
+        db_session: Session,
+        create_test_item: models.Item
+):
+    """Test reading candles by range and the latest ones by limit."""
+    item_id = create_test_item.id
+    for day in range(1, 6):
+        crud.record_price_points(
+            db_session,
+            [(item_id, create_test_item.category, float(day))],
+            recorded_at=at(12, 0, day=day)
+        )
+    db_session.commit()
+
+    def closes(**kwargs) -> list:
+        return [c.close for c in crud.get_price_candles(
+            db=db_session, table=models.ItemPriceCandle, key=item_id,
+            resolution="day", **kwargs
+        )]
+
+    assert closes(start=at(0, 0, day=2), end=at(0, 0, day=4), limit=10) \
+        == [2.0, 3.0]
+    assert closes(start=at(0, 0, day=2), end=None, limit=2) == [2.0, 3.0]
+    assert closes(start=None, end=None, limit=2) == [4.0, 5.0]
+
+
+def test_price_endpoints(
+        test_client: TestClient,
+        create_test_user: User,
+        create_test_category: models.Category,
+        create_test_item: models.Item
+):
+    """Test changing a price and reading it back as candles."""
+    item_id = create_test_item.id
+    category_id = create_test_category.id
+    token = create_access_token(data={"sub": str(create_test_user.id)})
+    headers = {"Authorization": f"Bearer {token}"}
+
+    for price in (200.0, 250.0, 150.0):
+        response = test_client.put(
+            f"/items/{item_id}/price", json={"price": price}, headers=headers
+        )
+        assert response.status_code == 200
+        assert response.json()["price"] == price
+
+    response = test_client.get(f"/items/{item_id}/prices")
+    assert response.status_code == 200
+    assert response.json()["resolution"] == "hour"
+    candle = response.json()["candles"][-1]
+    assert (candle["open"], candle["high"], candle["low"], candle["close"]) \
+        == (200.0, 250.0, 150.0, 150.0)
+
+    response = test_client.get(
+        f"/categories/{category_id}/prices", params={"resolution": "day"}
+    )
+    assert response.status_code == 200
+    assert response.json()["candles"][-1]["points"] == 3
+
+
+def test_price_endpoint_errors(
+        test_client: TestClient,
+        create_test_user: User,
+        create_test_item: models.Item
+):
+    """Test the validation of price changes and candle queries."""
+    item_id = create_test_item.id
+    token = create_access_token(data={"sub": str(create_test_user.id)})
+    headers = {"Authorization": f"Bearer {token}"}
+
+    assert test_client.put(
+        "/items/999/price", json={"price": 1.0}, headers=headers
+    ).status_code == 404
+    assert test_client.put(
+        f"/items/{item_id}/price", json={"price": -1.0}, headers=headers
+    ).status_code == 422
+    assert test_client.put(
+        f"/items/{item_id}/price", json={"price": 1.0}
+    ).status_code == 401
+
+    url = f"/items/{item_id}/prices"
+    assert test_client.get(
+        url, params={"resolution": "week"}
+    ).status_code == 400
+    assert test_client.get(url, params={"limit": 0}).status_code == 400
+    assert test_client.get(url, params={
+        "start": "2077-10-02T00:00:00Z", "end": "2077-10-01T00:00:00Z"
+    }).status_code == 400
+    assert test_client.get("/items/999/prices").status_code == 404
+    assert test_client.get("/categories/999/prices").status_code == 404
@@ -0,0 +1,178 @@
+import threading
+import time
+
+from fastapi import FastAPI
+from sqlalchemy.orm import Session
+from starlette.testclient import TestClient
+
+from profiling import ProfilingMiddleware, SamplingProfiler
+from tests.conftest import TestingSessionLocal
+from users.auth import create_user_access_token
+from users.models import User
+
+
+def busy_endpoint_work() -> None:
+    """Keep the request busy long enough to be sampled."""
+    deadline = time.monotonic() + 0.1
+    while time.monotonic() < deadline:
+        pass
+
+
+def busy_unprofiled_work() -> None:
+    """Keep an unprofiled request busy during the profiled one."""
+    deadline = time.monotonic() + 0.3
+    while time.monotonic() < deadline:
+        pass
+
+
+def make_client(db_session: Session, max_per_minute: int = 6) -> tuple:
+    """Build a profiled app with its own profiler."""
+    profiler = SamplingProfiler(interval=0.001)
+    app = FastAPI()
+
+    @app.get("/work")
+    def work() -> dict:
+        busy_endpoint_work()
+        return {}
+
+    @app.get("/other")
+    def other() -> dict:
+        busy_unprofiled_work()
+        return {}
+
+    connection = db_session.connection()
+    app.add_middleware(
+        ProfilingMiddleware,
+        profiler=profiler,
+        max_per_minute=max_per_minute,
+        session_factory=lambda world: (
+            lambda: TestingSessionLocal(bind=connection)
+        )
+    )
+    return TestClient(app), profiler
+
+
+def superuser_headers(db_session: Session, user: User) -> dict:
+    """Headers of a profiling request from a superuser."""
+    user.is_superuser = True
+    db_session.add(user)
+    db_session.commit()
+    token = create_user_access_token(user)
+    return {"Authorization": f"Bearer {token}", "X-Profile": "1"}
+
+
+def test_superuser_request_is_sampled(
+        db_session: Session, create_test_user: User
+):
+    """Test that an opted-in request's stacks are collected."""
+    client, profiler = make_client(db_session)
+
+    response = client.get(
+        "/work", headers=superuser_headers(db_session, create_test_user)
+    )
+
+    assert response.headers["x-profile"] == "sampled"
+    assert int(response.headers["x-profile-samples"]) > 0
+    lines = profiler.collapsed().splitlines()
+    assert any("busy_endpoint_work (tests/" in line for line in lines)
+    stack, count = lines[0].rsplit(" ", 1)
+    assert ";" in stack and int(count) > 0
+
+
+def test_concurrent_requests_are_left_out(
+        db_session: Session, create_test_user: User
+):
+    """Test that only the profiled request's threads are sampled."""
+    client, profiler = make_client(db_session)
+    headers = superuser_headers(db_session, create_test_user)
+    other = threading.Thread(target=client.get, args=("/other",))
+    other.start()
+    time.sleep(0.05)
+
+    response = client.get("/work", headers=headers)
+    other.join()
+
+    assert response.headers["x-profile"] == "sampled"
+    collapsed = profiler.collapsed()
+    assert "busy_endpoint_work (tests/" in collapsed
+    assert "busy_unprofiled_work" not in collapsed
+
+
+def test_other_users_are_not_profiled(
+        db_session: Session, create_test_user: User
+):
+    """Test that the header is ignored without superuser rights."""
+    client, profiler = make_client(db_session)
+    token = create_user_access_token(create_test_user)
+
+    response = client.get(
+        "/work", headers={"Authorization": f"Bearer {token}", "X-Profile": "1"}
+    )
+
+    assert "x-profile" not in response.headers
+    assert profiler.collapsed() == ""
+
+
+def test_demoted_superuser_is_not_profiled(
+        db_session: Session, create_test_user: User
+):
+    """Test that a token from before a demotion cannot turn on profiling."""
+    client, profiler = make_client(db_session)
+    headers = superuser_headers(db_session, create_test_user)
+    create_test_user.is_superuser = False
+    db_session.add(create_test_user)
+    db_session.commit()
+
+    response = client.get("/work", headers=headers)
+
+    assert response.status_code == 200
+    assert "x-profile" not in response.headers
+    assert profiler.collapsed() == ""
+
+
+def test_profiling_is_rate_limited(
+        db_session: Session, create_test_user: User
+):
+    """Test that requests over the limit run without profiling."""
+    client, profiler = make_client(db_session, max_per_minute=1)
+    headers = superuser_headers(db_session, create_test_user)
+
+    client.get("/work", headers=headers)
+    response = client.get("/work", headers=headers)
+
+    assert response.status_code == 200
+    assert response.headers["x-profile"] == "rate-limited"
+
+
+def test_zero_limit_disables_profiling(
+        db_session: Session, create_test_user: User
+):
+    """Test that a limit of 0 runs every request unprofiled."""
+    client, profiler = make_client(db_session, max_per_minute=0)
+
+    response = client.get(
+        "/work", headers=superuser_headers(db_session, create_test_user)
+    )
+
+    assert response.status_code == 200
+    assert "x-profile" not in response.headers
+    assert profiler.collapsed() == ""
+
+
+def test_profile_endpoint_requires_superuser(
+        test_client: TestClient,
+        db_session: Session,
+        create_test_user: User
+):
+    """Test downloading the collapsed stacks."""
+    token = create_user_access_token(create_test_user)
+    response = test_client.get(
+        "/admin/profile", headers={"Authorization": f"Bearer {token}"}
+    )
+    assert response.status_code == 403
+
+    headers = superuser_headers(db_session, create_test_user)
+    response = test_client.get("/admin/profile", headers=headers)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
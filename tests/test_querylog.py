@@ -0,0 +1,98 @@
+import json
+
+import pytest
+from fastapi import FastAPI
+from sqlalchemy.orm import Session
+from starlette.testclient import TestClient
+
+from inventory import crud, models
+from querylog import (
+    QueryContextMiddleware, SlowQueryLog, fingerprint, parameter_shape
+)
+
+
+@pytest.fixture
+def slow_query_caplog(db_session: Session, caplog):
+    """Log every statement of the test session as slow."""
+    query_log = SlowQueryLog(threshold=0, explain_limit=1)
+    engine = db_session.get_bind().engine
+    query_log.install(engine)
+    caplog.set_level("WARNING", logger="querylog")
+
+    yield caplog
+    query_log.remove(engine)
+
+
+def logged(caplog) -> list:
+    """Decode the slow query records logged so far."""
+    return [
+        json.loads(record.getMessage())
+        for record in caplog.records if record.name == "querylog"
+    ]
+
+
+def test_fingerprint_ignores_in_list_length():
+    """Test that statements differing in IN list size share a fingerprint."""
+    assert fingerprint(
+        "SELECT * FROM items WHERE id IN (?, ?)"
+    ) == fingerprint("SELECT *  FROM items\nWHERE id IN (?, ?, ?, ?)")
+    assert fingerprint(
+        "SELECT * FROM items WHERE id IN (%(id_1_1)s, %(id_1_2)s)"
+    ) != fingerprint("SELECT * FROM users WHERE id IN (%(id_1_1)s)")
+
+
+def test_parameter_shape_hides_values():
+    """Test that only parameter types are logged."""
+    assert parameter_shape({"name": "secret", "id": 3}) == {
+        "name": "str", "id": "int"
+    }
+    assert parameter_shape(("secret", 3)) == ["str", "int"]
+    assert parameter_shape([(1,), (2,)]) == {"rows": 2, "row": ["int"]}
+
+
+def test_slow_query_is_logged_with_plan(
+        db_session: Session,
+        create_test_item: models.Item,
+        slow_query_caplog
+):
+    """Test the logged record and that only the first one is explained."""
+    caplog = slow_query_caplog
+    name = create_test_item.name
+    caplog.clear()
+
+    crud.get_item_by_name(db=db_session, name=name)
+    crud.get_item_by_name(db=db_session, name=name)
+
+    first, second = logged(caplog)
+    assert first["function"] == "inventory.crud.get_item_by_name"
+    assert first["fingerprint"] == second["fingerprint"]
+    assert name not in json.dumps(first)
+    assert "str" in json.dumps(first["parameters"])
+    assert first["route"] is None
+    assert first["plan"]
+    assert "plan" not in second
+
+
+def test_slow_query_records_route(
+        db_session: Session,
+        create_test_item: models.Item,
+        slow_query_caplog
+):
+    """Test that queries run by an endpoint are logged with its route."""
+    caplog = slow_query_caplog
+    item_id = create_test_item.id
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    def read_item(item_id: int) -> dict:
+        crud.get_item_by_id(db=db_session, item_id=item_id)
+        return {}
+
+    app.add_middleware(QueryContextMiddleware)
+    caplog.clear()
+
+    assert TestClient(app).get(f"/items/{item_id}").status_code == 200
+
+    record, = logged(caplog)
+    assert record["route"] == "GET /items/{item_id}"
+    assert record["function"] == "inventory.crud.get_item_by_id"
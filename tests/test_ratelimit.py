@@ -0,0 +1,132 @@
+from typing import Callable, Optional, Tuple
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from ratelimit import (
+    Decision, InMemoryStore, RateLimitMiddleware, RateLimitStore,
+    SlidingWindow, TokenBucket
+)
+from users.tokens import encode_token
+
+
+class FakeStore(RateLimitStore):
+    """Shared-store stand-in that records every key it is asked about."""
+
+    def __init__(self) -> None:
+        self.states = {}
+
+    def update(
+            self,
+            key: str,
+            updater: Callable[[Optional[tuple]], Tuple[tuple, Decision]],
+            ttl: float
+    ) -> Decision:
+        self.states[key], decision = updater(self.states.get(key))
+        return decision
+
+
+class FakeClock:
+    """Clock that only moves when told to."""
+
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_client(limiter: object, store: RateLimitStore, clock: FakeClock):
+    """Build a tiny app behind the rate limiter."""
+    app = FastAPI()
+
+    @app.get("/cheap")
+    def cheap() -> dict:
+        return {"ok": True}
+
+    @app.post("/expensive")
+    def expensive() -> dict:
+        return {"ok": True}
+
+    app.add_middleware(
+        RateLimitMiddleware,
+        limiter=limiter,
+        store=store,
+        route_costs=[("POST", r"^/expensive$", 5)],
+        clock=clock
+    )
+    return TestClient(app)
+
+
+def test_token_bucket_rejects_with_retry_after():
+    """Test that an empty bucket answers 429 until it refills."""
+    clock, store = FakeClock(), FakeStore()
+    client = make_client(TokenBucket(capacity=10, rate=1), store, clock)
+
+    assert client.post("/expensive").status_code == 200
+    assert client.post("/expensive").status_code == 200
+
+    response = client.post("/expensive")
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "5"
+    assert response.json() == {"detail": "Too many requests."}
+
+    assert client.get("/cheap").status_code == 429
+    clock.now += 1
+    assert client.get("/cheap").status_code == 200
+    assert list(store.states) == ["ip:testclient"]
+
+
+def test_token_bucket_keys_by_user():
+    """Test that authenticated users get their own bucket."""
+    clock, store = FakeClock(), FakeStore()
+    client = make_client(TokenBucket(capacity=1, rate=1), store, clock)
+    headers = {"Authorization": "Bearer " + encode_token({"sub": "7"})}
+
+    assert client.get("/cheap", headers=headers).status_code == 200
+    assert client.get("/cheap").status_code == 200
+    assert client.get("/cheap", headers=headers).status_code == 429
+    assert sorted(store.states) == ["ip:testclient", "user:7"]
+
+
+def test_sliding_window_counts_previous_window():
+    """Test that the previous window still weighs on the limit."""
+    clock, store = FakeClock(), FakeStore()
+    limiter = SlidingWindow(limit=10, window=60)
+    clock.now = 600.0
+
+    for _ in range(10):
+        assert limiter.consume(store, "k", 1, clock())[0]
+    assert limiter.consume(store, "k", 1, clock()) == (False, 60.0)
+
+    clock.now += 90
+    allowed, _ = limiter.consume(store, "k", 5, clock())
+    assert allowed
+    allowed, retry_after = limiter.consume(store, "k", 1, clock())
+    assert not allowed
+    assert 0 < retry_after <= 30
+
+
+def test_cost_is_capped_at_the_limit():
+    """Test that a request costlier than the limit passes when it is full."""
+    clock, store = FakeClock(), FakeStore()
+    client = make_client(TokenBucket(capacity=3, rate=1), store, clock)
+
+    assert client.post("/expensive").status_code == 200
+    assert client.post("/expensive").status_code == 429
+    clock.now += 3
+    assert client.post("/expensive").status_code == 200
+
+    limiter = SlidingWindow(limit=3, window=60)
+    assert limiter.consume(store, "window", 5, clock())[0]
+
+
+def test_in_memory_store_is_bounded():
+    """Test that the in-memory store evicts the oldest keys."""
+    store = InMemoryStore(max_keys=2)
+    limiter = TokenBucket(capacity=1, rate=1)
+    for key in ("a", "b", "c"):
+        limiter.consume(store, key, 1, 0.0)
+
+    assert list(store._states) == ["b", "c"]
+    assert limiter.consume(store, "a", 1, 0.0) == (True, 0.0)
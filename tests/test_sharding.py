@@ -0,0 +1,145 @@
+import pytest
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+from starlette.testclient import TestClient
+
+import database
+import inventory.router
+import users.auth
+from config import DEFAULT_WORLD
+from database import Base, ShardSet
+from inventory import crud, models
+from main import app
+from rebalance import copy_world
+from users.models import User
+
+
+@pytest.fixture
+def worlds(tmp_path, monkeypatch) -> ShardSet:
+    """Route requests to two SQLite databases: the default world and moon."""
+    default_engine = create_engine(f"sqlite:///{tmp_path}/default.db")
+    shards = ShardSet(
+        default_world=DEFAULT_WORLD,
+        default_session_factory=sessionmaker(
+            bind=default_engine,
+            expire_on_commit=False,
+            info={"world": DEFAULT_WORLD}
+        ),
+        urls={"moon": f"sqlite:///{tmp_path}/moon.db"}
+    )
+    for engine in shards.engines().values():
+        Base.metadata.create_all(bind=engine)
+
+    for module in (database, inventory.router, users.auth):
+        monkeypatch.setattr(module, "shards", shards)
+    monkeypatch.setattr(app, "dependency_overrides", {})
+    return shards
+
+
+def add_items(shards: ShardSet, world: str, names: list) -> None:
+    """Create a user, a category and items in a world."""
+    with shards.session_factory(world)() as db:
+        user = User(username="maker", email="maker@example.com",
+                    hashed_password="x")
+        db.add_all([user, models.Category(name="Gear")])
+        db.flush()
+        db.add_all([
+            models.Item(name=name, category="Gear", quantity=1, price=1.0,
+                        creator_id=user.id)
+            for name in names
+        ])
+        db.commit()
+
+
+def test_requests_are_routed_by_world(worlds: ShardSet):
+    """Test that users and tokens belong to one world."""
+    client = TestClient(app)
+    moon = {"X-World": "moon"}
+    credentials = {"username": "neo", "password": "secret"}
+
+    response = client.post(
+        "/register",
+        json={**credentials, "email": "neo@example.com"},
+        headers=moon
+    )
+    assert response.status_code == 200
+
+    assert client.post("/token", data=credentials).status_code == 400
+    token = client.post("/token", data=credentials, headers=moon).json()[
+        "access_token"
+    ]
+
+    authorization = {"Authorization": f"Bearer {token}"}
+    response = client.get("/users/me", headers={**authorization, **moon})
+    assert response.status_code == 200
+    assert client.get("/users/me", headers=authorization).status_code == 401
+
+    response = client.get(
+        "/users/me", headers={**authorization, "X-World": "mars"}
+    )
+    assert response.status_code == 404
+    assert response.json() == {"detail": "Unknown world."}
+
+
+def test_items_across_worlds(worlds: ShardSet):
+    """Test scatter-gather listing with a cursor over both worlds."""
+    add_items(worlds, DEFAULT_WORLD, ["Katana", "Pistol", "Shotgun"])
+    add_items(worlds, "moon", ["Rover", "Helmet"])
+    client = TestClient(app)
+
+    seen = []
+    after = None
+    while True:
+        params = {"limit": 2}
+        if after is not None:
+            params["after"] = after
+        page = client.get("/worlds/items/", params=params).json()
+        seen += [(item["id"], item["world"]) for item in page["items"]]
+        after = page["next_after"]
+        if not page["has_more"]:
+            break
+
+    assert seen == sorted(seen)
+    assert len(seen) == 5
+    assert {world for _, world in seen} == {DEFAULT_WORLD, "moon"}
+
+    response = client.get("/worlds/items/", params={"after": "x"})
+    assert response.status_code == 400
+
+
+def test_get_items_across_worlds_repeated_ids(worlds: ShardSet):
+    """Test that equal IDs in several worlds are neither lost nor repeated."""
+    add_items(worlds, DEFAULT_WORLD, ["Katana"])
+    add_items(worlds, "moon", ["Rover"])
+    factories = {
+        world: worlds.session_factory(world) for world in worlds.worlds
+    }
+
+    first, has_more = crud.get_items_across_worlds(factories, None, 1)
+    assert has_more
+    second, has_more = crud.get_items_across_worlds(
+        factories, (first[0][1].id, first[0][0]), 1
+    )
+
+    assert not has_more
+    assert [world for world, _ in first + second] == sorted(worlds.worlds)
+    assert first[0][1].id == second[0][1].id
+
+
+def test_copy_world(worlds: ShardSet, tmp_path):
+    """Test moving a world's data to another database."""
+    add_items(worlds, "moon", ["Rover", "Helmet"])
+    target = create_engine(f"sqlite:///{tmp_path}/target.db")
+
+    counts = copy_world(
+        source=worlds.engines()["moon"], target=target, batch_size=1
+    )
+
+    assert counts["items"] == 2 and counts["users"] == 1
+    with target.connect() as connection:
+        assert connection.execute(
+            select(func.count()).select_from(models.Item)
+        ).scalar() == 2
+
+    with pytest.raises(ValueError):
+        copy_world(source=worlds.engines()["moon"], target=target)
@@ -0,0 +1,128 @@
+import threading
+import time
+
+import pytest
+
+from singleflight import SingleFlight
+
+
+def start_call(flight: SingleFlight, function, results: list) -> tuple:
+    """Start ``flight.do`` in a thread, collecting results and errors."""
+    def call():
+        try:
+            results.append(flight.do("key", function))
+        except Exception as exc:
+            results.append(exc)
+
+    thread = threading.Thread(target=call)
+    thread.start()
+    return thread
+
+
+def wait_for_waiters(flight: SingleFlight, count: int) -> None:
+    """Wait until ``count`` callers are waiting for the call in flight."""
+    deadline = time.monotonic() + 5
+    while flight._calls["key"].waiters < count:
+        assert time.monotonic() < deadline
+        time.sleep(0.001)
+
+
+def blocking(release: threading.Event, calls: list, outcome):
+    """Build a function that blocks until released."""
+    def function():
+        calls.append(1)
+        release.wait(5)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    return function
+
+
+def test_concurrent_calls_share_one_execution():
+    """Test that callers arriving during a call wait for its result."""
+    flight = SingleFlight(max_wait=5)
+    release = threading.Event()
+    calls, results = [], []
+    function = blocking(release, calls, "page")
+
+    threads = [start_call(flight, function, results)]
+    while "key" not in flight._calls:
+        time.sleep(0.001)
+    threads += [start_call(flight, function, results) for _ in range(3)]
+    wait_for_waiters(flight, 3)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert results == ["page"] * 4
+    stats = flight.stats()["key"]
+    assert (stats.executions, stats.shared) == (1, 3)
+
+
+def test_calls_are_not_cached():
+    """Test that a finished call is not reused by later callers."""
+    flight = SingleFlight()
+    calls = []
+
+    flight.do("key", lambda: calls.append(1))
+    flight.do("key", lambda: calls.append(1))
+
+    assert len(calls) == 2
+    assert "key" not in flight._calls
+
+
+def test_waiter_gives_up_after_max_wait():
+    """Test that a waiter runs the function itself after ``max_wait``."""
+    flight = SingleFlight(max_wait=0.01)
+    release = threading.Event()
+    leader = start_call(flight, blocking(release, [], "slow"), [])
+    while "key" not in flight._calls:
+        time.sleep(0.001)
+
+    assert flight.do("key", lambda: "own") == "own"
+
+    release.set()
+    leader.join()
+    assert flight.stats()["key"].timeouts == 1
+
+
+def test_errors_are_shared_with_waiters():
+    """Test that waiters get the exception raised by the call."""
+    flight = SingleFlight(max_wait=5)
+    release = threading.Event()
+    calls, results = [], []
+    function = blocking(release, calls, ValueError("boom"))
+
+    threads = [start_call(flight, function, results)]
+    while "key" not in flight._calls:
+        time.sleep(0.001)
+    threads.append(start_call(flight, function, results))
+    wait_for_waiters(flight, 1)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert [str(result) for result in results] == ["boom", "boom"]
+    assert flight.stats()["key"].errors == 1
+
+
+def test_stats_are_bounded():
+    """Test that counters are only kept for the most recent keys."""
+    flight = SingleFlight(max_keys=2)
+    for key in ("a", "b", "c"):
+        flight.do(key, lambda: None)
+
+    assert list(flight.stats()) == ["b", "c"]
+
+
+@pytest.mark.parametrize("url", ["/items/", "/categories/"])
+def test_list_reads_go_through_single_flight(test_client, url):
+    """Test that list pages are still served as JSON."""
+    response = test_client.get(url)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/json"
+    assert response.json()["items"] == []
@@ -0,0 +1,187 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from inventory import crud, models, schemas
+from users.models import User
+
+
+def make_item(
+        db: Session,
+        user: User,
+        category: models.Category,
+        name: str
+) -> models.Item:
+    """Create an item through the CRUD layer."""
+    return crud.create_item(
+        db=db,
+        item=schemas.ItemCreate(
+            name=name, category=category.name, quantity=1, price=10.0
+        ),
+        creator_id=user.id
+    )
+
+
+def test_deleted_item_is_hidden_from_reads(
+        db_session: Session,
+        create_test_user: User,
+        create_test_item: models.Item
+):
+    """Test that a deleted item keeps its row but is no longer read."""
+    item_id = create_test_item.id
+    crud.add_item_to_inventory(
+        db=db_session, user_id=create_test_user.id, item_id=item_id
+    )
+    crud.delete_item(db=db_session, item_id=item_id)
+
+    deleted_at = db_session.execute(
+        select(models.Item.deleted_at).where(models.Item.id == item_id)
+    ).scalar_one()
+    assert deleted_at is not None
+
+    with pytest.raises(HTTPException) as exc_info:
+        crud.get_item_by_id(db=db_session, item_id=item_id)
+    assert exc_info.value.status_code == 404
+
+    assert crud.get_all_items_query(db=db_session).all() == []
+    assert crud.get_items_by_ids(db=db_session, item_ids=[item_id]) == (
+        [], [item_id]
+    )
+    db_session.expire(create_test_user)
+    assert create_test_user.inventory == []
+
+    with pytest.raises(HTTPException) as exc_info:
+        crud.delete_item(db=db_session, item_id=item_id)
+    assert exc_info.value.status_code == 404
+
+
+def test_deleted_item_stacks_and_recipes_are_hidden(
+        db_session: Session,
+        create_test_user: User,
+        create_test_category: models.Category,
+        create_test_item: models.Item
+):
+    """Test that stacks and recipes of a deleted item are no longer read."""
+    scrap = make_item(
+        db_session, create_test_user, create_test_category, "Scrap"
+    )
+    crud.acquire_item_stack(
+        db=db_session,
+        user_id=create_test_user.id,
+        item_id=create_test_item.id,
+        quantity=1
+    )
+    crud.create_recipe(db=db_session, recipe=schemas.RecipeCreate(
+        item_id=create_test_item.id,
+        ingredients=[schemas.HoldingChange(item_id=scrap.id, quantity=2)]
+    ))
+    assert crud.get_recipes_query(db=db_session).count() == 1
+
+    crud.delete_item(db=db_session, item_id=create_test_item.id)
+
+    assert crud.get_user_holdings_query(
+        db=db_session, user_id=create_test_user.id
+    ).all() == []
+    assert crud.get_recipes_query(db=db_session).all() == []
+
+
+def test_deleted_item_name_can_be_reused(
+        db_session: Session,
+        create_test_user: User,
+        create_test_category: models.Category,
+        create_test_item: models.Item
+):
+    """Test that names only need to be unique among live items."""
+    crud.delete_item(db=db_session, item_id=create_test_item.id)
+
+    item = make_item(
+        db_session, create_test_user, create_test_category, "Test Item"
+    )
+
+    assert item.id != create_test_item.id
+
+
+def test_deleted_item_cannot_be_claimed(
+        db_session: Session,
+        create_test_user: User,
+        create_test_item: models.Item
+):
+    """Test that a deleted item cannot be added to an inventory."""
+    crud.delete_item(db=db_session, item_id=create_test_item.id)
+
+    with pytest.raises(HTTPException) as exc_info:
+        crud.add_item_to_inventory(
+            db=db_session,
+            user_id=create_test_user.id,
+            item_id=create_test_item.id
+        )
+
+    assert exc_info.value.status_code == 404
+
+
+def test_delete_category_with_live_items(
+        db_session: Session,
+        create_test_category: models.Category,
+        create_test_item: models.Item
+):
+    """Test that a category cannot be deleted while items use it."""
+    with pytest.raises(HTTPException) as exc_info:
+        crud.delete_category(
+            db=db_session, category_id=create_test_category.id
+        )
+    assert exc_info.value.status_code == 400
+
+    crud.delete_item(db=db_session, item_id=create_test_item.id)
+    deleted_category = crud.delete_category(
+        db=db_session, category_id=create_test_category.id
+    )
+
+    assert deleted_category.name == "Weapon"
+
+
+def test_archive_deleted_items(
+        db_session: Session,
+        create_test_user: User,
+        create_test_category: models.Category
+):
+    """Test that only items deleted long enough ago are archived."""
+    now = datetime.now(tz=timezone.utc)
+    old_ids = []
+    for name in ("Old Item 1", "Old Item 2"):
+        item = make_item(
+            db_session, create_test_user, create_test_category, name
+        )
+        old_ids.append(item.id)
+    recent = make_item(
+        db_session, create_test_user, create_test_category, "Recent Item"
+    )
+    live = make_item(
+        db_session, create_test_user, create_test_category, "Live Item"
+    )
+    recent_id, live_id = recent.id, live.id
+    db_session.execute(
+        update(models.Item)
+        .where(models.Item.id.in_(old_ids))
+        .values(deleted_at=now - timedelta(days=60))
+    )
+    db_session.execute(
+        update(models.Item)
+        .where(models.Item.id == recent_id)
+        .values(deleted_at=now - timedelta(days=1))
+    )
+    db_session.commit()
+
+    archived = crud.archive_deleted_items(
+        db=db_session, deleted_before=now - timedelta(days=30), batch_size=1
+    )
+
+    assert archived == 2
+    assert db_session.execute(
+        select(models.ItemArchive.id).order_by(models.ItemArchive.id)
+    ).scalars().all() == sorted(old_ids)
+    assert db_session.execute(
+        select(models.Item.id).order_by(models.Item.id)
+    ).scalars().all() == sorted([recent_id, live_id])
@@ -0,0 +1,228 @@
+import json
+
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from jose import JWTError, jwk, jwt
+from sqlalchemy.orm import Session
+
+from config import DEFAULT_WORLD
+from users import crud, models, tokens
+from users.auth import create_access_token, create_user_access_token
+
+
+def make_es256_jwk(kid: str) -> dict:
+    """Generate a private ES256 key in JWK form."""
+    private_key = ec.generate_private_key(ec.SECP256R1())
+    pem = private_key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption()
+    )
+    return {**jwk.construct(pem, "ES256").to_dict(), "kid": kid}
+
+
+@pytest.fixture(autouse=True)
+def clean_revocation_lists(monkeypatch) -> None:
+    """Keep revocations made by a test from leaking into other tests."""
+    monkeypatch.setattr(tokens, "_revoked_tokens", {})
+    monkeypatch.setattr(tokens, "_min_token_versions", {})
+
+
+@pytest.fixture(scope="function")
+def jwks_key_store(tmp_path, monkeypatch) -> tokens.TokenKeyStore:
+    """Fixture switching token signing to an ES256 JWKS file."""
+    jwks_file = tmp_path / "jwks.json"
+    jwks_file.write_text(json.dumps({"keys": [make_es256_jwk("old")]}))
+    key_store = tokens.TokenKeyStore(jwks_file=str(jwks_file))
+    monkeypatch.setattr(tokens, "key_store", key_store)
+    yield key_store
+
+
+def test_es256_token_round_trip(jwks_key_store: tokens.TokenKeyStore):
+    """Test signing and verifying tokens with a JWKS key."""
+    token = tokens.encode_token({"sub": "1"})
+
+    assert jwt.get_unverified_header(token)["kid"] == "old"
+    assert jwt.get_unverified_header(token)["alg"] == "ES256"
+    assert tokens.decode_token(token)["sub"] == "1"
+
+
+def test_key_rotation_keeps_old_tokens_valid(
+        jwks_key_store: tokens.TokenKeyStore,
+        monkeypatch
+):
+    """Test that tokens signed before a rotation still verify."""
+    old_token = tokens.encode_token({"sub": "1"})
+
+    with open(jwks_key_store.jwks_file) as jwks:
+        keys = json.load(jwks)["keys"]
+    rotated = tokens.TokenKeyStore(
+        jwks_file=jwks_key_store.jwks_file, signing_kid="new"
+    )
+    with open(rotated.jwks_file, "w") as jwks:
+        json.dump({"keys": keys + [make_es256_jwk("new")]}, jwks)
+    monkeypatch.setattr(tokens, "key_store", rotated)
+
+    new_token = tokens.encode_token({"sub": "2"})
+    assert jwt.get_unverified_header(new_token)["kid"] == "new"
+    assert tokens.decode_token(old_token)["sub"] == "1"
+    assert tokens.decode_token(new_token)["sub"] == "2"
+
+
+def test_revoked_tokens_are_rejected():
+    """Test the in-memory revocation of single tokens and whole users."""
+    token = tokens.encode_token({"sub": "41", "ver": 0})
+    payload = tokens.decode_token(token)
+
+    tokens.revoke_token(payload=payload)
+    with pytest.raises(JWTError):
+        tokens.decode_token(token)
+
+    other_token = tokens.encode_token({"sub": "42", "ver": 0})
+    tokens.revoke_user_tokens(user_id=42, token_version=1)
+    with pytest.raises(JWTError):
+        tokens.decode_token(other_token)
+    assert tokens.decode_token(
+        tokens.encode_token({"sub": "42", "ver": 1})
+    )["sub"] == "42"
+
+    moon_token = tokens.encode_token({"sub": "42", "ver": 0, "world": "moon"})
+    assert tokens.decode_token(moon_token)["sub"] == "42"
+    tokens.revoke_user_tokens(user_id=42, token_version=1, world="moon")
+    with pytest.raises(JWTError):
+        tokens.decode_token(moon_token)
+
+
+def test_claims_token_skips_user_lookup(
+        test_client: TestClient,
+        create_test_user: models.User,
+        db_session: Session
+):
+    """Test that read-only routes trust the token claims."""
+    token = create_user_access_token(user=create_test_user)
+    db_session.delete(create_test_user)
+    db_session.commit()
+
+    response = test_client.get(
+        "/inventory/holdings/", headers={"Authorization": f"Bearer {token}"}
+    )
+    assert response.status_code == 200
+
+    response = test_client.get(
+        "/users/me", headers={"Authorization": f"Bearer {token}"}
+    )
+    assert response.status_code == 401
+
+
+def test_logout_everywhere(
+        test_client: TestClient,
+        create_test_user: models.User
+):
+    """Test that logging out everywhere revokes existing tokens."""
+    response = test_client.post("/token", data={
+        "username": "testuser",
+        "password": "password123"
+    })
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    response = test_client.post("/logout/all", headers=headers)
+    assert response.status_code == 200
+
+    response = test_client.get("/inventory/holdings/", headers=headers)
+    assert response.status_code == 401
+
+
+def test_logout_everywhere_revokes_tokens_without_version(
+        test_client: TestClient,
+        create_test_user: models.User
+):
+    """Test that tokens issued without a version claim are revoked too."""
+    token = create_access_token(data={"sub": str(create_test_user.id)})
+    headers = {"Authorization": f"Bearer {token}"}
+    assert test_client.get("/users/me", headers=headers).status_code == 200
+
+    response = test_client.post("/logout/all", headers=headers)
+    assert response.status_code == 200
+
+    assert test_client.get("/users/me", headers=headers).status_code == 401
+    assert test_client.get(
+        "/inventory/holdings/", headers=headers
+    ).status_code == 401
+
+
+def test_refresh_token_rotation_and_reuse(
+        test_client: TestClient,
+        create_test_user: models.User,
+        monkeypatch
+):
+    """Test refreshing without a password and revoking on reuse."""
+    response = test_client.post("/token", data={
+        "username": "testuser",
+        "password": "password123"
+    })
+    first_refresh = response.json()["refresh_token"]
+
+    def fail_verify_password(**kwargs) -> bool:
+        raise AssertionError("Refresh must not check the password.")
+
+    monkeypatch.setattr(crud, "verify_password", fail_verify_password)
+
+    response = test_client.post(
+        "/token/refresh", json={"refresh_token": first_refresh}
+    )
+    assert response.status_code == 200
+    second_refresh = response.json()["refresh_token"]
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    assert test_client.get("/users/me", headers=headers).status_code == 200
+
+    response = test_client.post(
+        "/token/refresh", json={"refresh_token": first_refresh}
+    )
+    assert response.status_code == 401
+
+    response = test_client.post(
+        "/token/refresh", json={"refresh_token": second_refresh}
+    )
+    assert response.status_code == 401
+
+
+def test_refresh_tokens_belong_to_their_world(
+        db_session: Session,
+        create_test_user: models.User
+):
+    """
+    Test that a refresh token is refused by another world and survives
+    a revocation there.
+    """
+    refresh_token = crud.issue_refresh_token(
+        db=db_session, user=create_test_user
+    )
+    db_session.commit()
+    tokens.revoke_user_tokens(
+        user_id=create_test_user.id, token_version=1, world="moon"
+    )
+    assert tokens.decode_token(refresh_token)["world"] == DEFAULT_WORLD
+
+    db_session.info["world"] = "moon"
+    with pytest.raises(HTTPException) as exc_info:
+        crud.refresh_access_token(db=db_session, refresh_token=refresh_token)
+    assert exc_info.value.status_code == 401
+
+
+def test_refresh_token_is_not_an_access_token(
+        test_client: TestClient,
+        create_test_user: models.User
+):
+    """Test that a refresh token cannot authorize API calls."""
+    response = test_client.post("/token", data={
+        "username": "testuser",
+        "password": "password123"
+    })
+    headers = {
+        "Authorization": f"Bearer {response.json()['refresh_token']}"
+    }
+
+    assert test_client.get("/users/me", headers=headers).status_code == 401
@@ -0,0 +1,185 @@
+import pytest
+from fastapi import HTTPException
+from sqlalchemy.orm import Session
+from starlette.testclient import TestClient
+
+from inventory import schemas, crud, models
+from users.auth import create_access_token
+from users.models import User
+
+
+@pytest.fixture(scope="function")
+def trade_setup(
+        db_session: Session,
+        create_test_user: User,
+        create_test_category: models.Category
+) -> tuple:
+    """Fixture with a trade partner and one owned item on each side."""
+    partner = User(
+        username="partner",
+        email="partner@example.com",
+        hashed_password="hashed",
+        is_active=True
+    )
+    db_session.add(partner)
+    db_session.commit()
+
+    items = []
+    for name, owner in (("Katana", create_test_user), ("Deck", partner)):
+        item = models.Item(
+            name=name,
+            category=create_test_category.name,
+            quantity=1,
+            price=100.0,
+            creator_id=create_test_user.id,
+            owner_id=owner.id
+        )
+        db_session.add(item)
+        items.append(item)
+    db_session.commit()
+
+    yield create_test_user, partner, items[0], items[1]
+
+
+def test_accept_trade_swaps_items(db_session: Session, trade_setup: tuple):
+    """Test that accepting a trade swaps both sides at once."""
+    proposer, partner, offered, requested = trade_setup
+    trade = crud.create_trade(
+        db=db_session,
+        proposer_id=proposer.id,
+        trade=schemas.TradeCreate(
+            partner_id=partner.id,
+            offered_item_ids=[offered.id],
+            requested_item_ids=[requested.id]
+        )
+    )
+    assert trade.status == "pending"
+
+    accepted = crud.accept_trade(
+        db=db_session, trade_id=trade.id, user_id=partner.id
+    )
+    assert accepted.status == "accepted"
+
+    db_session.refresh(offered)
+    db_session.refresh(requested)
+    assert offered.owner_id == partner.id
+    assert requested.owner_id == proposer.id
+
+    with pytest.raises(HTTPException) as exc_info:
+        crud.accept_trade(db=db_session, trade_id=trade.id, user_id=partner.id)
+    assert exc_info.value.status_code == 400
+
+
+def test_accept_trade_permissions(db_session: Session, trade_setup: tuple):
+    """Test that only the partner can accept a trade."""
+    proposer, partner, offered, requested = trade_setup
+    trade = crud.create_trade(
+        db=db_session,
+        proposer_id=proposer.id,
+        trade=schemas.TradeCreate(
+            partner_id=partner.id, offered_item_ids=[offered.id]
+        )
+    )
+
+    with pytest.raises(HTTPException) as exc_info:
+        crud.accept_trade(
+            db=db_session, trade_id=trade.id, user_id=proposer.id
+        )
+    assert exc_info.value.status_code == 403
+
+    with pytest.raises(HTTPException) as exc_info:
+        crud.accept_trade(db=db_session, trade_id=trade.id, user_id=999)
+    assert exc_info.value.status_code == 404
+
+
+def test_create_trade_validation(db_session: Session, trade_setup: tuple):
+    """Test that trades may only contain items the traders own."""
+    proposer, partner, offered, requested = trade_setup
+
+    with pytest.raises(HTTPException) as exc_info:
+        crud.create_trade(
+            db=db_session,
+            proposer_id=proposer.id,
+            trade=schemas.TradeCreate(
+                partner_id=partner.id, offered_item_ids=[requested.id]
+            )
+        )
+    assert exc_info.value.status_code == 400
+    assert exc_info.value.detail == "Offered items must be in your inventory."
+
+    with pytest.raises(HTTPException) as exc_info:
+        crud.create_trade(
+            db=db_session,
+            proposer_id=proposer.id,
+            trade=schemas.TradeCreate(partner_id=proposer.id)
+        )
+    assert exc_info.value.status_code == 400
+
+
+def test_accept_trade_after_item_changed_hands(
+        db_session: Session,
+        trade_setup: tuple
+):
+    """Test that a stale trade moves nothing."""
+    proposer, partner, offered, requested = trade_setup
+    trade = crud.create_trade(
+        db=db_session,
+        proposer_id=proposer.id,
+        trade=schemas.TradeCreate(
+            partner_id=partner.id,
+            offered_item_ids=[offered.id],
+            requested_item_ids=[requested.id]
+        )
+    )
+    crud.remove_item_from_inventory(
+        db=db_session, user_id=partner.id, item_id=requested.id
+    )
+
+    with pytest.raises(HTTPException) as exc_info:
+        crud.accept_trade(db=db_session, trade_id=trade.id, user_id=partner.id)
+    assert exc_info.value.status_code == 409
+
+    db_session.refresh(offered)
+    assert offered.owner_id == proposer.id
+
+
+def test_trade_endpoints(test_client: TestClient, trade_setup: tuple):
+    """Test offering, listing and accepting a trade through the API."""
+    proposer, partner, offered, requested = trade_setup
+    partner_id, offered_id, requested_id = partner.id, offered.id, requested.id
+    proposer_headers = {
+        "Authorization": "Bearer " + create_access_token(
+            data={"sub": str(proposer.id)}
+        )
+    }
+    partner_headers = {
+        "Authorization": "Bearer " + create_access_token(
+            data={"sub": str(partner_id)}
+        )
+    }
+
+    response = test_client.post(
+        "/inventory/trades/",
+        json={
+            "partner_id": partner_id,
+            "offered_item_ids": [offered_id],
+            "requested_item_ids": [requested_id]
+        },
+        headers=proposer_headers
+    )
+    assert response.status_code == 200
+    trade_id = response.json()["id"]
+
+    response = test_client.get("/inventory/trades/", headers=partner_headers)
+    assert response.status_code == 200
+    assert response.json()["total_items"] == 1
+
+    response = test_client.post(
+        f"/inventory/trades/{trade_id}/accept", headers=partner_headers
+    )
+    assert response.status_code == 200
+    assert response.json()["status"] == "accepted"
+
+    response = test_client.get("/users/me", headers=partner_headers)
+    inventory_ids = [item["id"] for item in response.json()["inventory"]]
+    assert inventory_ids == [offered_id]
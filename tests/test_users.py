@@ -171,3 +171,39 @@ def test_invalid_token(test_client: TestClient):
     response = test_client.get("/users/me", headers=headers)
     assert response.status_code == 401
     assert response.json()["detail"] == "Could not validate credentials"
+
+
+def test_register_existing_username_and_email(
+        test_client: TestClient,
+        create_test_user: models.User
+):
+    """Test that a username clash is reported before an email clash."""
+    response = test_client.post("/register", json={
+        "username": "testuser",
+        "email": "testuser@example.com",
+        "password": "password123"
+    })
+    assert response.status_code == 400
+    assert response.json()["detail"] == "This username already registered."
+
+
+def test_register_username_matching_other_users_email(
+        test_client: TestClient,
+        create_test_user: models.User,
+        db_session: Session
+):
+    """Test the combined lookup when two users match different fields."""
+    db_session.add(models.User(
+        username="seconduser",
+        email="second@example.com",
+        hashed_password=get_password_hash(password="password123")
+    ))
+    db_session.commit()
+
+    response = test_client.post("/register", json={
+        "username": "seconduser",
+        "email": "testuser@example.com",
+        "password": "password123"
+    })
+    assert response.status_code == 400
+    assert response.json()["detail"] == "This username already registered."
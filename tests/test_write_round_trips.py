@@ -0,0 +1,132 @@
+from contextlib import contextmanager
+from typing import Iterator, List
+
+import pytest
+from sqlalchemy import event
+from starlette.testclient import TestClient
+
+from inventory import crud, models
+from tests.conftest import engine
+from users.auth import create_access_token
+from users.models import User
+
+
+CHANGE_LOG = ["INSERT item_change_counter", "INSERT item_changes"]
+PRICE_HISTORY = ["INSERT item_prices"] + [
+    f"INSERT {table}"
+    for table in ("item_price_candles", "category_price_candles")
+    for _ in crud.PRICE_RESOLUTIONS
+]
+
+
+@contextmanager
+def capture_statements() -> Iterator[List[str]]:
+    """
+    Collect the SQL statements sent to the test database, as their verb
+    followed by the written table, if any.
+    """
+    statements = []
+
+    def before_cursor_execute(
+            conn, cursor, statement, parameters, context, executemany
+    ) -> None:
+        words = statement.split()
+        verb = words[0].upper()
+        if verb in ("INSERT", "DELETE"):
+            statements.append(f"{verb} {words[2]}")
+        elif verb == "UPDATE":
+            statements.append(f"{verb} {words[1]}")
+        else:
+            statements.append(verb)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def assert_single_write_last(
+        statements: List[str],
+        appends: List[str]
+) -> None:
+    """
+    Assert one write was issued, followed only by the expected appends
+    to the item change log and the price history, and nothing was
+    re-read after it.
+    """
+    writes = [s for s in statements if s != "SELECT"]
+    assert writes[1:] == appends
+    assert statements[-len(writes):] == writes
+
+
+@pytest.fixture(scope="function")
+def auth_headers(create_test_user: User) -> dict:
+    """Fixture with authorization headers for the test user."""
+    token = create_access_token(data={"sub": str(create_test_user.id)})
+    yield {"Authorization": f"Bearer {token}"}
+
+
+@pytest.mark.parametrize("method, url, body, appends", [
+    ("post", "/categories/", {"name": "Implant"}, []),
+    ("post", "/items/", {
+        "name": "Mantis Blades",
+        "category": "Weapon",
+        "quantity": 1,
+        "price": 5000.0
+    }, PRICE_HISTORY + CHANGE_LOG),
+    ("put", "/items/{item_id}", {"description": "Sharper."}, CHANGE_LOG),
+    ("post", "/inventory/add/{item_id}", None, CHANGE_LOG),
+])
+def test_write_endpoints_skip_refresh(
+        test_client: TestClient,
+        auth_headers: dict,
+        create_test_item: models.Item,
+        method: str,
+        url: str,
+        body: dict,
+        appends: List[str]
+):
+    """Test that write endpoints answer from RETURNING, not a re-read."""
+    url = url.format(item_id=create_test_item.id)
+
+    with capture_statements() as statements:
+        response = getattr(test_client, method)(
+            url, json=body, headers=auth_headers
+        )
+
+    assert response.status_code == 200
+    assert_single_write_last(statements, appends)
+
+
+def test_remove_from_inventory_skips_refresh(
+        test_client: TestClient,
+        auth_headers: dict,
+        create_test_item: models.Item
+):
+    """Test that removing an item answers from RETURNING."""
+    url = f"/inventory/{{}}/{create_test_item.id}"
+    test_client.post(url.format("add"), headers=auth_headers)
+
+    with capture_statements() as statements:
+        response = test_client.delete(
+            url.format("remove"), headers=auth_headers
+        )
+
+    assert response.status_code == 200
+    assert response.json()["owner_id"] is None
+    assert_single_write_last(statements, CHANGE_LOG)
+
+
+def test_register_skips_refresh(test_client: TestClient):
+    """Test that registration answers from RETURNING."""
+    with capture_statements() as statements:
+        response = test_client.post("/register", json={
+            "username": "newuser",
+            "email": "newuser@example.com",
+            "password": "password123"
+        })
+
+    assert response.status_code == 200
+    assert response.json()["inventory"] == []
+    assert_single_write_last(statements, [])
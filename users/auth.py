@@ -2,20 +2,26 @@ from typing import Optional
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from jose import JWTError, jwt
+from jose import JWTError
 from datetime import datetime, timedelta, timezone
 
 from passlib.context import CryptContext
+from sqlalchemy import bindparam, select
 from sqlalchemy.orm import Session
 
-from config import ACCESS_TOKEN_EXPIRE_MINUTES, ALGORITHM, SECRET_KEY
+from config import ACCESS_TOKEN_EXPIRE_MINUTES, DEFAULT_WORLD
 from users.models import User
-from database import get_db
+from users.schemas import TokenUser
+from users.tokens import decode_token, encode_token
+from database import get_db, get_world, shards
 
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# Built once: the user lookup runs on every authenticated request.
+USER_BY_ID = select(User).where(User.id == bindparam("user_id")).limit(1)
+
 
 def create_access_token(
         data: dict,
@@ -32,34 +38,70 @@ def create_access_token(
         )
 
     to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
-    return encoded_jwt
+    return encode_token(to_encode)
 
 
-def get_current_user(
+def create_user_access_token(
+        user: User, world: str = DEFAULT_WORLD
+) -> str:
+    """
+    Create a JWT token carrying the claims needed to authorize
+    the user without loading them from the database. The token is
+    only valid in the user's world.
+    """
+    return create_access_token(data={
+        "sub": str(user.id),
+        "active": user.is_active,
+        "su": user.is_superuser,
+        "ver": user.token_version,
+        "world": world,
+    })
+
+
+def get_token_payload(
         token: str = Depends(oauth2_scheme),
-        db: Session = Depends(get_db)
-) -> User:
-    """Retrieve the current user using the JWT token."""
+        world: str = Depends(get_world)
+) -> dict:
+    """
+    Verify the JWT token and return its claims. Tokens issued in
+    another world are rejected; tokens without a world claim belong
+    to the default world.
+    """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(
-            token=token, key=SECRET_KEY, algorithms=[ALGORITHM]
-        )
+        payload = decode_token(token)
         user_id: Optional[str] = payload.get("sub")
-        if user_id is None:
+        if user_id is None or payload.get("typ") == "refresh":
+            raise credentials_exception
+        if payload.get("world", DEFAULT_WORLD) != world:
             raise credentials_exception
 
     except JWTError:
         raise credentials_exception
 
-    user = db.query(User).filter(User.id == user_id).first()
-    if user is None:
-        raise credentials_exception
+    return payload
+
+
+def get_current_user(
+        payload: dict = Depends(get_token_payload),
+        db: Session = Depends(get_db)
+) -> User:
+    """Retrieve the current user using the JWT token."""
+    user = db.execute(
+        USER_BY_ID, {"user_id": int(payload["sub"])}
+    ).scalars().first()
+    # Tokens issued before token versions existed count as version 0,
+    # so logging out everywhere revokes them too.
+    if user is None or payload.get("ver", 0) != user.token_version:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
 
     if not user.is_active:
         raise HTTPException(
@@ -69,6 +111,61 @@ def get_current_user(
     return user
 
 
+def get_current_token_user(
+        payload: dict = Depends(get_token_payload),
+        db: Session = Depends(get_db)
+) -> TokenUser:
+    """
+    Retrieve the current user from the JWT claims alone, for routes
+    that only need the user's identity. Tokens issued without the
+    claims fall back to a database lookup.
+    """
+    if "ver" not in payload:
+        user = get_current_user(payload=payload, db=db)
+        return TokenUser.model_validate(user)
+
+    if not payload.get("active"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Inactive user."
+        )
+
+    return TokenUser(
+        id=int(payload["sub"]),
+        is_active=payload["active"],
+        is_superuser=payload.get("su", False),
+        token_version=payload["ver"],
+    )
+
+
+def get_current_superuser(
+        current_user: User = Depends(get_current_user)
+) -> User:
+    """
+    Allow only superusers through. The user is loaded from the database,
+    so a demoted, deactivated or logged out superuser is refused at once.
+    """
+    if not current_user.is_superuser:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Superuser privileges required."
+        )
+
+    return current_user
+
+
+def authenticate_token(token: str, world: str = DEFAULT_WORLD) -> TokenUser:
+    """
+    Authorize a raw token outside of the route dependencies, for
+    long-lived connections that should not hold a database session.
+    """
+    payload = get_token_payload(token=token, world=world)
+    if "ver" in payload:
+        return get_current_token_user(payload=payload, db=None)
+
+    with shards.session_factory(world)() as db:
+        return get_current_token_user(payload=payload, db=db)
+
+
 def get_password_hash(password: str) -> str:
     """Hash the given password."""
     return pwd_context.hash(secret=password)
@@ -1,51 +1,72 @@
+import uuid
+from datetime import datetime, timedelta, timezone
 from typing import Optional
 
 from fastapi import HTTPException
+from jose import JWTError
+from sqlalchemy import bindparam, or_, select, update
 from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
 from starlette import status
 
-from users.models import User
-from users.schemas import UserCreate
-from users.auth import get_password_hash, verify_password, create_access_token
+from config import DEFAULT_WORLD, REFRESH_TOKEN_EXPIRE_DAYS
+from database import get_upsert_insert, session_world
+from users.models import RefreshToken, User
+from users.schemas import Token, UserCreate
+from users.auth import (
+    USER_BY_ID, get_password_hash, verify_password, create_user_access_token
+)
+from users.tokens import encode_token, decode_token, revoke_user_tokens
+
+
+USER_BY_USERNAME = select(User).where(
+    User.username == bindparam("username")
+).limit(1)
 
 
 def create_user(db: Session, user: UserCreate) -> User:
-    """Create a new user in the database."""
-    db_user_by_username = check_user_existence_by_username_or_email(
-        db=db, field_name="username", value=user.username
-    )
+    """
+    Create a new user in the database.
 
-    if db_user_by_username:
-        raise HTTPException(
-            status_code=400, detail="This username already registered."
+    The insert skips rows that clash with an existing username or email,
+    so a successful signup is a single round trip and concurrent
+    signups cannot race past an existence check.
+    """
+    hashed_password = get_password_hash(user.password)
+    db_user = db.execute(
+        get_upsert_insert(db)(User)
+        .values(
+            username=user.username,
+            email=user.email,
+            hashed_password=hashed_password
         )
+        .on_conflict_do_nothing()
+        .returning(User)
+    ).scalar_one_or_none()
 
-    db_user_by_email = check_user_existence_by_username_or_email(
-        db=db, field_name="email", value=user.email
-    )
+    if db_user is None:
+        existing_user = get_user_by_username_or_email(
+            db=db, username=user.username, email=user.email
+        )
+        if existing_user and existing_user.username == user.username:
+            raise HTTPException(
+                status_code=400, detail="This username already registered."
+            )
 
-    if db_user_by_email:
         raise HTTPException(
             status_code=400, detail="This email already registered."
         )
 
-    hashed_password = get_password_hash(user.password)
-    db_user = User(
-        username=user.username,
-        email=user.email,
-        hashed_password=hashed_password
-    )
-
-    db.add(db_user)
     db.commit()
-    db.refresh(db_user)
 
+    # A new user owns nothing yet, so don't lazy-load the inventory.
+    set_committed_value(db_user, "inventory", [])
     return db_user
 
 
-def authenticate_user(db: Session, username: str, password: str) -> str:
-    """Authenticate a user and return an access token."""
-    user = db.query(User).filter(User.username == username).first()
+def authenticate_user(db: Session, username: str, password: str) -> Token:
+    """Authenticate a user and return an access and a refresh token."""
+    user = get_user_by_username(db=db, username=username)
 
     if not user:
         raise HTTPException(
@@ -68,27 +89,145 @@ def authenticate_user(db: Session, username: str, password: str) -> str:
             detail="Inactive user."
         )
 
-    return create_access_token(data={"sub": str(user.id)})
+    tokens = Token(
+        access_token=create_user_access_token(
+            user=user, world=session_world(db)
+        ),
+        refresh_token=issue_refresh_token(db=db, user=user)
+    )
+    db.commit()
+    return tokens
 
 
-def check_user_existence_by_username_or_email(
-        db: Session, field_name: str, value: str
-) -> Optional[User]:
-    """Check if a user exists by username or email."""
-    if field_name == "username":
-        return db.query(User).filter(User.username == value).first()
+def issue_refresh_token(
+        db: Session, user: User, family_id: Optional[str] = None
+) -> str:
+    """Record a new refresh token for the user and return it signed."""
+    jti = uuid.uuid4().hex
+    family_id = family_id or jti
+    expires_at = datetime.now(tz=timezone.utc) + timedelta(
+        days=REFRESH_TOKEN_EXPIRE_DAYS
+    )
+    db.add(RefreshToken(
+        jti=jti, user_id=user.id, family_id=family_id, expires_at=expires_at
+    ))
+    return encode_token({
+        "sub": str(user.id),
+        "typ": "refresh",
+        "jti": jti,
+        "fam": family_id,
+        "ver": user.token_version,
+        "world": session_world(db),
+        "exp": expires_at,
+    })
+
+
+def refresh_access_token(db: Session, refresh_token: str) -> Token:
+    """
+    Exchange a refresh token for a new access token and refresh token.
+
+    No password hash is checked: the token is marked used with one
+    conditional UPDATE. Presenting a token that was already used means
+    it leaked, so its whole family is revoked.
+
+    Refresh tokens are only valid in the world that issued them.
+    """
+    invalid_token_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid refresh token.",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    try:
+        payload = decode_token(refresh_token)
+    except JWTError:
+        raise invalid_token_exception
+
+    if (
+            payload.get("typ") != "refresh"
+            or payload.get("world", DEFAULT_WORLD) != session_world(db)
+    ):
+        raise invalid_token_exception
+
+    db_token = db.execute(
+        update(RefreshToken)
+        .where(
+            RefreshToken.jti == payload["jti"],
+            RefreshToken.used_at.is_(None),
+            RefreshToken.revoked.is_(False)
+        )
+        .values(used_at=datetime.now(tz=timezone.utc))
+        .returning(RefreshToken.user_id, RefreshToken.family_id)
+    ).one_or_none()
+
+    if db_token is None:
+        db.execute(
+            update(RefreshToken)
+            .where(RefreshToken.family_id == payload["fam"])
+            .values(revoked=True)
+        )
+        db.commit()
+        raise invalid_token_exception
+
+    user = get_user_by_id(db=db, user_id=db_token.user_id)
+    if (
+            not user
+            or not user.is_active
+            or user.token_version != payload.get("ver")
+    ):
+        raise invalid_token_exception
+
+    tokens = Token(
+        access_token=create_user_access_token(
+            user=user, world=session_world(db)
+        ),
+        refresh_token=issue_refresh_token(
+            db=db, user=user, family_id=db_token.family_id
+        )
+    )
+    db.commit()
+    return tokens
 
-    elif field_name == "email":
-        return db.query(User).filter(User.email == value).first()
 
-    return None
+def get_user_by_username_or_email(
+        db: Session, username: str, email: str
+) -> Optional[User]:
+    """
+    Retrieve a user matching the username or the email in one query,
+    preferring the username match.
+    """
+    return db.query(User).filter(
+        or_(User.username == username, User.email == email)
+    ).order_by((User.username == username).desc()).first()
 
 
 def get_user_by_username(db: Session, username: str) -> User:
     """Retrieve a user by username."""
-    return db.query(User).filter(User.username == username).first()
+    return db.execute(
+        USER_BY_USERNAME, {"username": username}
+    ).scalars().first()
 
 
 def get_user_by_id(db: Session, user_id: int) -> User:
     """Retrieve a user by ID."""
-    return db.query(User).filter(User.id == user_id).first()
+    return db.execute(USER_BY_ID, {"user_id": user_id}).scalars().first()
+
+
+def revoke_all_user_tokens(db: Session, user_id: int) -> None:
+    """Invalidate every token issued to the user so far."""
+    token_version = db.execute(
+        update(User)
+        .where(User.id == user_id)
+        .values(token_version=User.token_version + 1)
+        .returning(User.token_version)
+    ).scalar_one()
+    db.execute(
+        update(RefreshToken)
+        .where(RefreshToken.user_id == user_id)
+        .values(revoked=True)
+    )
+    db.commit()
+    revoke_user_tokens(
+        user_id=user_id,
+        token_version=token_version,
+        world=session_world(db)
+    )
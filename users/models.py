@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, String, Boolean
 from fastapi_users_db_sqlalchemy import SQLAlchemyBaseUserTable
 from sqlalchemy.orm import relationship
 
@@ -16,11 +16,32 @@ class User(Base, SQLAlchemyBaseUserTable):
     hashed_password = Column(String, nullable=False)
     is_active = Column(Boolean, default=True)
     is_superuser = Column(Boolean, default=False)
+    token_version = Column(Integer, nullable=False, default=0)
 
     created_items = relationship(
         "Item", back_populates="creator", foreign_keys="Item.creator_id"
     )
 
     inventory = relationship(
-        "Item", back_populates="owner", foreign_keys="Item.owner_id"
+        "Item",
+        back_populates="owner",
+        foreign_keys="Item.owner_id",
+        primaryjoin="and_(User.id == Item.owner_id, "
+                    "Item.deleted_at.is_(None))"
     )
+
+
+class RefreshToken(Base):
+    """
+    Represents an issued refresh token. Each one may be used once;
+    tokens rotated from the same login share a family.
+    """
+    __tablename__ = "refresh_tokens"
+    jti = Column(String(32), primary_key=True)
+    user_id = Column(
+        Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False
+    )
+    family_id = Column(String(32), nullable=False, index=True)
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+    used_at = Column(DateTime(timezone=True), nullable=True)
+    revoked = Column(Boolean, nullable=False, default=False)
@@ -3,7 +3,7 @@ from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 
 from database import get_db
-from users import auth, crud, models, schemas
+from users import auth, crud, models, schemas, tokens
 
 
 router = APIRouter()
@@ -19,16 +19,26 @@ def register_user(
     return schemas.UserRead.model_validate(user)
 
 
-@router.post("/token", tags=["user"])
+@router.post("/token", response_model=schemas.Token, tags=["user"])
 def login_for_access_token(
         form_data: OAuth2PasswordRequestForm = Depends(),
         db: Session = Depends(get_db)
-) -> dict:
-    """Log in and generate an access token."""
-    access_token = crud.authenticate_user(
+) -> schemas.Token:
+    """Log in and generate an access token and a refresh token."""
+    return crud.authenticate_user(
         db=db, username=form_data.username, password=form_data.password
     )
-    return {"access_token": access_token, "token_type": "bearer"}
+
+
+@router.post("/token/refresh", response_model=schemas.Token, tags=["user"])
+def refresh_access_token(
+        refresh: schemas.RefreshRequest,
+        db: Session = Depends(get_db)
+) -> schemas.Token:
+    """Exchange a refresh token for a new access token and refresh token."""
+    return crud.refresh_access_token(
+        db=db, refresh_token=refresh.refresh_token
+    )
 
 
 @router.get("/users/me", response_model=schemas.UserRead, tags=["user"])
@@ -37,3 +47,20 @@ def read_users_me(
 ) -> schemas.UserRead:
     """Get the current authenticated user's information."""
     return schemas.UserRead.model_validate(current_user)
+
+
+@router.post("/logout", tags=["user"])
+def logout(payload: dict = Depends(auth.get_token_payload)) -> dict:
+    """Revoke the access token used for this request."""
+    tokens.revoke_token(payload=payload)
+    return {"detail": "Token revoked."}
+
+
+@router.post("/logout/all", tags=["user"])
+def logout_everywhere(
+        current_user: models.User = Depends(auth.get_current_user),
+        db: Session = Depends(get_db)
+) -> dict:
+    """Revoke every access token issued to the current user."""
+    crud.revoke_all_user_tokens(db=db, user_id=current_user.id)
+    return {"detail": "All tokens revoked."}
@@ -62,3 +62,26 @@ class UserRead(UserBase):
                 ]
             }
         }
+
+
+class TokenUser(BaseModel):
+    """Model for the user identity carried in an access token."""
+    id: int
+    is_active: bool
+    is_superuser: bool
+    token_version: int
+
+    class Config:
+        from_attributes = True
+
+
+class Token(BaseModel):
+    """Model for the tokens issued on login or refresh."""
+    access_token: str
+    refresh_token: str
+    token_type: str = "bearer"
+
+
+class RefreshRequest(BaseModel):
+    """Model for exchanging a refresh token for new tokens."""
+    refresh_token: str
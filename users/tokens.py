@@ -0,0 +1,177 @@
+import json
+import os
+import threading
+import time
+import uuid
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from jose import JWTError, jwk, jwt
+from jose.backends.base import Key
+
+from config import (
+    ALGORITHM, DEFAULT_WORLD, JWKS_FILE, JWT_SIGNING_KID, SECRET_KEY
+)
+
+
+KEYS_RELOAD_SECONDS = 30
+
+
+class KeySet(NamedTuple):
+    """Prepared signing and verification keys."""
+    signing_kid: Optional[str]
+    signing_key: Key
+    signing_algorithm: str
+    verification_keys: Dict[Optional[str], Tuple[Key, List[str]]]
+
+
+def _prepare_key(key_data: object, algorithm: str) -> Tuple[Key, Key]:
+    """Construct a key once and return it with its verification half."""
+    key = jwk.construct(key_data, algorithm)
+    if algorithm.startswith("HS"):
+        return key, key
+    return key, key.public_key()
+
+
+class TokenKeyStore:
+    """
+    Cache of prepared JWT keys.
+
+    Without a JWKS file tokens are signed with ``SECRET_KEY`` and
+    ``ALGORITHM`` as before. With one, tokens are signed by the key named
+    ``signing_kid`` (or the first key in the file) and verified by any key
+    in it, so keys can be rotated by adding the new key, switching the
+    signing kid and dropping the old key once its tokens have expired.
+    The file is re-read when it changes, checked at most every
+    ``KEYS_RELOAD_SECONDS``.
+    """
+
+    def __init__(
+            self,
+            jwks_file: Optional[str] = None,
+            signing_kid: Optional[str] = None
+    ) -> None:
+        self.jwks_file = jwks_file
+        self.signing_kid = signing_kid
+        self._key_set = None
+        self._mtime = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self) -> KeySet:
+        """Return the current key set, reloading it if the file changed."""
+        now = time.monotonic()
+        if self._key_set and now - self._checked_at < KEYS_RELOAD_SECONDS:
+            return self._key_set
+
+        with self._lock:
+            mtime = None
+            if self.jwks_file:
+                mtime = os.path.getmtime(self.jwks_file)
+            if self._key_set is None or mtime != self._mtime:
+                self._key_set = self._load()
+                self._mtime = mtime
+            self._checked_at = now
+            return self._key_set
+
+    def _load(self) -> KeySet:
+        """Build the key set from the JWKS file and the shared secret."""
+        verification_keys = {}
+        signing = None
+
+        if SECRET_KEY and ALGORITHM and ALGORITHM.startswith("HS"):
+            secret_key, _ = _prepare_key(SECRET_KEY, ALGORITHM)
+            verification_keys[None] = (secret_key, [ALGORITHM])
+            signing = (None, secret_key, ALGORITHM)
+
+        if self.jwks_file:
+            with open(self.jwks_file) as jwks:
+                keys = json.load(jwks)["keys"]
+
+            signing_kid = self.signing_kid or keys[0]["kid"]
+            for key_data in keys:
+                key, public_key = _prepare_key(key_data, key_data["alg"])
+                verification_keys[key_data["kid"]] = (
+                    public_key, [key_data["alg"]]
+                )
+                if key_data["kid"] == signing_kid:
+                    signing = (signing_kid, key, key_data["alg"])
+
+        if signing is None:
+            raise RuntimeError("No JWT signing key is configured.")
+
+        return KeySet(*signing, verification_keys=verification_keys)
+
+
+key_store = TokenKeyStore(jwks_file=JWKS_FILE, signing_kid=JWT_SIGNING_KID)
+
+_revoked_tokens: Dict[str, float] = {}
+# Keyed by (world, user id): every world numbers its users separately.
+_min_token_versions: Dict[Tuple[str, str], int] = {}
+_revocation_lock = threading.Lock()
+
+
+def encode_token(claims: dict) -> str:
+    """Sign the claims with the current signing key."""
+    key_set = key_store.get()
+    to_encode = {"jti": uuid.uuid4().hex, **claims}
+    headers = {"kid": key_set.signing_kid} if key_set.signing_kid else None
+    return jwt.encode(
+        to_encode,
+        key_set.signing_key,
+        algorithm=key_set.signing_algorithm,
+        headers=headers
+    )
+
+
+def decode_token(token: str) -> dict:
+    """
+    Verify a token and return its claims.
+
+    Raises ``JWTError`` if the signature, expiry or revocation check fails.
+    """
+    header = jwt.get_unverified_header(token)
+    verification_key = key_store.get().verification_keys.get(header.get("kid"))
+    if verification_key is None:
+        raise JWTError("Unknown signing key.")
+
+    key, algorithms = verification_key
+    payload = jwt.decode(token, key, algorithms=algorithms)
+    if is_revoked(payload):
+        raise JWTError("Token has been revoked.")
+
+    return payload
+
+
+def revoke_token(payload: dict) -> None:
+    """Reject this token from now on, until it would expire anyway."""
+    now = time.time()
+    with _revocation_lock:
+        for jti, expires_at in list(_revoked_tokens.items()):
+            if expires_at < now:
+                del _revoked_tokens[jti]
+        if payload.get("jti"):
+            _revoked_tokens[payload["jti"]] = payload.get("exp", now)
+
+
+def revoke_user_tokens(
+        user_id: int,
+        token_version: int,
+        world: str = DEFAULT_WORLD
+) -> None:
+    """Reject the world's user's tokens issued before ``token_version``."""
+    key = (world, str(user_id))
+    with _revocation_lock:
+        _min_token_versions[key] = max(
+            token_version, _min_token_versions.get(key, 0)
+        )
+
+
+def is_revoked(payload: dict) -> bool:
+    """Check the claims against the in-memory revocation lists."""
+    if payload.get("jti") in _revoked_tokens:
+        return True
+
+    min_version = _min_token_versions.get(
+        (payload.get("world", DEFAULT_WORLD), str(payload.get("sub"))), 0
+    )
+    return payload.get("ver", 0) < min_version